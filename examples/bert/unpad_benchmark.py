@@ -0,0 +1,88 @@
+# Copyright 2019 The Texar Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Measures the encoding throughput (real tokens/sec) of BERT-Base with and
+without ``"unpad_inputs"``, under different padding ratios. Sequence lengths
+are sampled uniformly so that the expected fraction of padding positions
+matches each ratio. The model is randomly initialized.
+"""
+
+import argparse
+import time
+
+import torch
+
+import texar.torch as tx
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--batch-size", type=int, default=32,
+                    help="The batch size of input.")
+parser.add_argument("--max-seq-length", type=int, default=128,
+                    help="The padded length of input.")
+parser.add_argument("--padding-ratios", type=float, nargs="+",
+                    default=[0.0, 0.25, 0.5, 0.75],
+                    help="The expected fractions of padding positions.")
+parser.add_argument("--num-batches", type=int, default=20,
+                    help="Number of batches to encode for each setting.")
+
+args = parser.parse_args()
+
+
+def benchmark(model: tx.modules.BERTEncoder, inputs: torch.Tensor,
+              sequence_length: torch.Tensor) -> float:
+    device = inputs.device
+    with torch.no_grad():
+        model(inputs, sequence_length)  # warm-up
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        start_time = time.time()
+        for _ in range(args.num_batches):
+            model(inputs, sequence_length)
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        elapsed = time.time() - start_time
+    return args.num_batches * sequence_length.sum().item() / elapsed
+
+
+def main() -> None:
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = tx.modules.BERTEncoder(hparams={"pretrained_model_name": None})
+    unpad_model = tx.modules.BERTEncoder(hparams={
+        "pretrained_model_name": None,
+        "encoder": {"unpad_inputs": True},
+    })
+    unpad_model.load_state_dict(model.state_dict())
+    model = model.to(device).eval()
+    unpad_model = unpad_model.to(device).eval()
+
+    inputs = torch.randint(model.hparams.vocab_size,
+                           (args.batch_size, args.max_seq_length),
+                           device=device)
+    for ratio in args.padding_ratios:
+        # Lengths are uniform in `[min_length, max_seq_length]`, whose mean
+        # is `(1 - ratio) * max_seq_length`.
+        min_length = max(
+            int((1 - 2 * ratio) * args.max_seq_length), 1)
+        sequence_length = torch.randint(
+            min_length, args.max_seq_length + 1, (args.batch_size,),
+            device=device)
+        actual_ratio = 1 - sequence_length.sum().item() / inputs.numel()
+        padded = benchmark(model, inputs, sequence_length)
+        unpadded = benchmark(unpad_model, inputs, sequence_length)
+        print(f"Padding ratio {actual_ratio:.2f}: padded {padded:.1f}, "
+              f"unpadded {unpadded:.1f} tokens/sec "
+              f"({unpadded / padded:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# Copyright 2019 The Texar Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Measures the tokenization speed (tokens/sec) of the GPT-2 tokenizer on a
+text corpus (e.g., the raw WikiText-103 training set), compared against the
+previous implementation with an unbounded cache and a merge loop that scans
+all pairs after each merge.
+"""
+
+import argparse
+import time
+from typing import Dict, List
+
+import texar.torch as tx
+from texar.torch.data.tokenizers.gpt2_tokenizer_utils import get_pairs
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--corpus", type=str, required=True,
+                    help="Path to a text file, with one example per line.")
+parser.add_argument("--max-lines", type=int, default=100000,
+                    help="Maximum number of lines to tokenize.")
+parser.add_argument("--pretrained-model-name", type=str, default="gpt2-small",
+                    help="Name of the pre-trained GPT-2 tokenizer.")
+parser.add_argument("--cache-size", type=int, default=100000,
+                    help="Size of the BPE cache of the new implementation.")
+
+args = parser.parse_args()
+
+
+class LegacyGPT2Tokenizer(tx.data.GPT2Tokenizer):
+    r"""GPT-2 tokenizer with the previous BPE implementation."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.legacy_cache: Dict[str, str] = {}
+
+    def _bpe(self, token: str) -> str:
+        if token in self.legacy_cache:
+            return self.legacy_cache[token]
+        word = tuple(token)
+        pairs = get_pairs(word)
+        if not pairs:
+            return token
+
+        while True:
+            bigram = min(pairs, key=lambda pair: self.bpe_ranks.get(
+                pair, float('inf')))
+            if bigram not in self.bpe_ranks:
+                break
+            first, second = bigram
+            new_word: List[str] = []
+            i = 0
+            while i < len(word):
+                try:
+                    j = word.index(first, i)
+                    new_word.extend(word[i:j])
+                    i = j
+                except ValueError:
+                    new_word.extend(word[i:])
+                    break
+                if word[i] == first and i < len(word) - 1 \
+                        and word[i + 1] == second:
+                    new_word.append(first + second)
+                    i += 2
+                else:
+                    new_word.append(word[i])
+                    i += 1
+            word = tuple(new_word)
+            if len(word) == 1:
+                break
+            pairs = get_pairs(word)
+        result = ' '.join(word)
+        self.legacy_cache[token] = result
+        return result
+
+
+def benchmark(tokenizer: tx.data.GPT2Tokenizer, lines: List[str]) -> float:
+    num_tokens = 0
+    start_time = time.time()
+    for line in lines:
+        num_tokens += len(tokenizer.map_text_to_token(line))
+    return num_tokens / (time.time() - start_time)
+
+
+def main() -> None:
+    with open(args.corpus, encoding="utf-8") as f:
+        lines = []
+        for line in f:
+            line = line.strip()
+            if line:
+                lines.append(line)
+            if len(lines) >= args.max_lines:
+                break
+
+    legacy = LegacyGPT2Tokenizer(
+        pretrained_model_name=args.pretrained_model_name)
+    tokenizer = tx.data.GPT2Tokenizer(
+        pretrained_model_name=args.pretrained_model_name,
+        hparams={"bpe_cache_size": args.cache_size})
+
+    for line in lines[:1000]:
+        assert legacy.map_text_to_token(line) == \
+               tokenizer.map_text_to_token(line)
+    legacy.legacy_cache.clear()
+    tokenizer.cache.clear()
+
+    print(f"Legacy: {benchmark(legacy, lines):.1f} tokens/sec, "
+          f"{len(legacy.legacy_cache)} cached tokens")
+    print(f"Current: {benchmark(tokenizer, lines):.1f} tokens/sec, "
+          f"{len(tokenizer.cache)} cached tokens, "
+          f"{tokenizer.cache.hits} hits, {tokenizer.cache.misses} misses")
+
+
+if __name__ == '__main__':
+    main()
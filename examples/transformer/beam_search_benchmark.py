@@ -0,0 +1,150 @@
+# Copyright 2019 The Texar Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Measures the latency of beam search decoding with a randomly initialized
+Transformer decoder, using `tx.utils.beam_search.beam_search` and
+`tx.utils.beam_search.batched_beam_search`. To make examples finish at
+different steps, the end token is made more likely in proportion to a random
+per-example rate.
+"""
+
+import argparse
+import time
+
+import torch
+
+import texar.torch as tx
+from texar.torch.utils.beam_search import batched_beam_search, beam_search
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--batch-size", type=int, default=32,
+                    help="The batch size of input.")
+parser.add_argument("--beam-width", type=int, default=5,
+                    help="The beam width.")
+parser.add_argument("--memory-length", type=int, default=64,
+                    help="The length of encoder outputs.")
+parser.add_argument("--max-decoding-length", type=int, default=64,
+                    help="The maximum number of decoding steps.")
+parser.add_argument("--vocab-size", type=int, default=32000,
+                    help="The vocabulary size.")
+parser.add_argument("--num-runs", type=int, default=5,
+                    help="Number of runs to average over.")
+
+args = parser.parse_args()
+
+END_TOKEN = 2
+
+
+def main() -> None:
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    hidden_dim = 512
+    embedder = tx.modules.WordEmbedder(
+        vocab_size=args.vocab_size, hparams={"dim": hidden_dim})
+    pos_embedder = tx.modules.SinusoidsPositionEmbedder(
+        position_size=args.max_decoding_length + 1,
+        hparams={"dim": hidden_dim})
+
+    def _embedding_fn(tokens, positions):
+        return embedder(tokens) * hidden_dim ** 0.5 + pos_embedder(positions)
+
+    decoder = tx.modules.TransformerDecoder(
+        token_pos_embedder=_embedding_fn,
+        vocab_size=args.vocab_size,
+        output_layer=embedder.embedding)
+    embedder.to(device)
+    pos_embedder.to(device)
+    decoder.to(device).eval()
+
+    batch_size, beam_width = args.batch_size, args.beam_width
+    memory = torch.randn(batch_size, args.memory_length, hidden_dim,
+                         device=device)
+    memory_attention_bias = torch.zeros(
+        batch_size, 1, 1, args.memory_length, device=device)
+    start_tokens = torch.full((batch_size,), 1, dtype=torch.long,
+                              device=device)
+    end_rate = torch.rand(batch_size, device=device) * 2.0
+
+    def _logits(ids, cache, rate):
+        step = ids.size(-1) - 1
+        times = ids.new_full((ids.size(0),), step)
+        logits, _ = decoder._inputs_to_outputs(
+            _embedding_fn(ids[:, -1], times), cache)
+        logits[:, END_TOKEN] += rate * step
+        return logits
+
+    def _run_original():
+        cache = decoder._init_cache(
+            memory, memory_attention_bias, beam_search_decoding=True,
+            batch_size=batch_size, max_length=args.max_decoding_length,
+            beam_width=beam_width)
+        cache['beam_index'] = None
+        cache['rate'] = end_rate
+
+        def _symbols_to_logits_fn(ids, cache):
+            # The original beam search gathers every tensor in the cache, so
+            # the hypotheses each beam comes from are tracked by gathering
+            # `beam_index` and used to reorder the key/value buffers.
+            if cache['beam_index'] is not None:
+                for layer_cache in cache['layers']:
+                    layer_cache.reorder_(cache['beam_index'])
+            cache['beam_index'] = torch.arange(ids.size(0), device=device)
+            return _logits(ids, cache, cache['rate']), cache
+
+        return beam_search(
+            _symbols_to_logits_fn, start_tokens, beam_width,
+            args.max_decoding_length, args.vocab_size, 0.6,
+            states=cache, eos_id=END_TOKEN)
+
+    def _run_batched():
+        cache = decoder._init_cache(
+            memory, memory_attention_bias, beam_search_decoding=True,
+            batch_size=batch_size, max_length=args.max_decoding_length,
+            beam_width=beam_width)
+
+        def _symbols_to_logits_fn(ids, layers, memory):
+            cache['memory'], cache['memory_attention_bias'], rate = memory
+            cache['layers'] = layers
+            return _logits(ids, cache, rate), layers
+
+        return batched_beam_search(
+            _symbols_to_logits_fn, start_tokens, beam_width,
+            args.max_decoding_length, args.vocab_size, 0.6,
+            states=cache['layers'],
+            memory=(memory, memory_attention_bias, end_rate),
+            eos_id=END_TOKEN)
+
+    def _benchmark(fn):
+        with torch.no_grad():
+            outputs = fn()  # warm-up
+            if device.type == "cuda":
+                torch.cuda.synchronize()
+            start_time = time.time()
+            for _ in range(args.num_runs):
+                fn()
+            if device.type == "cuda":
+                torch.cuda.synchronize()
+        return (time.time() - start_time) / args.num_runs, outputs
+
+    original_time, (original_ids, _) = _benchmark(_run_original)
+    batched_time, (batched_ids, _) = _benchmark(_run_batched)
+    length = batched_ids.size(2)
+    num_same = (original_ids[:, 0, :length] ==
+                batched_ids[:, 0]).all(dim=1).sum().item()
+    print(f"beam_search: {original_time * 1000:.1f} ms/batch")
+    print(f"batched_beam_search: {batched_time * 1000:.1f} ms/batch "
+          f"({original_time / batched_time:.2f}x)")
+    print(f"Identical best hypotheses: {num_same}/{batch_size}")
+
+
+if __name__ == '__main__':
+    main()
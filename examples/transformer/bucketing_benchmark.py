@@ -0,0 +1,98 @@
+# Copyright 2019 The Texar Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compares the amount of padding and data throughput of batching in arrival
+order (`CustomBatchingStrategy`) and length-bucketed batching
+(`tx.data.BucketBatchingStrategy`) on the Transformer training data.
+"""
+
+import argparse
+import importlib
+import os
+import tempfile
+import time
+from typing import Any
+
+import numpy as np
+
+import texar.torch as tx
+
+import utils.data_utils as data_utils
+
+parser = argparse.ArgumentParser()
+
+parser.add_argument(
+    "--config-data", type=str, default="config_iwslt15",
+    help="The dataset config.")
+parser.add_argument(
+    "--window-size", type=int, default=None,
+    help="Number of examples sorted by length at a time. Defaults to sorting "
+         "the whole dataset.")
+parser.add_argument(
+    "--synthetic", type=int, default=None,
+    help="If specified, use this number of randomly generated examples "
+         "instead of the processed training data.")
+
+args = parser.parse_args()
+
+config_data: Any = importlib.import_module(args.config_data)
+
+
+def _example_length(ex: data_utils.Example) -> int:
+    # Add one for the EOS token appended in `collate`.
+    return max(len(ex[0]), len(ex[1])) + 1
+
+
+def _run_epoch(data: tx.data.DatasetBase,
+               strategy: tx.data.BatchingStrategy) -> None:
+    num_tokens = num_padded_tokens = num_batches = 0
+    start_time = time.time()
+    for batch in tx.data.DataIterator(data, strategy):
+        num_batches += 1
+        for name in ["source", "target_output"]:
+            tensor = getattr(batch, name)
+            num_tokens += (tensor != data.hparams.pad_id).sum().item()
+            num_padded_tokens += tensor.numel()
+    elapsed = time.time() - start_time
+    print(f"{type(strategy).__name__}: {num_batches} batches, "
+          f"padding ratio {1.0 - num_tokens / num_padded_tokens:.2%}, "
+          f"{num_tokens / elapsed:.0f} tokens/sec")
+
+
+def main() -> None:
+    filename = os.path.join(
+        config_data.input_dir, f"{config_data.filename_prefix}train.npy")
+    if args.synthetic is not None:
+        # Sentence lengths roughly following those of IWSLT'15 En-Vi.
+        rng = np.random.RandomState(0)
+        lengths = np.clip(rng.lognormal(3.0, 0.6, size=(args.synthetic, 2)),
+                          1, config_data.max_decoding_length).astype(np.int64)
+        examples = np.empty(args.synthetic, dtype=object)
+        examples[:] = [(rng.randint(3, 1000, size=(src,)),
+                        rng.randint(3, 1000, size=(tgt,)))
+                       for src, tgt in lengths]
+        filename = os.path.join(tempfile.mkdtemp(), "train.npy")
+        np.save(filename, examples)
+    data = data_utils.Seq2SeqData(filename, hparams={"shuffle": True})
+    print(f"Training data size: {len(data)}")
+
+    _run_epoch(data, data_utils.CustomBatchingStrategy(
+        config_data.max_batch_tokens))
+    lengths = [_example_length(data[idx]) for idx in range(len(data))]
+    _run_epoch(data, tx.data.BucketBatchingStrategy(
+        config_data.max_batch_tokens, length_fn=_example_length,
+        window_size=args.window_size, lengths=lengths))
+
+
+if __name__ == "__main__":
+    main()
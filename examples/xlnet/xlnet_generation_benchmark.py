@@ -0,0 +1,74 @@
+# Copyright 2019 The Texar Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Measures the decoding speed (tokens/sec) of XLNet under different decoding
+lengths, with full recomputation, memory reuse, and incremental decoding.
+The model is randomly initialized with the architecture of XLNet-Base.
+"""
+
+import argparse
+import time
+
+import torch
+
+import texar.torch as tx
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--batch-size", type=int, default=4,
+                    help="The batch size of input.")
+parser.add_argument("--prompt-length", type=int, default=32,
+                    help="The length of the prompt.")
+parser.add_argument("--lengths", type=int, nargs="+",
+                    default=[32, 64, 128, 256],
+                    help="The decoding lengths to benchmark.")
+
+args = parser.parse_args()
+
+
+def main() -> None:
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = tx.modules.XLNetDecoder(hparams={"pretrained_model_name": None})
+    model = model.to(device)
+    model.eval()
+
+    start_tokens = torch.randint(
+        model.hparams.vocab_size, (args.batch_size, args.prompt_length),
+        device=device)
+    modes = {
+        "recompute": {"recompute_memory": True},
+        "memory": {"recompute_memory": False, "incremental": False},
+        "incremental": {"recompute_memory": False, "incremental": True},
+    }
+    for length in args.lengths:
+        results = []
+        for name, kwargs in modes.items():
+            with torch.no_grad():
+                if device.type == "cuda":
+                    torch.cuda.synchronize()
+                start_time = time.time()
+                # Use an invalid end token so that exactly `length` tokens
+                # are decoded.
+                model(start_tokens=start_tokens, end_token=-1,
+                      max_decoding_length=length,
+                      helper_type=tx.modules.GreedyEmbeddingHelper,
+                      **kwargs)
+                if device.type == "cuda":
+                    torch.cuda.synchronize()
+                elapsed = time.time() - start_time
+            tokens_per_sec = args.batch_size * length / elapsed
+            results.append(f"{name} {tokens_per_sec:.1f}")
+        print(f"Length {length}: " + ", ".join(results) + " tokens/sec")
+
+
+if __name__ == '__main__':
+    main()
@@ -28,6 +28,9 @@ enable_grad: Any = ...
 set_grad_enabled: Any = ...
 
 
+def is_grad_enabled() -> builtins.bool: ...
+
+
 class device:
     def __init__(self, device: Union[builtins.int, builtins.str]): ...
 
@@ -64,7 +67,10 @@ class layout: ...
 class dtype: ...
 
 
-class Generator: ...
+class Generator:
+    def __init__(self, device: Union[device, str] = 'cpu'): ...
+
+    def manual_seed(self, seed: builtins.int) -> Generator: ...
 
 
 class Size(Tuple[builtins.int, ...]):
@@ -1758,13 +1764,13 @@ def embedding_renorm_(input: Tensor, indices: LongTensor, max_norm: builtins.flo
 @overload
 def empty(size: MaybeTuple[builtins.int], out: Optional[Tensor] = None, dtype: Optional[dtype] = None,
           layout: Type[layout] = strided, device: Union[device, str, None] = None,
-          requires_grad: bool = False) -> Tensor: ...
+          requires_grad: bool = False, pin_memory: bool = False) -> Tensor: ...
 
 
 @overload
 def empty(*size: builtins.int, out: Optional[Tensor] = None, dtype: Optional[dtype] = None,
           layout: Type[layout] = strided, device: Union[device, str, None] = None,
-          requires_grad: bool = False) -> Tensor: ...
+          requires_grad: bool = False, pin_memory: bool = False) -> Tensor: ...
 
 
 def empty_like(input: Tensor, *, dtype: Optional[dtype] = None, layout: Optional[Type[layout]] = None,
@@ -2485,13 +2491,14 @@ def randint_like(input: Tensor, low: builtins.int, high: builtins.int, *, dtype:
 
 
 @overload
-def randint(high: builtins.int, size: MaybeTuple[builtins.int], *, dtype: Optional[dtype] = None,
-            layout: Optional[Type[layout]] = None, device: Union[device, str, None] = None,
-            requires_grad: bool = False) -> LongTensor: ...
+def randint(high: builtins.int, size: MaybeTuple[builtins.int], *, generator: Optional[Generator] = None,
+            dtype: Optional[dtype] = None, layout: Optional[Type[layout]] = None,
+            device: Union[device, str, None] = None, requires_grad: bool = False) -> LongTensor: ...
 
 
 @overload
-def randint(low: builtins.int, high: builtins.int, size: MaybeTuple[builtins.int], *, dtype: Optional[dtype] = None,
+def randint(low: builtins.int, high: builtins.int, size: MaybeTuple[builtins.int], *,
+            generator: Optional[Generator] = None, dtype: Optional[dtype] = None,
             layout: Optional[Type[layout]] = None, device: Union[device, str, None] = None,
             requires_grad: bool = False) -> LongTensor: ...
 
@@ -2830,6 +2837,10 @@ def trunc_(input: Tensor) -> Tensor: ...
 def unbind(input: Tensor, dim: builtins.int = 0) -> MaybeTuple[Tensor]: ...
 
 
+def unique(input: Tensor, sorted: bool = True, return_inverse: bool = False, return_counts: bool = False,
+           dim: Optional[builtins.int] = None) -> MaybeTuple[Tensor]: ...
+
+
 def unsqueeze(input: Tensor, dim: builtins.int) -> Tensor: ...
 
 
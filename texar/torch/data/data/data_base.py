@@ -16,17 +16,22 @@ Base data class that is inherited by all data classes.
 A data defines data reading, parsing, batching, and other
 preprocessing operations.
 """
+import hashlib
+import json
+import os
 import warnings
 from abc import ABC
 from typing import (
-    Callable, Dict, Generic, Iterable, Iterator, List, Optional, Sequence,
-    Tuple, TypeVar, Union)
+    Any, Callable, Dict, Generic, Iterable, Iterator, List, Optional,
+    Sequence, Tuple, TypeVar, Union)
 
 import torch
 from torch.utils.data import Dataset
 
 from texar.torch.data.data.dataset_utils import Batch
-from texar.torch.data.data.dataset_utils import _CacheStrategy, _LazyStrategy
+from texar.torch.data.data.dataset_utils import (
+    _CacheStrategy, _LazyStrategy, _ProcessedExampleStore,
+    _SharedExampleCache, _file_fingerprint)
 from texar.torch.hyperparams import HParams
 
 __all__ = [
@@ -63,6 +68,18 @@ class DataSource(Generic[RawExample], ABC):
     def __len__(self) -> int:
         raise TypeError("This DataSource does not support random access")
 
+    def fingerprint(self) -> Optional[Any]:
+        r"""Returns a JSON-serializable object that identifies the contents of
+        this data source, e.g., the paths, sizes and modification times of
+        the files to read. This is used as part of the key of the persistent
+        cache of :class:`~texar.torch.data.DatasetBase` (see the
+        ``"cache_dir"`` hyperparameter).
+
+        The default implementation returns `None`, meaning that the contents
+        cannot be identified, in which case persistent caching is disabled.
+        """
+        return None
+
 
 class SequenceDataSource(DataSource[RawExample]):
     r"""Data source for reading from Python sequences.
@@ -129,6 +146,12 @@ class ZipDataSource(DataSource[Tuple[RawExample, ...]]):
     def __len__(self) -> int:
         return min(len(source) for source in self._sources)
 
+    def fingerprint(self) -> Optional[Any]:
+        fingerprints = [source.fingerprint() for source in self._sources]
+        if any(fp is None for fp in fingerprints):
+            return None
+        return fingerprints
+
 
 class FilterDataSource(DataSource[RawExample]):
     r"""Data source for filtering raw examples with a user-specified filter
@@ -155,6 +178,16 @@ class FilterDataSource(DataSource[RawExample]):
             if self._filter_fn(sentence):
                 yield sentence
 
+    def fingerprint(self) -> Optional[Any]:
+        # The filter function is identified by its name only, so changes to
+        # its code are not detected.
+        fingerprint = self._source.fingerprint()
+        if fingerprint is None:
+            return None
+        filter_fn = self._filter_fn
+        return [fingerprint, getattr(filter_fn, '__module__', None),
+                getattr(filter_fn, '__qualname__', repr(filter_fn))]
+
 
 class RecordDataSource(DataSource[Dict[str, RawExample]]):
     r"""Data source by structuring multiple sources. The raw examples returned
@@ -184,6 +217,13 @@ class RecordDataSource(DataSource[Dict[str, RawExample]]):
     def __len__(self) -> int:
         return min(len(source) for source in self._sources.values())
 
+    def fingerprint(self) -> Optional[Any]:
+        fingerprints = {key: source.fingerprint()
+                        for key, source in self._sources.items()}
+        if any(fp is None for fp in fingerprints.values()):
+            return None
+        return fingerprints
+
 
 class _TruncatedDataSource(DataSource[RawExample]):
     def __init__(self, data_source: DataSource[RawExample], max_size: int):
@@ -210,6 +250,12 @@ class _TruncatedDataSource(DataSource[RawExample]):
             length = self._max_size
         return length
 
+    def fingerprint(self) -> Optional[Any]:
+        fingerprint = self._source.fingerprint()
+        if fingerprint is None:
+            return None
+        return [fingerprint, self._max_size]
+
 
 class _TransformedDataSource(DataSource[Example], Generic[RawExample, Example]):
     r"""Data source by performing transformations on another data source.
@@ -485,8 +531,16 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
         self._uses_multi_processing = self._hparams.num_parallel_calls > 0
         self._parallelize_processing = self._hparams.parallelize_processing
 
+        self._dataset_size = None
         self._processed_cache: List[Example] = []
+        # Processed examples that cannot yet be appended to
+        # `_processed_cache`, because examples before them are not processed.
+        self._reorder_cache: Dict[int, Example] = {}
         self._fully_cached = False
+        self._disk_cache: Optional[_ProcessedExampleStore] = None
+        # If set, processed examples are cached here instead of
+        # `_processed_cache` and `_reorder_cache`.
+        self._shared_cache: Optional[_SharedExampleCache] = None
 
         # If specified maximum dataset size, wrap the data source. This is done
         # before caching to avoid caching excess elements.
@@ -548,24 +602,45 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
                 self._lazy_strategy is _LazyStrategy.PROCESS and
                 self._cache_strategy is _CacheStrategy.PROCESSED)
 
-        # Perform eager loading/processing if required.
-        if self._lazy_strategy is _LazyStrategy.NONE:
-            # Process entire dataset and cache.
-            self._processed_cache = [self.process(raw_example)
-                                     for raw_example in self._source]
-            self._dataset_size = len(self._processed_cache)
-            self._fully_cached = True
-        else:
-            if self._lazy_strategy is _LazyStrategy.PROCESS:
-                # Load entire dataset. Note that if data source supports random
-                # access, we assume it is already loaded into memory.
-                if not self._supports_random_access:
-                    self._prefetch_all_source()
+        if self._hparams.shared_memory_cache:
+            if (self._cache_strategy is _CacheStrategy.PROCESSED and
+                    self._parallelize_processing and
+                    self._uses_multi_processing):
+                self._shared_cache = _SharedExampleCache()
+            else:
+                warnings.warn(
+                    "'shared_memory_cache' is ignored unless processed "
+                    "examples are cached and processing is parallelized "
+                    "across worker processes.")
 
+        # Load processed examples stored in previous runs.
+        if self._hparams.cache_dir is not None:
             if self._cache_strategy is _CacheStrategy.PROCESSED:
-                # Data can be processed in arbitrary order, so they need to be
-                # reordered before storing in the cache list.
-                self._reorder_cache: Dict[int, Example] = {}
+                self._load_disk_cache(source)
+            else:
+                warnings.warn(
+                    f"'cache_dir' is ignored when using "
+                    f"'{self._cache_strategy.value}' cache strategy.")
+
+        # Perform eager loading/processing if required.
+        if self._lazy_strategy is _LazyStrategy.NONE:
+            if not self._fully_cached:
+                # Process entire dataset and cache.
+                for index, raw_example in enumerate(self._source):
+                    if not self._is_cached(index):
+                        self._add_processed_examples(
+                            [index], [self.process(raw_example)])
+                self._dataset_size = self._num_cached_examples()
+                self._check_fully_cached()
+        elif (self._lazy_strategy is _LazyStrategy.PROCESS and
+                not self._fully_cached):
+            # Load entire dataset. Note that if data source supports random
+            # access, we assume it is already loaded into memory.
+            if not self._supports_random_access:
+                self._prefetch_all_source()
+                # Now that the dataset size is known, check whether all
+                # examples are loaded from `cache_dir`.
+                self._check_fully_cached()
 
     @staticmethod
     def default_hparams():
@@ -587,6 +662,8 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
                 "lazy_strategy": 'none',
                 "cache_strategy": 'processed',
                 "parallelize_processing": True,
+                "cache_dir": None,
+                "shared_memory_cache": False,
                 "name": "data"
             }
 
@@ -709,6 +786,41 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
             `none`. If `lazy_strategy` is `none`, processing will be
             performed on a single process regardless of this value.
 
+        `"cache_dir"`: str, optional
+            If not `None`, processed examples are also stored on disk under
+            this directory, and reused in later runs. This only applies when
+            processed examples are cached (see `cache_strategy`).
+
+            Examples are stored as they are processed during the first epoch,
+            so an interrupted run resumes where it stopped. The store is
+            keyed by a fingerprint of the data source (see
+            :meth:`DataSource.fingerprint`), the class of the data, and its
+            hyperparameters, including the sizes and modification times of
+            files referenced in hyperparameters (e.g., vocabulary files).
+            If the data source cannot be fingerprinted, a warning is
+            generated and examples are not stored.
+
+            .. note::
+                Changes to code are not detected. If :meth:`process` depends
+                on anything other than the data source and hyperparameters,
+                use a separate directory for each setting, or override
+                :meth:`_cache_fingerprint`.
+
+        `"shared_memory_cache"`: bool
+            If `True`, processed examples are cached in shared memory
+            instead of as Python objects. This only applies when processed
+            examples are cached, processing is parallelized, and
+            ``"num_parallel_calls"`` is greater than 0.
+
+            Worker processes pass processed examples back as a single
+            tensor through shared memory, and read cached examples directly
+            from shared memory in later epochs. This reduces inter-process
+            communication and avoids copy-on-write duplication of the cache
+            in each worker. Examples, or fields of tuple examples, that are
+            lists of integers or 1-D numeric NumPy arrays are stored as raw
+            arrays and decoded without unpickling. Other examples are
+            unpickled upon access.
+
         `"name"`: str
             Name of the data.
         """
@@ -731,6 +843,8 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
             "lazy_strategy": 'none',
             "cache_strategy": 'processed',
             "parallelize_processing": True,
+            "cache_dir": None,
+            "shared_memory_cache": False,
         }
 
     def to(self, device: Optional[torch.device]):
@@ -742,16 +856,150 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
             self.device = device
         return self
 
+    def _cache_fingerprint(self, source: DataSource[RawExample]) \
+            -> Optional[str]:
+        r"""Returns the key of the persistent cache of processed examples,
+        or `None` if the data source cannot be fingerprinted. The key covers
+        the data source, the class of the data, and hyperparameters that may
+        affect processing, including the metadata of files referenced in
+        hyperparameters.
+
+        Args:
+            source: The data source passed to the constructor.
+        """
+        source_fingerprint = source.fingerprint()
+        if source_fingerprint is None:
+            return None
+        hparams = self._hparams.todict()
+        for name in DatasetBase.default_hparams():
+            if name != "max_dataset_size":
+                hparams.pop(name, None)
+
+        def _fingerprint_value(value):
+            if isinstance(value, dict):
+                return {key: _fingerprint_value(val)
+                        for key, val in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [_fingerprint_value(val) for val in value]
+            if isinstance(value, str) and os.path.isfile(value):
+                return _file_fingerprint(value)
+            return value
+
+        key = json.dumps({
+            "class": f"{type(self).__module__}.{type(self).__qualname__}",
+            "source": source_fingerprint,
+            "hparams": _fingerprint_value(hparams),
+        }, sort_keys=True, default=repr)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _load_disk_cache(self, source: DataSource[RawExample]) -> None:
+        r"""Loads processed examples stored under ``"cache_dir"`` by previous
+        runs, and opens the store to write examples processed in this run.
+        """
+        fingerprint = self._cache_fingerprint(source)
+        if fingerprint is None:
+            warnings.warn(
+                f"The data source {type(source).__name__} does not support "
+                f"fingerprinting, processed examples will not be stored in "
+                f"'cache_dir'.")
+            return
+        store = _ProcessedExampleStore(
+            os.path.join(self._hparams.cache_dir, fingerprint[:32]))
+        examples = store.load()
+        if self._shared_cache is not None:
+            self._shared_cache.add(list(examples.keys()),
+                                   list(examples.values()))
+        else:
+            self._reorder_cache.update(examples)
+        if store.size is not None:
+            self._dataset_size = store.size
+        elif not store.open():
+            warnings.warn(
+                f"The cache at '{store.path}' is being written by another "
+                f"process, processed examples will not be stored.")
+        self._disk_cache = store
+        # Move loaded examples into `_processed_cache`.
+        self._add_processed_examples([], [])
+
+    def _is_cached(self, index: int) -> bool:
+        r"""Returns `True` if the example with the given index is processed
+        and cached.
+        """
+        if self._shared_cache is not None:
+            return index in self._shared_cache
+        return (index < len(self._processed_cache) or
+                index in self._reorder_cache)
+
+    def _num_cached_examples(self) -> int:
+        r"""Returns the number of cached examples, excluding those that
+        cannot yet be appended to `_processed_cache`.
+        """
+        if self._shared_cache is not None:
+            return len(self._shared_cache)
+        return len(self._processed_cache)
+
+    def _add_processed_examples(
+            self, indices: List[int],
+            examples: Union[List[Example], Tuple[torch.Tensor, torch.Tensor]]
+    ) -> None:
+        r"""Adds processed examples to the cache, and stores them under
+        ``"cache_dir"`` if it is set. Examples that are already cached are
+        ignored.
+
+        Args:
+            indices: Indices for each example.
+            examples: The processed examples, or examples packed by
+                :meth:`_SharedExampleCache.pack` if ``"shared_memory_cache"``
+                is set.
+        """
+        if self._shared_cache is not None:
+            new_indices = self._shared_cache.add(indices, examples)
+            if self._disk_cache is not None:
+                self._disk_cache.write_records(new_indices, [
+                    self._shared_cache.pickled(index)
+                    for index in new_indices])
+        else:
+            # Examples are not packed without the shared memory cache.
+            processed: List[Example] = examples  # type: ignore
+            new_indices = []
+            new_examples = []
+            for index, example in zip(indices, processed):
+                if self._is_cached(index):
+                    continue
+                new_indices.append(index)
+                new_examples.append(example)
+                if index == len(self._processed_cache):
+                    self._processed_cache.append(example)
+                else:
+                    self._reorder_cache[index] = example
+            if self._disk_cache is not None:
+                self._disk_cache.write(new_indices, new_examples)
+
+            while len(self._processed_cache) in self._reorder_cache:
+                index = len(self._processed_cache)
+                self._processed_cache.append(self._reorder_cache.pop(index))
+        self._check_fully_cached()
+
+    def _check_fully_cached(self) -> None:
+        r"""Marks the dataset as fully cached if all examples are processed
+        and cached, and finalizes the store under ``"cache_dir"``. This must
+        be called whenever examples are added, or the dataset size becomes
+        known.
+        """
+        if (not self._fully_cached and
+                self._num_cached_examples() == self._dataset_size):
+            self._fully_cached = True
+            if self._disk_cache is not None:
+                self._disk_cache.finalize(self._num_cached_examples())
+
     def _prefetch_processed(self, index: int):
         r"""Performs processing on the main process. This is called in
         :meth:`texar.torch.data.data.DatasetBase._prefetch_source` if
         `parallelize_processing` is `False`."""
-        if len(self._processed_cache) <= index:
-            self._processed_cache.extend(
-                self.process(self._source[x])
-                for x in range(len(self._processed_cache), index + 1))
-            if len(self._processed_cache) == self._dataset_size:
-                self._fully_cached = True
+        while len(self._processed_cache) <= index:
+            next_index = len(self._processed_cache)
+            self._add_processed_examples(
+                [next_index], [self.process(self._source[next_index])])
 
     def _prefetch_all_source(self) -> int:
         r"""Prefetches all examples from data source. This is only called if
@@ -770,6 +1018,7 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
                 self._cached_source.prefetch(max_index)
         except StopIteration:
             self._dataset_size = self._cached_source.max_index + 1
+            self._check_fully_cached()
             return self._dataset_size
 
     def _prefetch_source(self, index: int) -> Optional[int]:
@@ -792,6 +1041,8 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
                 # self._cached_source.reset()
                 if self._should_call_prefetch_processed:
                     self._prefetch_processed(self._dataset_size - 1)
+                # All examples may have been cached before the size is known.
+                self._check_fully_cached()
                 return self._dataset_size
             if self._should_call_prefetch_processed:
                 self._prefetch_processed(index)
@@ -826,8 +1077,12 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
 
     def __getitem__(self, index: Union[int, Tuple[int, RawExample]]) -> Example:
         if isinstance(index, int):
-            if self._fully_cached:
+            if self._shared_cache is not None and index in self._shared_cache:
+                return self._shared_cache[index]
+            if self._fully_cached or index < len(self._processed_cache):
                 return self._processed_cache[index]
+            elif index in self._reorder_cache:
+                return self._reorder_cache[index]
             elif not self._parallelize_processing:
                 return self._transformed_source[index]
             else:
@@ -836,16 +1091,27 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
             # `index` is a tuple of (index, example).
             if not self._parallelize_processing:
                 return index[1]  # type: ignore
+            elif (self._shared_cache is not None and
+                    index[0] in self._shared_cache):
+                return self._shared_cache[index[0]]
+            elif index[0] < len(self._processed_cache):
+                # Processed in a previous run, see `cache_dir`.
+                return self._processed_cache[index[0]]
+            elif index[0] in self._reorder_cache:
+                return self._reorder_cache[index[0]]
             else:
                 return self.process(index[1])
 
-    def _add_cached_examples(self, indices: List[int], examples: List[Example]):
+    def _add_cached_examples(
+            self, indices: List[int],
+            examples: Union[List[Example], Tuple[torch.Tensor, torch.Tensor]]):
         r"""Called by :class:`texar.torch.data.data._CacheDataLoaderIter` to
         cache examples processed in worker processes.
 
         Args:
             indices: Indices for each example.
-            examples: The examples processed in worker processes.
+            examples: The examples processed in worker processes, packed if
+                ``"shared_memory_cache"`` is set.
         """
         if self._should_delete_source_in_add_cache:
             # In this case, `_CachedDataSource.__getitem__` will be
@@ -854,18 +1120,7 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
             # `_add_cached_examples`.
             for index in indices:
                 del self._cached_source._cache[index]  # pylint: disable=protected-access
-        for index, example in zip(indices, examples):
-            if index == len(self._processed_cache):
-                self._processed_cache.append(example)
-            else:
-                self._reorder_cache[index] = example
-
-        while len(self._processed_cache) in self._reorder_cache:
-            index = len(self._processed_cache)
-            self._processed_cache.append(self._reorder_cache[index])
-            del self._reorder_cache[index]
-        if len(self._processed_cache) == self._dataset_size:
-            self._fully_cached = True
+        self._add_processed_examples(indices, examples)
 
     def _start_iteration(self) -> None:
         r"""Called by :class:`texar.torch.data.data.SamplerBase` before a new
@@ -937,7 +1192,7 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
         raise NotImplementedError
 
     def _collate_and_maybe_return(self, examples: List[Example]) -> \
-            Union[Batch, Tuple[List[Example], Batch]]:
+            Union[Batch, Tuple[Any, Batch]]:
         r"""Called by :class:`~texar.torch.data.DataIterator` to obtain the
         collated batch (and processed examples under certain circumstances).
 
@@ -949,6 +1204,9 @@ class DatasetBase(Dataset, Generic[RawExample, Example], ABC):
         """
         batch = self.collate(examples)
         if self._should_return_processed_examples:
+            if self._shared_cache is not None:
+                # Examples are transferred through shared memory.
+                return _SharedExampleCache.pack(examples), batch
             return examples, batch
         return batch
 
@@ -17,8 +17,10 @@ Various data iterator classes.
 
 # pylint: disable=protected-access
 
+import queue
+import threading
 from typing import (
-    Dict, Iterable, Iterator, List, Optional, Sequence, Union, Mapping)
+    Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union, Mapping)
 
 import pkg_resources
 import torch
@@ -29,7 +31,8 @@ from texar.torch.data.data.data_base import DatasetBase
 from texar.torch.data.data.dataset_utils import Batch
 from texar.torch.data.data.sampler import (
     SamplerBase, SequentialSampler, RandomSampler, BufferShuffleSampler,
-    BatchingStrategy, DynamicBatchSampler)
+    BatchingStrategy, BucketBatchingStrategy, DynamicBatchSampler,
+    BucketBatchSampler)
 from texar.torch.utils.types import MaybeSeq
 from texar.torch.utils.utils import ceildiv, map_structure
 
@@ -306,6 +309,129 @@ else:
             return batch
 
 
+class _PrefetchDataLoaderIter:
+    r"""Wraps a data loader iterator and produces the next batches ahead of
+    time in a background thread. Fetching, collation, pinning, and moving to
+    device all happen in the background thread, while the consumer processes
+    the current batch.
+
+    When the target device is a CUDA device, the batches are moved on a
+    separate CUDA stream. Before a batch is returned, the current stream of
+    the consumer is made to wait for the copy to finish, so that host-to-device
+    transfers overlap with the computation on the previous batch.
+
+    Args:
+        iterator: The data loader iterator to wrap.
+        prefetch_batches: Maximum number of ready batches to buffer.
+        device: The device that batches are moved to, or `None`.
+    """
+
+    _END = object()
+
+    def __init__(self, iterator: Iterator[Batch], prefetch_batches: int,
+                 device: Optional[torch.device]):
+        self._shutdown_event = threading.Event()
+        self._finished = False
+        self._iterator = iterator
+        self._device = device
+        stream: Optional[torch.cuda.Stream] = None
+        if device is not None and device.type == "cuda":
+            stream = torch.cuda.Stream(device)
+        self._queue: 'queue.Queue[Any]' = queue.Queue(prefetch_batches)
+        # The thread must not hold a reference to `self`, otherwise the
+        # iterator would never be garbage collected (and the thread never
+        # stopped) if the consumer stops iterating early.
+        self._thread = threading.Thread(
+            target=self._prefetch_loop,
+            args=(iterator, self._queue, self._shutdown_event, stream, device),
+            daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _prefetch_loop(iterator: Iterator[Batch], data_queue: 'queue.Queue',
+                       shutdown_event: threading.Event,
+                       stream: Optional[torch.cuda.Stream],
+                       device: Optional[torch.device]):
+        def _put(item: Any) -> bool:
+            # Use a timeout so that shutdown requests are noticed even when the
+            # queue is full and the consumer has stopped iterating.
+            while not shutdown_event.is_set():
+                try:
+                    data_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        if stream is not None:
+            torch.cuda.set_device(device)
+        while not shutdown_event.is_set():
+            event = None
+            try:
+                if stream is not None:
+                    with torch.cuda.stream(stream):
+                        batch = next(iterator)
+                    event = stream.record_event()
+                else:
+                    batch = next(iterator)
+            except StopIteration:
+                _put(_PrefetchDataLoaderIter._END)
+                return
+            except Exception as e:  # pylint: disable=broad-except
+                # Re-raised in the consumer thread.
+                _put(e)
+                return
+            if not _put((batch, event)):
+                return
+
+    def __iter__(self):
+        return self
+
+    def __len__(self):
+        return len(self._iterator)  # type: ignore
+
+    def __next__(self) -> Batch:
+        if self._finished:
+            raise StopIteration
+        item = self._queue.get()
+        if item is self._END:
+            self._finished = True
+            raise StopIteration
+        if isinstance(item, Exception):
+            self._finished = True
+            raise item
+        batch, event = item
+        if event is not None:
+            stream = torch.cuda.current_stream(self._device)
+            stream.wait_event(event)
+
+            # Tensors were allocated on the prefetch stream. Mark them as used
+            # by the current stream, so that the memory is not reused by the
+            # prefetch stream before the consumer is done with them.
+            def _record_fn(x):
+                if isinstance(x, torch.Tensor) and x.is_cuda:
+                    x.record_stream(stream)
+                return x
+
+            for value in batch.values():
+                map_structure(_record_fn, value)
+        return batch
+
+    def shutdown(self):
+        r"""Stops the background thread. Batches that are already prepared
+        are discarded.
+        """
+        if self._shutdown_event.is_set():
+            return
+        self._shutdown_event.set()
+        self._thread.join()
+        self._finished = True
+
+    def __del__(self):
+        if hasattr(self, "_thread"):
+            self.shutdown()
+
+
 class SingleDatasetIterator(DataLoader):
     r"""Iterator for a single dataset. This iterator is based on the PyTorch
     :class:`~torch.utils.data.DataLoader` interface, with a custom shuffling
@@ -324,12 +450,30 @@ class SingleDatasetIterator(DataLoader):
             Defaults to `None`, which will set the value to `True` if the
             :class:`~texar.torch.data.DatasetBase` instance is set to use a CUDA
             device. Set to `True` or `False` to override this behavior.
+        prefetch_batches: The number of batches to prepare ahead of time in a
+            background thread. Loading, collation, pinning, and moving batches
+            to device are then overlapped with the processing of the current
+            batch. When moving to a CUDA device, the copies are performed on a
+            separate CUDA stream. If `0`, batches are prepared when requested.
+            Defaults to `0`.
+        num_shards: The number of shards to split the dataset into. This is
+            used for distributed training, where each process iterates over a
+            different shard. Defaults to `1`, i.e., no sharding.
+        shard_index: The index of the shard to iterate over. Defaults to `0`.
+        shard_seed: The random seed for shuffling when sharding is used, which
+            must be the same for all shards. Defaults to `0`.
     """
     dataset: DatasetBase
 
     def __init__(self, dataset: DatasetBase,
                  batching_strategy: Optional[BatchingStrategy] = None,
-                 pin_memory: Optional[bool] = None):
+                 pin_memory: Optional[bool] = None,
+                 prefetch_batches: int = 0,
+                 num_shards: int = 1, shard_index: int = 0,
+                 shard_seed: int = 0):
+        if prefetch_batches < 0:
+            raise ValueError("`prefetch_batches` must be non-negative.")
+        self.prefetch_batches = prefetch_batches
         shuffle = dataset.hparams.shuffle
         shuffle_buffer_size = dataset.hparams.shuffle_buffer_size
         sampler: SamplerBase
@@ -339,6 +483,9 @@ class SingleDatasetIterator(DataLoader):
             sampler = RandomSampler(dataset)
         else:
             sampler = SequentialSampler(dataset)
+        self.num_shards = num_shards
+        if num_shards > 1:
+            sampler.shard(num_shards, shard_index, shard_seed)
 
         num_workers = dataset.hparams.num_parallel_calls
         collate_fn = dataset._collate_and_maybe_return
@@ -351,8 +498,13 @@ class SingleDatasetIterator(DataLoader):
             self.device = dataset.device
 
         if batching_strategy is not None:
-            batch_sampler = DynamicBatchSampler(
-                dataset, sampler, batching_strategy)
+            batch_sampler: DynamicBatchSampler
+            if isinstance(batching_strategy, BucketBatchingStrategy):
+                batch_sampler = BucketBatchSampler(
+                    dataset, sampler, batching_strategy)
+            else:
+                batch_sampler = DynamicBatchSampler(
+                    dataset, sampler, batching_strategy)
             super().__init__(
                 dataset, batch_sampler=batch_sampler,
                 collate_fn=collate_fn, num_workers=num_workers,
@@ -364,16 +516,22 @@ class SingleDatasetIterator(DataLoader):
                 pin_memory=pin_memory)
 
     def __iter__(self):
+        iterator: Iterator[Batch]
         if self.dataset._should_return_processed_examples:
             # Accepts processed examples from workers and add to dataset cache.
-            return _CacheDataLoaderIter(self)
+            iterator = _CacheDataLoaderIter(self)
         else:
-            return _DataLoaderIter(self)
+            iterator = _DataLoaderIter(self)
+        if self.prefetch_batches > 0:
+            iterator = _PrefetchDataLoaderIter(
+                iterator, self.prefetch_batches, self.device)
+        return iterator
 
     def __len__(self):
         if self.batch_size is None:
             raise TypeError("__len__ not supported for dynamic batching")
-        data_length = len(self.dataset)  # may throw TypeError
+        # May throw TypeError.
+        data_length = len(self.dataset) // self.num_shards
         if self.dataset.hparams.allow_smaller_final_batch:
             return ceildiv(data_length, self.batch_size)
         return data_length // self.batch_size
@@ -403,6 +561,18 @@ class DataIterator:
             Defaults to `None`, which will set the value to `True` if the
             :class:`~texar.torch.data.DatasetBase` instance is set to use a CUDA
             device. Set to `True` or `False` to override this behavior.
+        prefetch_batches: The number of batches to prepare ahead of time in a
+            background thread. Loading, collation, pinning, and moving batches
+            to device are then overlapped with the processing of the current
+            batch. When moving to a CUDA device, the copies are performed on a
+            separate CUDA stream. If `0`, batches are prepared when requested.
+            Defaults to `0`.
+        num_shards: The number of shards to split the dataset into. This is
+            used for distributed training, where each process iterates over a
+            different shard. Defaults to `1`, i.e., no sharding.
+        shard_index: The index of the shard to iterate over. Defaults to `0`.
+        shard_seed: The random seed for shuffling when sharding is used, which
+            must be the same for all shards. Defaults to `0`.
 
     Example:
 
@@ -432,6 +602,16 @@ class DataIterator:
                 {'train': train_data, 'test': test_data},
                 batching_strategy=TokenCountBatchingStrategy(max_tokens=1000))
 
+        Dynamic batching with examples of similar lengths grouped together, to
+        reduce the amount of padding:
+
+        .. code-block:: python
+
+            iterator = DataIterator(
+                {'train': train_data, 'test': test_data},
+                batching_strategy=BucketBatchingStrategy(
+                    max_tokens=1000, window_size=10000))
+
         Dynamic batching with custom strategy (e.g. total number of tokens in
         examples from :class:`~texar.torch.data.PairedTextData`, including
         padding):
@@ -468,7 +648,10 @@ class DataIterator:
 
     def __init__(self, datasets: DatasetsType,
                  batching_strategy: Optional[BatchingStrategy] = None,
-                 pin_memory: Optional[bool] = None):
+                 pin_memory: Optional[bool] = None,
+                 prefetch_batches: int = 0,
+                 num_shards: int = 1, shard_index: int = 0,
+                 shard_seed: int = 0):
         self._default_dataset_name = 'data'
         if isinstance(datasets, DatasetBase):
             datasets = {self._default_dataset_name: datasets}
@@ -482,7 +665,9 @@ class DataIterator:
                 raise ValueError("Names of datasets must be unique.")
 
         _datasets = {
-            name: SingleDatasetIterator(dataset, batching_strategy, pin_memory)
+            name: SingleDatasetIterator(
+                dataset, batching_strategy, pin_memory, prefetch_batches,
+                num_shards, shard_index, shard_seed)
             for name, dataset in datasets.items()}
         self._datasets = _datasets
 
@@ -575,6 +760,12 @@ class TrainTestDataIterator(DataIterator):
             Defaults to `None`, which will set the value to `True` if the
             :class:`~texar.torch.data.DatasetBase` instance is set to use a CUDA
             device. Set to `True` or `False` to override this behavior.
+        prefetch_batches: The number of batches to prepare ahead of time in a
+            background thread. Loading, collation, pinning, and moving batches
+            to device are then overlapped with the processing of the current
+            batch. When moving to a CUDA device, the copies are performed on a
+            separate CUDA stream. If `0`, batches are prepared when requested.
+            Defaults to `0`.
 
     Example:
 
@@ -599,7 +790,8 @@ class TrainTestDataIterator(DataIterator):
                  val: Optional[DatasetBase] = None,
                  test: Optional[DatasetBase] = None,
                  batching_strategy: Optional[BatchingStrategy] = None,
-                 pin_memory: Optional[bool] = None):
+                 pin_memory: Optional[bool] = None,
+                 prefetch_batches: int = 0):
         dataset_dict = {}
         self._train_name = 'train'
         self._val_name = 'val'
@@ -614,7 +806,8 @@ class TrainTestDataIterator(DataIterator):
             raise ValueError("At least one of `train`, `val`, and `test` "
                              "must be provided.")
 
-        super().__init__(dataset_dict, batching_strategy, pin_memory)
+        super().__init__(dataset_dict, batching_strategy, pin_memory,
+                         prefetch_batches)
 
     def switch_to_train_data(self) -> None:
         r"""Switch to training data."""
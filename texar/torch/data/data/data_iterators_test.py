@@ -2,6 +2,8 @@
 Unit tests for data iterator related operations.
 """
 import copy
+import pickle
+import shutil
 import tempfile
 import unittest
 from unittest.mock import patch
@@ -14,9 +16,10 @@ from texar.torch.data.data.data_base import (
     DatasetBase, IterDataSource, SequenceDataSource, ZipDataSource)
 from texar.torch.data.data.data_iterators import (
     DataIterator, TrainTestDataIterator)
-from texar.torch.data.data.dataset_utils import Batch
+from texar.torch.data.data.dataset_utils import Batch, _SharedExampleCache
 from texar.torch.data.data.mono_text_data import MonoTextData
-from texar.torch.data.data.sampler import TokenCountBatchingStrategy
+from texar.torch.data.data.sampler import (
+    BucketBatchingStrategy, TokenCountBatchingStrategy)
 
 
 class DataIteratorTest(unittest.TestCase):
@@ -106,6 +109,62 @@ class DataIteratorTest(unittest.TestCase):
                 i += 1
         self.assertEqual(i, 2001)
 
+    def test_iterator_prefetch(self):
+        r"""Tests prefetching batches in a background thread.
+        """
+        for num_parallel_calls in [0, 2]:
+            hparams = copy.deepcopy(self._test_hparams)
+            hparams['num_parallel_calls'] = num_parallel_calls
+            data = MonoTextData(hparams)
+            data_iterator = DataIterator(data, prefetch_batches=3)
+            i = 1001
+            for batch in data_iterator:
+                self.assertEqual(batch.batch_size, hparams['batch_size'])
+                np.testing.assert_array_equal(batch['length'], [1, 1])
+                for example in batch['text']:
+                    self.assertEqual(example[0], str(i))
+                    i += 1
+            self.assertEqual(i, 2001)
+
+            # Stop iterating early, and start over.
+            iterator = data_iterator.get_iterator()
+            batch = next(iterator)
+            self.assertEqual(batch['text'][0][0], '1001')
+            iterator.shutdown()
+            with self.assertRaises(StopIteration):
+                next(iterator)
+            batch = next(data_iterator.get_iterator())
+            self.assertEqual(batch['text'][0][0], '1001')
+
+        with self.assertRaises(ValueError):
+            DataIterator(data, prefetch_batches=-1)
+
+    def test_iterator_sharding(self):
+        r"""Tests iterating over shards of a shuffled dataset.
+        """
+        hparams = copy.deepcopy(self._train_hparams)
+        hparams.update({"shuffle": True, "batch_size": 10})
+        num_shards = 3
+        iterators = [
+            DataIterator(MonoTextData(hparams), num_shards=num_shards,
+                         shard_index=index, shard_seed=1234)
+            for index in range(num_shards)]
+        for iterator in iterators:
+            self.assertEqual(len(iterator), 34)
+
+        epoch_examples = []
+        for _ in range(2):
+            shards = [[example[0] for batch in iterator
+                       for example in batch['text']]
+                      for iterator in iterators]
+            examples = [example for shard in shards for example in shard]
+            for shard in shards:
+                self.assertEqual(len(shard), 1000 // num_shards)
+            self.assertEqual(len(set(examples)), len(examples))
+            self.assertTrue(set(examples).issubset(set(self.train_text)))
+            epoch_examples.append(examples)
+        self.assertNotEqual(epoch_examples[0], epoch_examples[1])
+
     def test_iterator_multi_datasets(self):
         r"""Tests iterating over multiple datasets.
         """
@@ -207,6 +266,160 @@ class DataIteratorTest(unittest.TestCase):
             self.assertLessEqual(len(batch), batch_size)
             self.assertLessEqual(sum(len(s) for s in batch.text), max_tokens)
 
+    def test_bucket_batching(self):
+        r"""Tests length-bucketed dynamic batching using
+        :class:`texar.torch.data.BucketBatchingStrategy`.
+        """
+        sent_lengths = np.random.randint(1, 50, size=(500,))
+        sentences = [['a'] * length for length in sent_lengths]
+
+        class CustomData(DatasetBase):
+            def __init__(self, source, hparams=None):
+                super().__init__(source, hparams)
+
+            def collate(self, examples):
+                return Batch(len(examples), text=examples)
+
+        max_tokens = 200
+        max_batch_size = 16
+        hparams_list = [
+            {"shuffle": False},
+            {"shuffle": True, "shuffle_buffer_size": None},
+            {"shuffle": True, "shuffle_buffer_size": 100,
+             "lazy_strategy": "all", "cache_strategy": "none"},
+        ]
+        for hparams in hparams_list:
+            for window_size in [None, 100]:
+                for lengths in [None, sent_lengths.tolist()]:
+                    if lengths is not None and "lazy_strategy" in hparams:
+                        continue
+                    source = (IterDataSource(sentences)
+                              if "lazy_strategy" in hparams
+                              else SequenceDataSource(sentences))
+                    data = CustomData(source, hparams)
+                    length_calls = []
+
+                    def length_fn(example):
+                        length_calls.append(len(example))
+                        return len(example)
+
+                    strategy = BucketBatchingStrategy(
+                        max_tokens, max_batch_size, length_fn=length_fn,
+                        window_size=window_size, lengths=lengths)
+                    iterator = DataIterator(data, strategy)
+                    for _ in range(2):
+                        num_examples = 0
+                        for batch in iterator:
+                            lengths_ = [len(s) for s in batch.text]
+                            self.assertLessEqual(len(batch), max_batch_size)
+                            self.assertLessEqual(
+                                max(lengths_) * len(batch), max_tokens)
+                            num_examples += len(batch)
+                        self.assertEqual(num_examples, len(sentences))
+                    self.assertEqual(
+                        strategy.num_tokens, 2 * sum(sent_lengths))
+                    # Lengths are computed at most once for each example.
+                    self.assertLessEqual(len(length_calls), len(sentences))
+
+        # Sorting the whole dataset results in less padding than batching
+        # examples in random order.
+        data = CustomData(SequenceDataSource(sentences), {"shuffle": True})
+        bucket_strategy = BucketBatchingStrategy(max_tokens, max_batch_size)
+        for _ in DataIterator(data, bucket_strategy):
+            pass
+        num_tokens = num_padded_tokens = 0
+        strategy = TokenCountBatchingStrategy(max_tokens, max_batch_size)
+        for batch in DataIterator(data, strategy):
+            lengths_ = [len(s) for s in batch.text]
+            num_tokens += sum(lengths_)
+            num_padded_tokens += max(lengths_) * len(lengths_)
+        self.assertLess(bucket_strategy.padding_ratio, 0.1)
+        self.assertLess(bucket_strategy.padding_ratio,
+                        1.0 - num_tokens / num_padded_tokens)
+
+        # With sharding, the order of batches is determined by the shard seed,
+        # and shards do not overlap.
+        for hparams in hparams_list[1:]:
+            shard_batches = []
+            for shard_index in range(2):
+                runs = []
+                for global_seed in [0, 1]:
+                    torch.manual_seed(global_seed)
+                    source = (IterDataSource(sentences)
+                              if "lazy_strategy" in hparams
+                              else SequenceDataSource(sentences))
+                    iterator = DataIterator(
+                        CustomData(source, hparams),
+                        BucketBatchingStrategy(max_tokens, max_batch_size,
+                                               window_size=100),
+                        num_shards=2, shard_index=shard_index, shard_seed=123)
+                    runs.append([[id(s) for s in batch.text]
+                                 for batch in iterator])
+                self.assertEqual(runs[0], runs[1])
+                shard_batches.append(runs[0])
+            examples = [[idx for batch in batches for idx in batch]
+                        for batches in shard_batches]
+            self.assertEqual(len(examples[0]), len(sentences) // 2)
+            self.assertEqual(len(set(examples[0]) & set(examples[1])), 0)
+
+    def test_cache_dir(self):
+        r"""Tests storing processed examples on disk and resuming an
+        interrupted run.
+        """
+        cache_dir = tempfile.mkdtemp()
+        try:
+            hparams = copy.deepcopy(self._train_hparams)
+            hparams.update({
+                "batch_size": 10,
+                "lazy_strategy": "all",
+                "cache_strategy": "processed",
+                "cache_dir": cache_dir,
+            })
+
+            # Interrupt the first run after 10 batches.
+            data = MonoTextData(hparams)
+            for idx, _ in enumerate(DataIterator(data)):
+                if idx == 9:
+                    break
+            data._disk_cache.close()
+
+            process = MonoTextData.process
+            with patch.object(MonoTextData, "process", autospec=True,
+                              side_effect=process) as mock_process:
+                data = MonoTextData(hparams)
+                self.assertEqual(len(data._processed_cache), 100)
+                self.assertFalse(data._fully_cached)
+                texts = [example for batch in DataIterator(data)
+                         for example in batch.text]
+                self.assertEqual(mock_process.call_count, 900)
+                self.assertTrue(data._fully_cached)
+
+                mock_process.reset_mock()
+                data = MonoTextData(hparams)
+                self.assertTrue(data._fully_cached)
+                self.assertEqual(len(data), 1000)
+                cached_texts = [example for batch in DataIterator(data)
+                                for example in batch.text]
+                self.assertEqual(mock_process.call_count, 0)
+
+            self.assertEqual(texts, cached_texts)
+            self.assertEqual(texts, [[x] for x in self.train_text])
+
+            # Changing hyperparameters that affect processing invalidates
+            # the cache.
+            hparams["dataset"]["bos_token"] = "<BOS>"
+            data = MonoTextData(hparams)
+            self.assertFalse(data._fully_cached)
+            self.assertEqual(len(data._processed_cache), 0)
+
+            # An uninterrupted run also completes the cache.
+            for _ in DataIterator(data):
+                pass
+            self.assertTrue(data._fully_cached)
+            self.assertTrue(MonoTextData(hparams)._fully_cached)
+        finally:
+            shutil.rmtree(cache_dir)
+
     @patch("torch.cuda.is_available", lambda: True)
     def test_auto_storage_moving(self):
         cuda_tensors = set()
@@ -370,6 +583,9 @@ class LazinessCachingTest(unittest.TestCase):
                                       support_random_access=True)
         self._test_modes_with_workers(lazy_mode, cache_mode, self.num_workers,
                                       shuffle=True)
+        self._test_modes_with_workers(lazy_mode, cache_mode, self.num_workers,
+                                      support_random_access=True, shuffle=True,
+                                      shuffle_buffer_size=None)
 
     def test_none_processed(self):
         self._test_modes('none', 'processed')
@@ -389,6 +605,65 @@ class LazinessCachingTest(unittest.TestCase):
     def test_all_processed(self):
         self._test_modes('all', 'processed')
 
+    def test_shared_memory_cache(self):
+        r"""Tests caching processed examples in shared memory.
+        """
+        numbers_data = [[x] * self.seq_len for x in range(self.size)]
+        string_data = [' '.join(map(str, range(self.seq_len)))
+                       for _ in range(self.size)]
+        for lazy_mode in ['none', 'process', 'all']:
+            for support_random_access in [False, True]:
+                numbers_source = (SequenceDataSource(numbers_data)
+                                  if support_random_access
+                                  else IterDataSource(numbers_data))
+                source = ZipDataSource(
+                    numbers_source, SequenceDataSource(string_data))
+                data = MockDataBase(source, {
+                    'batch_size': self.batch_size,
+                    'lazy_strategy': lazy_mode,
+                    'cache_strategy': 'processed',
+                    'num_parallel_calls': self.num_workers,
+                    'shuffle': False,
+                    'shared_memory_cache': True,
+                })
+                self.assertIsNotNone(data._shared_cache)
+                iterator = DataIterator(data)
+                for _ in range(2):
+                    numbers = np.concatenate(
+                        [batch.numbers for batch in iterator])
+                    self.assertTrue(np.all(
+                        numbers == np.arange(1, self.size + 1)[:, np.newaxis]))
+                    self.assertTrue(data._fully_cached)
+                    self.assertEqual(len(data._shared_cache), self.size)
+                    self.assertEqual(len(data._processed_cache), 0)
+                self.assertEqual(data[3], ([4] * self.seq_len, list(
+                    map(str, range(self.seq_len)))))
+
+        # Integer lists and numeric arrays are decoded without unpickling.
+        cache = _SharedExampleCache()
+        examples = [[1, 2, 3], np.arange(4, dtype=np.int32), [],
+                    ([5, 6], np.array([1.5, 2.5]))]
+        cache.add(list(range(len(examples))), examples)
+        cache.add([4], _SharedExampleCache.pack([([7], ['a'])]))
+        with patch('pickle.loads', side_effect=AssertionError):
+            self.assertEqual(cache[0], [1, 2, 3])
+            self.assertEqual(cache[1].dtype, np.int32)
+            self.assertEqual(cache[1].tolist(), [0, 1, 2, 3])
+            self.assertEqual(cache[2], [])
+            self.assertEqual(cache[3][0], [5, 6])
+            self.assertEqual(cache[3][1].tolist(), [1.5, 2.5])
+        self.assertEqual(cache[4], ([7], ['a']))
+        self.assertEqual(pickle.loads(cache.pickled(3))[0], [5, 6])
+
+        # The option is ignored if processing is not parallelized.
+        with self.assertWarns(UserWarning):
+            data = MockDataBase(SequenceDataSource(list(zip(
+                numbers_data, string_data))), {
+                    'num_parallel_calls': 0,
+                    'shared_memory_cache': True,
+                })
+        self.assertIsNone(data._shared_cache)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -2,11 +2,22 @@
 Various utilities for data module
 """
 
+import json
+import os
+import pickle
+from array import array
 from enum import Enum
 from typing import (
-    Any, Dict, ItemsView, KeysView, List, Optional, Tuple, Union, ValuesView)
+    Any, Dict, IO, ItemsView, KeysView, List, Optional, Tuple, Union,
+    ValuesView)
 
 import numpy as np
+import torch
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None  # type: ignore
 
 __all__ = [
     'padded_batch',
@@ -14,6 +25,9 @@ __all__ = [
     'Batch',
     '_LazyStrategy',
     '_CacheStrategy',
+    '_file_fingerprint',
+    '_ProcessedExampleStore',
+    '_SharedExampleCache',
 ]
 
 
@@ -125,3 +139,396 @@ class _CacheStrategy(Enum):
     NONE = "none"
     LOADED = "loaded"
     PROCESSED = "processed"
+
+
+def _file_fingerprint(path: str) -> List[Any]:
+    r"""Returns a JSON-serializable fingerprint of a file, consisting of its
+    absolute path, size, and modification time.
+    """
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+class _ProcessedExampleStore:
+    r"""Persistent on-disk store of processed examples, used by
+    :class:`~texar.torch.data.DatasetBase` when ``"cache_dir"`` is set.
+
+    Examples are pickled and appended to a data file in the order they are
+    processed, which need not be the order of their indices. An index file
+    records a pair of int64 values ``(index, end_offset)`` for each stored
+    example, and is only appended after the corresponding data is flushed.
+    Thus an interrupted run leaves at most some trailing bytes in the data
+    file, which are discarded when the store is reopened. Once all examples
+    are stored, the dataset size is written to a metadata file.
+
+    Only one process can write to a store at a time. If the store is locked by
+    another process, examples can still be read but will not be written.
+
+    Args:
+        path (str): Directory of the store.
+    """
+
+    _DATA_FILE = "examples.bin"
+    _INDEX_FILE = "index.bin"
+    _META_FILE = "meta.json"
+    _LOCK_FILE = "lock"
+    # Examples are written in chunks of roughly this number of bytes.
+    _FLUSH_SIZE = 1 << 20
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size: Optional[int] = None
+        self._data_size = 0
+        self._num_entries = 0
+        self._lock_file: Optional[IO[bytes]] = None
+        self._data_file: Optional[IO[bytes]] = None
+        self._index_file: Optional[IO[bytes]] = None
+        self._buffer: List[bytes] = []
+        self._buffer_entries = array('q')
+        self._buffer_size = 0
+
+    def load(self) -> Dict[int, Any]:
+        r"""Reads all stored examples. If the store is complete, :attr:`size`
+        is set to the dataset size.
+
+        Returns:
+            A dictionary mapping indices to examples.
+        """
+        examples: Dict[int, Any] = {}
+        try:
+            with open(os.path.join(self.path, self._META_FILE)) as f:
+                self.size = json.load(f)["size"]
+        except (OSError, ValueError, KeyError):
+            self.size = None
+        entries = array('q')
+        try:
+            with open(os.path.join(self.path, self._INDEX_FILE), 'rb') as f:
+                content = f.read()
+            entry_size = 2 * entries.itemsize
+            entries.frombytes(
+                content[:len(content) // entry_size * entry_size])
+            with open(os.path.join(self.path, self._DATA_FILE), 'rb') as f:
+                offset = 0
+                for idx in range(0, len(entries), 2):
+                    index, end = entries[idx], entries[idx + 1]
+                    record = f.read(end - offset)
+                    if len(record) != end - offset:
+                        break
+                    examples[index] = pickle.loads(record)
+                    offset = end
+                    self._num_entries += 1
+            self._data_size = offset
+        except OSError:
+            self._num_entries = 0
+            self._data_size = 0
+        if self.size is not None and not (
+                len(examples) == self.size and
+                all(0 <= index < self.size for index in examples)):
+            # Metadata does not match the stored examples.
+            self.size = None
+        return examples
+
+    def open(self) -> bool:
+        r"""Opens the store for writing, discarding any incomplete writes.
+        This should be called after :meth:`load`.
+
+        Returns:
+            `True` if the store can be written to, `False` if it is locked
+            by another process.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        self._lock_file = open(os.path.join(self.path, self._LOCK_FILE), 'wb')
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lock_file.close()
+                self._lock_file = None
+                return False
+
+        def _open_truncated(name: str, size: int):
+            path = os.path.join(self.path, name)
+            f = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+            f.truncate(size)
+            f.seek(size)
+            return f
+
+        self._data_file = _open_truncated(self._DATA_FILE, self._data_size)
+        self._index_file = _open_truncated(
+            self._INDEX_FILE, self._num_entries * 2 * array('q').itemsize)
+        return True
+
+    @property
+    def writable(self) -> bool:
+        r"""Whether the store is opened for writing.
+        """
+        return self._data_file is not None
+
+    def write(self, indices: List[int], examples: List[Any]) -> None:
+        r"""Stores processed examples. Writes are buffered, call
+        :meth:`flush` to ensure examples are written to disk.
+        """
+        if not self.writable:
+            return
+        self.write_records(indices, [
+            pickle.dumps(example, protocol=pickle.HIGHEST_PROTOCOL)
+            for example in examples])
+
+    def write_records(self, indices: List[int], records: List[Any]) -> None:
+        r"""Stores already pickled examples. ``records`` can be any
+        bytes-like objects.
+        """
+        if not self.writable:
+            return
+        for index, record in zip(indices, records):
+            self._buffer.append(record)
+            self._buffer_size += len(record)
+            self._buffer_entries.extend(
+                (index, self._data_size + self._buffer_size))
+        if self._buffer_size >= self._FLUSH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        r"""Writes buffered examples to disk.
+        """
+        if not self.writable or len(self._buffer) == 0:
+            return
+        assert self._data_file is not None and self._index_file is not None
+        self._data_file.writelines(self._buffer)
+        self._data_file.flush()
+        self._index_file.write(self._buffer_entries.tobytes())
+        self._index_file.flush()
+        self._data_size += self._buffer_size
+        self._num_entries += len(self._buffer)
+        self._buffer = []
+        self._buffer_entries = array('q')
+        self._buffer_size = 0
+
+    def finalize(self, size: int) -> None:
+        r"""Marks the store as complete with :attr:`size` examples, and closes
+        it.
+        """
+        if not self.writable:
+            return
+        self.flush()
+        meta_path = os.path.join(self.path, self._META_FILE)
+        with open(meta_path + ".tmp", 'w') as f:
+            json.dump({"size": size}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        self.size = size
+        self.close()
+
+    def close(self) -> None:
+        r"""Flushes buffered examples and releases the store.
+        """
+        self.flush()
+        for f in [self._data_file, self._index_file, self._lock_file]:
+            if f is not None:
+                f.close()
+        self._data_file = self._index_file = self._lock_file = None
+
+    def __getstate__(self):
+        # Worker processes only read examples from the dataset, so file
+        # handles are not passed on.
+        state = self.__dict__.copy()
+        state.update(_lock_file=None, _data_file=None, _index_file=None,
+                     _buffer=[], _buffer_entries=array('q'), _buffer_size=0)
+        return state
+
+
+class _SharedExampleCache:
+    r"""Cache of processed examples in shared memory, used by
+    :class:`~texar.torch.data.DatasetBase` when ``"shared_memory_cache"`` is
+    set.
+
+    Examples are encoded into records appended to a small number of large
+    shared memory segments, and decoded upon access. Lists of integers (e.g.,
+    token IDs) and 1-D numeric NumPy arrays are stored as raw arrays, and
+    tuples of such fields are stored field by field, so that they are decoded
+    without unpickling. Other examples are pickled. Worker processes of
+    :class:`~texar.torch.data.DataIterator` read examples directly from the
+    segments, instead of inheriting or receiving a copy of every cached
+    Python object. Examples processed in workers are returned packed into a
+    single tensor (see :meth:`pack`), which PyTorch transfers through shared
+    memory without pickling, and are copied into the segments as raw bytes.
+    """
+
+    # The first byte of each record indicates how the example is encoded.
+    _PICKLED = 0
+    _INT_LIST = 1
+    _ARRAY = 2
+    _TUPLE = 3
+
+    # Sizes of newly allocated segments grow with the amount of stored data,
+    # within these bounds.
+    _MIN_SEGMENT_SIZE = 1 << 20
+    _MAX_SEGMENT_SIZE = 1 << 28
+
+    def __init__(self):
+        self._segments: List[torch.Tensor] = []
+        self._arrays: List[np.ndarray] = []
+        self._used = 0
+        self._data_size = 0
+        self._num_examples = 0
+        # Location of the example with each index. A segment ID of -1 means
+        # the example is not cached.
+        self._segment_ids = array('q')
+        self._starts = array('q')
+        self._ends = array('q')
+
+    @staticmethod
+    def pack(examples: List[Any]) -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Pickles examples into a byte tensor, to be passed to
+        :meth:`add`.
+
+        Returns:
+            A tuple of two tensors: the concatenated records of examples, and
+            the end offset of each example.
+        """
+        records = [_SharedExampleCache.encode(example)
+                   for example in examples]
+        offsets = np.cumsum([len(record) for record in records],
+                            dtype=np.int64)
+        data = np.frombuffer(bytearray(b"".join(records)), dtype=np.uint8)
+        return torch.from_numpy(data), torch.from_numpy(offsets)
+
+    def __len__(self) -> int:
+        return self._num_examples
+
+    def __contains__(self, index: int) -> bool:
+        return (index < len(self._segment_ids) and
+                self._segment_ids[index] != -1)
+
+    @classmethod
+    def encode(cls, example: Any) -> bytes:
+        r"""Encodes an example into a record. See :meth:`decode`.
+        """
+        if (isinstance(example, np.ndarray) and example.ndim == 1 and
+                example.dtype.kind in 'biuf'):
+            dtype = example.dtype.str.encode()
+            return (bytes([cls._ARRAY, len(dtype)]) + dtype +
+                    example.tobytes())
+        if (isinstance(example, list) and
+                all(type(x) is int for x in example)):  # pylint: disable=unidiomatic-typecheck
+            try:
+                data = np.array(example, dtype=np.int64)
+            except OverflowError:
+                pass
+            else:
+                return bytes([cls._INT_LIST]) + data.tobytes()
+        if type(example) is tuple:  # pylint: disable=unidiomatic-typecheck
+            fields = [cls.encode(field) for field in example]
+            ends = np.cumsum([len(field) for field in fields], dtype=np.int64)
+            return (bytes([cls._TUPLE]) +
+                    np.int64(len(fields)).tobytes() + ends.tobytes() +
+                    b"".join(fields))
+        return bytes([cls._PICKLED]) + pickle.dumps(
+            example, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def decode(cls, record: memoryview) -> Any:
+        r"""Decodes an example from a record created by :meth:`encode`.
+        Examples stored as raw arrays are decoded without unpickling.
+        """
+        kind = record[0]
+        if kind == cls._INT_LIST:
+            return np.frombuffer(record[1:], dtype=np.int64).tolist()
+        if kind == cls._ARRAY:
+            dtype_end = 2 + record[1]
+            dtype = np.dtype(bytes(record[2:dtype_end]).decode())
+            return np.frombuffer(record[dtype_end:], dtype=dtype).copy()
+        if kind == cls._TUPLE:
+            num_fields = int(np.frombuffer(record[1:9], dtype=np.int64)[0])
+            data_start = 9 + 8 * num_fields
+            ends = np.frombuffer(
+                record[9:data_start], dtype=np.int64).tolist()
+            return tuple(
+                cls.decode(record[(data_start + start):(data_start + end)])
+                for start, end in zip([0] + ends[:-1], ends))
+        return pickle.loads(record[1:])
+
+    def __getitem__(self, index: int) -> Any:
+        return self.decode(self.record(index))
+
+    def pickled(self, index: int) -> Union[bytes, memoryview]:
+        r"""Returns the pickled example with the given index. Pickled records
+        are returned without copying.
+        """
+        record = self.record(index)
+        if record[0] == self._PICKLED:
+            return record[1:]
+        return pickle.dumps(self.decode(record),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+    def record(self, index: int) -> memoryview:
+        r"""Returns the record of the example with the given index.
+        """
+        if index not in self:
+            raise KeyError(index)
+        array_ = self._arrays[self._segment_ids[index]]
+        return memoryview(array_[self._starts[index]:self._ends[index]])
+
+    def add(self, indices: List[int],
+            examples: Union[List[Any], Tuple[torch.Tensor, torch.Tensor]]) \
+            -> List[int]:
+        r"""Adds examples to the cache. Examples that are already cached are
+        ignored.
+
+        Args:
+            indices: Indices for each example.
+            examples: Either a list of examples, or examples packed by
+                :meth:`pack`.
+
+        Returns:
+            Indices of the newly added examples.
+        """
+        if isinstance(examples, tuple):
+            data = examples[0].numpy()
+            ends = examples[1].tolist()
+            records = [data[start:end] for start, end
+                       in zip([0] + ends[:-1], ends)]
+        else:
+            records = [self.encode(example) for example in examples]
+        new_indices = []
+        for index, record in zip(indices, records):
+            if index in self:
+                continue
+            size = len(record)
+            if (len(self._arrays) == 0 or
+                    self._used + size > len(self._arrays[-1])):
+                self._allocate(size)
+            self._arrays[-1][self._used:(self._used + size)] = \
+                np.frombuffer(record, dtype=np.uint8)
+            if index >= len(self._segment_ids):
+                padding = index + 1 - len(self._segment_ids)
+                self._segment_ids.extend([-1] * padding)
+                self._starts.extend([0] * padding)
+                self._ends.extend([0] * padding)
+            self._segment_ids[index] = len(self._arrays) - 1
+            self._starts[index] = self._used
+            self._ends[index] = self._used + size
+            self._used += size
+            self._data_size += size
+            self._num_examples += 1
+            new_indices.append(index)
+        return new_indices
+
+    def _allocate(self, size: int) -> None:
+        segment_size = min(self._MAX_SEGMENT_SIZE,
+                           max(self._MIN_SEGMENT_SIZE, self._data_size))
+        segment = torch.empty(max(size, segment_size), dtype=torch.uint8)
+        segment.share_memory_()
+        self._segments.append(segment)
+        self._arrays.append(segment.numpy())
+        self._used = 0
+
+    def __getstate__(self):
+        # Segments are shared with worker processes through PyTorch
+        # multiprocessing, the NumPy views are recreated on unpickling.
+        state = self.__dict__.copy()
+        del state['_arrays']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._arrays = [segment.numpy() for segment in self._segments]
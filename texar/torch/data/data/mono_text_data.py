@@ -21,7 +21,7 @@ from typing import List, Optional
 import torch
 
 from texar.torch.data.data.data_base import DataSource
-from texar.torch.data.data.dataset_utils import Batch, padded_batch
+from texar.torch.data.data.dataset_utils import Batch
 from texar.torch.data.data.text_data_base import (
     TextDataBase, TextLineDataSource)
 from texar.torch.data.embedding import Embedding
@@ -50,6 +50,7 @@ def _default_mono_text_dataset_hparams():
     return {
         "files": [],
         "compression_type": None,
+        "build_line_index": False,
         "vocab_file": "",
         "embedding_init": Embedding.default_hparams(),
         "delimiter": None,
@@ -169,11 +170,13 @@ class MonoTextData(TextDataBase[List[str], List[str]]):
                     self._hparams.dataset.files,
                     compression_type=self._hparams.dataset.compression_type,
                     delimiter=self._delimiter,
-                    max_length=self._max_seq_length)
+                    max_length=self._max_seq_length,
+                    build_line_index=self._hparams.dataset.build_line_index)
             else:
                 data_source = TextLineDataSource(
                     self._hparams.dataset.files,
-                    compression_type=self._hparams.dataset.compression_type)
+                    compression_type=self._hparams.dataset.compression_type,
+                    build_line_index=self._hparams.dataset.build_line_index)
 
         super().__init__(data_source, hparams, device=device)
 
@@ -188,6 +191,7 @@ class MonoTextData(TextDataBase[List[str], List[str]]):
                 "dataset": {
                     "files": [],
                     "compression_type": None,
+                    "build_line_index": False,
                     "vocab_file": "",
                     "embedding_init": {},
                     "delimiter": None,
@@ -232,6 +236,15 @@ class MonoTextData(TextDataBase[List[str], List[str]]):
           `"compression_type"`: str, optional
               One of `None` (no compression), ``"ZLIB"``, or ``"GZIP"``.
 
+          `"build_line_index"`: bool
+              If `True`, index the byte offsets of lines in the (uncompressed)
+              text files, so that lines can be read in random order without
+              loading the files into memory. The index is saved beside each
+              file and rebuilt when the file changes. This is useful with
+              `"lazy_strategy"` set to `"all"` for large corpora, as it allows
+              shuffling without a shuffle buffer. See
+              :class:`~texar.torch.data.TextLineDataSource` for details.
+
           `"vocab_file"`: str
               Path to vocabulary file. Each line of the file should contain
               one vocabulary token.
@@ -386,11 +399,10 @@ class MonoTextData(TextDataBase[List[str], List[str]]):
         # `_collate` takes care of padding and numericalization.
 
         # If `pad_length` is `None`, pad to the longest sentence in the batch.
-        text_ids = [self._vocab.map_tokens_to_ids_py(sent) for sent in examples]
-        text_ids, lengths = padded_batch(text_ids, self._pad_length,
-                                         pad_value=self._vocab.pad_token_id)
+        text_ids, lengths = self._vocab.map_tokens_to_padded_ids_py(
+            examples, self._pad_length)
         # Also pad the examples
-        pad_length = self._pad_length or max(lengths)
+        pad_length = text_ids.shape[1]
         examples = [
             sent + [''] * (pad_length - len(sent))
             if len(sent) < pad_length else sent
@@ -398,7 +410,7 @@ class MonoTextData(TextDataBase[List[str], List[str]]):
         ]
 
         text_ids = torch.from_numpy(text_ids)
-        lengths = torch.tensor(lengths, dtype=torch.long)
+        lengths = torch.from_numpy(lengths)
         batch = {self.text_name: examples, self.text_id_name: text_ids,
                  self.length_name: lengths}
         return Batch(len(examples), batch=batch)
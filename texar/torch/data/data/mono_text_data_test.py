@@ -2,6 +2,8 @@
 Unit tests for data related operations.
 """
 import copy
+import os
+import shutil
 import tempfile
 import unittest
 
@@ -9,6 +11,7 @@ import numpy as np
 
 from texar.torch.data.data.data_iterators import DataIterator
 from texar.torch.data.data.mono_text_data import MonoTextData
+from texar.torch.data.data.text_data_base import TextLineDataSource
 from texar.torch.data.vocabulary import SpecialTokens
 
 
@@ -179,6 +182,54 @@ class MonoTextDataTest(unittest.TestCase):
             {"other_transformations": [upper_func]})
         self._run_and_test(hparams, test_transform=True)
 
+    def test_line_index(self):
+        r"""Tests random access to text files with line index.
+        """
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, 'text.txt')
+            with open(path, 'wb') as f:
+                f.write('a b c\r\n\n词 词 。\nd e f g h\n\nlast'.encode('utf-8'))
+            for max_length in [None, 3]:
+                expected = list(TextLineDataSource(
+                    path, encoding='utf-8', max_length=max_length))
+                source = TextLineDataSource(
+                    path, encoding='utf-8', max_length=max_length,
+                    build_line_index=True)
+                self.assertEqual(len(source), len(expected))
+                for idx in reversed(range(len(expected))):
+                    self.assertEqual(source[idx], expected[idx])
+                self.assertTrue(os.path.exists(
+                    path + TextLineDataSource._INDEX_SUFFIX + '.npy'))
+
+            # Index must be rebuilt when the file changes.
+            with open(path, 'ab') as f:
+                f.write(b' more\nwords')
+            source = TextLineDataSource(
+                path, encoding='utf-8', build_line_index=True)
+            self.assertEqual(len(source), 7)
+            self.assertEqual(source[-1], ['words'])
+            self.assertEqual(source[-2], ['last', 'more'])
+
+            hparams = copy.deepcopy(self._hparams)
+            hparams.update({
+                "batch_size": 2,
+                "lazy_strategy": "all",
+                "cache_strategy": "none",
+                "num_parallel_calls": 2,
+            })
+            hparams["dataset"].update({
+                "files": path,
+                "build_line_index": True,
+            })
+            text_data = MonoTextData(hparams)
+            self.assertEqual(len(text_data), 7)
+            lengths = [length for batch in DataIterator(text_data)
+                       for length in batch.length.tolist()]
+            self.assertEqual(sorted(lengths), [2, 2, 3, 4, 5, 5, 7])
+        finally:
+            shutil.rmtree(test_dir)
+
     def test_list_items(self):
         r"""Tests the item names of the output data.
         """
@@ -194,7 +194,8 @@ class MultiAlignedData(
                 source_i = TextLineDataSource(
                     hparams_i.files,
                     compression_type=hparams_i.compression_type,
-                    delimiter=hparams_i.delimiter)
+                    delimiter=hparams_i.delimiter,
+                    build_line_index=hparams_i.build_line_index)
                 sources.append(source_i)
                 if ((hparams_i.length_filter_mode ==
                      _LengthFilterMode.DISCARD.value) and
@@ -21,7 +21,7 @@ import torch
 
 from texar.torch.data.data.data_base import (
     DataSource, FilterDataSource, ZipDataSource)
-from texar.torch.data.data.dataset_utils import Batch, padded_batch
+from texar.torch.data.data.dataset_utils import Batch
 from texar.torch.data.data.mono_text_data import (
     MonoTextData, _LengthFilterMode, _default_mono_text_dataset_hparams)
 from texar.torch.data.data.text_data_base import (
@@ -188,7 +188,8 @@ class PairedTextData(TextDataBase[Tuple[List[str], List[str]],
                                                   src_hparams.eos_token])
 
         src_data_source = TextLineDataSource(
-            src_hparams.files, compression_type=src_hparams.compression_type)
+            src_hparams.files, compression_type=src_hparams.compression_type,
+            build_line_index=src_hparams.build_line_index)
 
         self._tgt_transforms = tgt_hparams["other_transformations"]
         self._tgt_delimiter = tgt_hparams.delimiter
@@ -202,7 +203,8 @@ class PairedTextData(TextDataBase[Tuple[List[str], List[str]],
                                                   tgt_hparams.eos_token])
 
         tgt_data_source = TextLineDataSource(
-            tgt_hparams.files, compression_type=tgt_hparams.compression_type)
+            tgt_hparams.files, compression_type=tgt_hparams.compression_type,
+            build_line_index=tgt_hparams.build_line_index)
 
         data_source: DataSource[Tuple[List[str], List[str]]]
         data_source = ZipDataSource(  # type: ignore
@@ -233,6 +235,7 @@ class PairedTextData(TextDataBase[Tuple[List[str], List[str]],
                 "source_dataset": {
                     "files": [],
                     "compression_type": None,
+                    "build_line_index": False,
                     "vocab_file": "",
                     "embedding_init": {},
                     "delimiter": None,
@@ -390,13 +393,10 @@ class PairedTextData(TextDataBase[Tuple[List[str], List[str]],
 
         # If `pad_length` is `None`, pad to the longest sentence in the batch.
         src_examples = [example[0] for example in examples]
-        source_ids = [self._src_vocab.map_tokens_to_ids_py(sent) for sent
-                      in src_examples]
         source_ids, source_lengths = \
-            padded_batch(source_ids,
-                         self._src_pad_length,
-                         pad_value=self._src_vocab.pad_token_id)
-        src_pad_length = self._src_pad_length or max(source_lengths)
+            self._src_vocab.map_tokens_to_padded_ids_py(
+                src_examples, self._src_pad_length)
+        src_pad_length = source_ids.shape[1]
         src_examples = [
             sent + [''] * (src_pad_length - len(sent))
             if len(sent) < src_pad_length else sent
@@ -404,16 +404,13 @@ class PairedTextData(TextDataBase[Tuple[List[str], List[str]],
         ]
 
         source_ids = torch.from_numpy(source_ids)
-        source_lengths = torch.tensor(source_lengths, dtype=torch.long)
+        source_lengths = torch.from_numpy(source_lengths)
 
         tgt_examples = [example[1] for example in examples]
-        target_ids = [self._tgt_vocab.map_tokens_to_ids_py(sent) for sent
-                      in tgt_examples]
         target_ids, target_lengths = \
-            padded_batch(target_ids,
-                         self._tgt_pad_length,
-                         pad_value=self._tgt_vocab.pad_token_id)
-        tgt_pad_length = self._tgt_pad_length or max(target_lengths)
+            self._tgt_vocab.map_tokens_to_padded_ids_py(
+                tgt_examples, self._tgt_pad_length)
+        tgt_pad_length = target_ids.shape[1]
         tgt_examples = [
             sent + [''] * (tgt_pad_length - len(sent))
             if len(sent) < tgt_pad_length else sent
@@ -421,7 +418,7 @@ class PairedTextData(TextDataBase[Tuple[List[str], List[str]],
         ]
 
         target_ids = torch.from_numpy(target_ids)
-        target_lengths = torch.tensor(target_lengths, dtype=torch.long)
+        target_lengths = torch.from_numpy(target_lengths)
 
         return Batch(len(examples), source_text=src_examples,
                      source_text_ids=source_ids, source_length=source_lengths,
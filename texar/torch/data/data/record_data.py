@@ -14,19 +14,24 @@
 """
 Data class that supports reading pickled data as record structures.
 """
+import bisect
 import copy
 import io
+import json
+import os
 import pickle
 import warnings
 from enum import Enum
 from typing import (
-    Any, Callable, Dict, List, NamedTuple, Optional, Tuple, TypeVar, Union)
+    Any, BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple,
+    TypeVar, Union)
 
 import numpy as np
 import torch
 
 from texar.torch.data.data.data_base import DatasetBase, DataSource
-from texar.torch.data.data.dataset_utils import Batch, padded_batch
+from texar.torch.data.data.dataset_utils import (
+    Batch, _file_fingerprint, padded_batch)
 from texar.torch.hyperparams import HParams
 from texar.torch.utils.dtypes import get_numpy_dtype
 from texar.torch.utils.types import MaybeList
@@ -34,6 +39,7 @@ from texar.torch.utils.types import MaybeList
 __all__ = [
     "_default_record_dataset_hparams",
     "PickleDataSource",
+    "MemmapRecordDataSource",
     "RecordData",
 ]
 
@@ -118,6 +124,10 @@ class PickleDataSource(DataSource[RawExample]):
                         except EOFError:
                             break
 
+    def fingerprint(self) -> List:
+        return [[_file_fingerprint(path) for path in self._file_paths],
+                self._lists_are_examples, repr(self._pickle_kwargs)]
+
 
 TransformFn = Callable[[bytes], torch.ByteTensor]
 
@@ -297,6 +307,140 @@ def _check_shape(tensor: np.ndarray, key: str, descriptor: FeatureDescription):
                 f"feature {key}, but received tensor of shape {tensor.shape}")
 
 
+_MEMMAP_INDEX = "index.json"
+
+
+class _ColumnKind(Enum):
+    Fixed = "fixed"  # fixed-shape tensors stored contiguously
+    Ragged = "ragged"  # variable-length tensors, indexed by row offsets
+    Pickled = "pickled"  # arbitrary objects, indexed by byte offsets
+
+
+def _get_column_kind(descriptor: FeatureDescription) -> _ColumnKind:
+    if (descriptor.collate_method is CollateMethod.List or
+            np.dtype(descriptor.dtype).kind in 'OSU'):
+        return _ColumnKind.Pickled
+    if descriptor.collate_method is CollateMethod.StackedTensor:
+        return _ColumnKind.Fixed
+    return _ColumnKind.Ragged
+
+
+class MemmapRecordDataSource(DataSource[Dict[str, Any]]):
+    r"""Data source for reading from (multiple) record directories written by
+    :meth:`RecordData.memmap_writer`.
+
+    Each feature is stored as a separate column in the directory. Fixed-shape
+    ``"stacked_tensor"`` features are stored as contiguous arrays, and other
+    features are stored in flat buffers indexed by per-example offsets. All
+    columns are memory-mapped, so examples are read from disk on access and
+    the dataset does not need to fit into memory.
+
+    This data source supports indexing. Numeric features are returned as NumPy
+    arrays that are views into the memory-mapped files, without copying.
+
+    Args:
+        dir_paths (str or list[str]): Paths to record directories.
+    """
+
+    def __init__(self, dir_paths: MaybeList[str]):
+        if isinstance(dir_paths, str):
+            dir_paths = [dir_paths]
+        self._dir_paths = dir_paths
+        self._metadata = []
+        for path in dir_paths:
+            with open(os.path.join(path, _MEMMAP_INDEX)) as f:
+                self._metadata.append(json.load(f))
+        self._cumulative_sizes = np.cumsum(
+            [meta["num_examples"] for meta in self._metadata]).tolist()
+        # Memory maps are opened lazily, so that each worker process maps the
+        # files on its own instead of receiving pickled copies of the arrays.
+        self._columns: Optional[List[Dict[str, Tuple[np.ndarray, ...]]]] = None
+
+    @staticmethod
+    def _open_array(path: str, dtype: np.dtype, shape: Tuple[int, ...]) \
+            -> np.ndarray:
+        if int(np.prod(shape)) == 0:
+            # Empty files cannot be memory-mapped.
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+    def _open_columns(self) -> List[Dict[str, Tuple[np.ndarray, ...]]]:
+        all_columns = []
+        for path, meta in zip(self._dir_paths, self._metadata):
+            num_examples = meta["num_examples"]
+            # Fixed-size columns are stored as `(data,)`, and variable-size
+            # columns as `(data, offsets)`.
+            columns: Dict[str, Tuple[np.ndarray, ...]] = {}
+            for key, column in meta["features"].items():
+                prefix = os.path.join(path, column["file"])
+                kind = _ColumnKind(column["kind"])
+                if kind is _ColumnKind.Fixed:
+                    columns[key] = (self._open_array(
+                        prefix + ".data", np.dtype(column["dtype"]),
+                        (num_examples, *column["shape"])),)
+                    continue
+                offsets = self._open_array(
+                    prefix + ".offsets", np.dtype(np.int64),
+                    (num_examples + 1,))
+                total = int(offsets[-1])
+                if kind is _ColumnKind.Ragged:
+                    data = self._open_array(
+                        prefix + ".data", np.dtype(column["dtype"]),
+                        (total, *column["shape"]))
+                else:
+                    data = self._open_array(
+                        prefix + ".data", np.dtype(np.uint8), (total,))
+                columns[key] = (data, offsets)
+            all_columns.append(columns)
+        return all_columns
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_columns"] = None
+        return state
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(
+                f"Data index ({index}) out of range [0, {size})")
+        if self._columns is None:
+            self._columns = self._open_columns()
+        file_idx = bisect.bisect_right(self._cumulative_sizes, index)
+        if file_idx > 0:
+            index -= self._cumulative_sizes[file_idx - 1]
+        columns = self._columns[file_idx]
+        features = self._metadata[file_idx]["features"]
+
+        example = {}
+        for key, column in columns.items():
+            if len(column) == 1:
+                example[key] = np.asarray(column[0][index])
+                continue
+            data, offsets = column
+            start, end = int(offsets[index]), int(offsets[index + 1])
+            if features[key]["kind"] == _ColumnKind.Ragged.value:
+                example[key] = np.asarray(data[start:end])
+            else:
+                example[key] = pickle.loads(data[start:end].tobytes())
+        return example
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __len__(self) -> int:
+        if len(self._cumulative_sizes) == 0:
+            return 0
+        return self._cumulative_sizes[-1]
+
+    def fingerprint(self) -> List:
+        return [_file_fingerprint(os.path.join(path, _MEMMAP_INDEX))
+                for path in self._dir_paths]
+
+
 class RecordData(DatasetBase[Dict[str, Any], Dict[str, Any]]):
     r"""Record data which loads and processes pickled files.
 
@@ -419,8 +563,13 @@ class RecordData(DatasetBase[Dict[str, Any], Dict[str, Any]]):
         self._other_transforms = self._hparams.dataset.other_transformations
 
         if data_source is None:
-            data_source = PickleDataSource[Dict[str, Any]](
-                self._hparams.dataset.files)
+            files = self._hparams.dataset.files
+            if isinstance(files, str):
+                files = [files]
+            if len(files) > 0 and all(os.path.isdir(path) for path in files):
+                data_source = MemmapRecordDataSource(files)
+            else:
+                data_source = PickleDataSource[Dict[str, Any]](files)
 
         super().__init__(data_source, hparams, device)
 
@@ -448,6 +597,153 @@ class RecordData(DatasetBase[Dict[str, Any], Dict[str, Any]]):
                 converted[key] = value
             pickle.dump(converted, self._file_handle)
 
+    class _MemmapRecordWriter:
+        def __init__(self, dir_path: str,
+                     features: Dict[str, FeatureDescription]):
+            self._dir_path = dir_path
+            self._features = features
+            self._kinds = {key: _get_column_kind(descriptor)
+                           for key, descriptor in features.items()}
+            # Shapes (excluding the first dimension for ragged columns) are
+            # taken from the first example if not specified.
+            self._shapes: Dict[str, Optional[Tuple[int, ...]]] = {
+                key: None for key in features}
+            self._offsets = {key: 0 for key in features}
+            self._num_examples = 0
+            os.makedirs(dir_path, exist_ok=True)
+            self._data_handles: Dict[str, BinaryIO] = {}
+            self._offset_handles: Dict[str, BinaryIO] = {}
+            for idx, (key, kind) in enumerate(self._kinds.items()):
+                prefix = os.path.join(dir_path, str(idx))
+                self._data_handles[key] = open(prefix + ".data", 'wb')
+                if kind is not _ColumnKind.Fixed:
+                    handle = open(prefix + ".offsets", 'wb')
+                    handle.write(np.int64(0).tobytes())
+                    self._offset_handles[key] = handle
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            self.close()
+
+        def _check_column_shape(self, key: str, shape: Tuple[int, ...]):
+            expected = self._shapes[key]
+            if expected is None:
+                self._shapes[key] = shape
+            elif shape != expected:
+                raise ValueError(
+                    f"Expected tensor of shape {expected} for feature {key}, "
+                    f"but received tensor of shape {shape}")
+
+        def write(self, example: Dict[str, Any]):
+            for key, descriptor in self._features.items():
+                value = example[key]
+                kind = self._kinds[key]
+                if descriptor.collate_method is not CollateMethod.List:
+                    value = np.asarray(value, dtype=descriptor.dtype)
+                    _check_shape(value, key, descriptor)
+                if kind is _ColumnKind.Pickled:
+                    data = pickle.dumps(value)
+                    self._offsets[key] += len(data)
+                elif kind is _ColumnKind.Fixed:
+                    self._check_column_shape(key, value.shape)
+                    data = np.ascontiguousarray(value).tobytes()
+                else:
+                    if value.ndim == 0:
+                        raise ValueError(
+                            f"Expected tensor of at least 1 dimension for "
+                            f"feature {key}, but received a scalar")
+                    self._check_column_shape(key, value.shape[1:])
+                    data = np.ascontiguousarray(value).tobytes()
+                    self._offsets[key] += value.shape[0]
+                self._data_handles[key].write(data)
+                if kind is not _ColumnKind.Fixed:
+                    self._offset_handles[key].write(
+                        np.int64(self._offsets[key]).tobytes())
+            self._num_examples += 1
+
+        def close(self) -> None:
+            for handle in self._data_handles.values():
+                handle.close()
+            for handle in self._offset_handles.values():
+                handle.close()
+            features = {}
+            for idx, (key, descriptor) in enumerate(self._features.items()):
+                kind = self._kinds[key]
+                column: Dict[str, Any] = {"file": str(idx), "kind": kind.value}
+                if kind is not _ColumnKind.Pickled:
+                    shape = self._shapes[key]
+                    if shape is None:  # no examples written
+                        shape = descriptor.shape or ()
+                    column["dtype"] = np.dtype(descriptor.dtype).str
+                    column["shape"] = list(shape)
+                features[key] = column
+            # The index is written last, so incomplete directories can't be
+            # mistaken for valid records.
+            with open(os.path.join(self._dir_path, _MEMMAP_INDEX), 'w') as f:
+                json.dump({"num_examples": self._num_examples,
+                           "features": features}, f)
+
+    @classmethod
+    def memmap_writer(cls, dir_path: str,
+                      feature_types: Dict[str, Tuple[Any, ...]]) \
+            -> '_MemmapRecordWriter':
+        r"""Construct a writer object that saves records in a columnar,
+        memory-mappable format. The written directory can be read by
+        :class:`MemmapRecordDataSource`, which supports random access without
+        loading the whole dataset into memory.
+
+        Each feature is stored in separate files under :attr:`dir_path`:
+
+        - Fixed-shape ``"stacked_tensor"`` features are stored as a contiguous
+          array of shape ``[num_examples, *shape]``.
+        - ``"padded_tensor"`` features are concatenated along the first
+          dimension, with row offsets of each example stored separately.
+        - ``"list"`` features, and features with string or bytes dtypes, are
+          pickled and concatenated, with byte offsets of each example stored
+          separately.
+
+        If shapes of tensor features are not specified in
+        :attr:`feature_types`, they are taken from the first written example.
+
+        Example:
+
+        .. code-block:: python
+
+            dir_path = "data/train"
+            feature_types = {
+                "input_ids": ["int64", "padded_tensor"],
+                "label_ids": ["int64", "stacked_tensor"],
+            }
+            with tx.data.RecordData.memmap_writer(
+                    dir_path, feature_types) as writer:
+                writer.write({
+                    "input_ids": np.random.randint(0, 100, size=50),
+                    "label_ids": np.random.randint(0, 100),
+                })
+
+            hparams = {
+                "dataset": {
+                    "files": dir_path,
+                    "feature_types": feature_types,
+                },
+                "lazy_strategy": "all",
+                "cache_strategy": "none",
+            }
+            data = tx.data.RecordData(hparams)
+
+        Args:
+            dir_path (str): Path to the directory to save the dataset in.
+            feature_types: Feature names and types. Please refer to
+                :meth:`default_hparams` for details.
+
+        Returns:
+            A writer object.
+        """
+        feature_types = _convert_feature_hparams(feature_types)
+        return cls._MemmapRecordWriter(dir_path, feature_types)
+
     @classmethod
     def writer(cls, file_path: str,
                feature_types: Dict[str, Tuple[Any, ...]]) \
@@ -517,7 +813,12 @@ class RecordData(DatasetBase[Dict[str, Any], Dict[str, Any]]):
         1. For the hyperparameters in the :attr:`"dataset"` field:
 
            `"files"`: str or list
-               A (list of) pickled file path(s).
+               A (list of) pickled file path(s), or a (list of) directories
+               written by :meth:`memmap_writer`. Directories are read with
+               :class:`MemmapRecordDataSource`, which supports random access.
+               In this case, set :attr:`"lazy_strategy"` to `"all"` and
+               :attr:`"cache_strategy"` to `"none"` to read examples from disk
+               on demand while still shuffling over the entire dataset.
 
            `"feature_types"`: dict
                The feature names (`str`) with their descriptions in the form of
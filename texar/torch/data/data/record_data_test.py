@@ -11,7 +11,8 @@ import unittest
 import numpy as np
 import torch
 
-from texar.torch.data.data.record_data import RecordData
+from texar.torch.data.data.record_data import (
+    MemmapRecordDataSource, RecordData)
 from texar.torch.data.data.data_iterators import DataIterator
 from texar.torch.data.data_utils import maybe_download
 from texar.torch.utils import get_numpy_dtype
@@ -191,5 +192,103 @@ class RecordDataTest(unittest.TestCase):
         self._run_and_test(hparams)
 
 
+class MemmapRecordDataTest(unittest.TestCase):
+    """Tests RecordData with the memory-mapped record format.
+    """
+
+    def setUp(self):
+        self._test_dir = tempfile.mkdtemp()
+        self._feature_types = {
+            'input_ids': ('int64', 'padded_tensor'),
+            'label': ('int64', 'stacked_tensor'),
+            'mask': ('float32', 'stacked_tensor', 3),
+            'name': ('str', 'stacked_tensor'),
+            'tags': (None, 'list'),
+        }
+        self._examples = []
+        self._dir_paths = []
+        rng = np.random.RandomState(0)
+        for file_idx in range(2):
+            dir_path = os.path.join(self._test_dir, f'data_{file_idx}')
+            self._dir_paths.append(dir_path)
+            with RecordData.memmap_writer(
+                    dir_path, self._feature_types) as writer:
+                for _ in range(5 + file_idx):
+                    idx = len(self._examples)
+                    example = {
+                        'input_ids': rng.randint(100, size=rng.randint(1, 8)),
+                        'label': idx,
+                        'mask': rng.rand(3).astype(np.float32),
+                        'name': f'example_{idx}',
+                        'tags': ['tag'] * idx,
+                    }
+                    writer.write(example)
+                    self._examples.append(example)
+
+    def tearDown(self):
+        shutil.rmtree(self._test_dir)
+
+    def _check_example(self, example, idx):
+        expected = self._examples[idx]
+        np.testing.assert_array_equal(
+            example['input_ids'], expected['input_ids'])
+        self.assertEqual(int(example['label']), idx)
+        np.testing.assert_array_equal(example['mask'], expected['mask'])
+        self.assertEqual(str(example['name']), expected['name'])
+        self.assertEqual(example['tags'], expected['tags'])
+
+    def test_data_source(self):
+        """Tests random access into the data source.
+        """
+        source = MemmapRecordDataSource(self._dir_paths)
+        self.assertEqual(len(source), len(self._examples))
+        for idx in [7, 0, 10, 4, 5, -1]:
+            self._check_example(source[idx], idx % len(self._examples))
+        for idx, example in enumerate(source):
+            self._check_example(example, idx)
+        with self.assertRaises(IndexError):
+            _ = source[len(self._examples)]
+
+    def test_shape_mismatch(self):
+        """Tests that inconsistent shapes are rejected by the writer.
+        """
+        dir_path = os.path.join(self._test_dir, 'invalid')
+        with RecordData.memmap_writer(
+                dir_path, {'x': ('int64', 'stacked_tensor')}) as writer:
+            writer.write({'x': [1, 2]})
+            with self.assertRaises(ValueError):
+                writer.write({'x': [1, 2, 3]})
+
+    def test_shuffle(self):
+        """Tests shuffled lazy iteration with multiple workers.
+        """
+        for num_parallel_calls in [0, 2]:
+            hparams = {
+                'batch_size': 3,
+                'shuffle': True,
+                'lazy_strategy': 'all',
+                'cache_strategy': 'none',
+                'num_parallel_calls': num_parallel_calls,
+                'dataset': {
+                    'files': self._dir_paths,
+                    'feature_types': self._feature_types,
+                },
+            }
+            data = RecordData(hparams)
+            self.assertIsInstance(data._source, MemmapRecordDataSource)
+            labels = []
+            for batch in DataIterator(data):
+                self.assertIsInstance(batch['input_ids'], torch.Tensor)
+                self.assertEqual(batch['mask'].size()[1:], (3,))
+                for idx, label in enumerate(batch['label'].tolist()):
+                    length = len(self._examples[label]['input_ids'])
+                    self.assertEqual(
+                        batch['input_ids'][idx, :length].tolist(),
+                        self._examples[label]['input_ids'].tolist())
+                    self.assertEqual(batch['tags'][idx], ['tag'] * label)
+                labels.extend(batch['label'].tolist())
+            self.assertEqual(sorted(labels), list(range(len(self._examples))))
+
+
 if __name__ == "__main__":
     unittest.main()
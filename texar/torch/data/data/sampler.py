@@ -18,7 +18,8 @@ Various sampler classes.
 # pylint: disable=protected-access
 
 from typing import (
-    Any, Callable, Generic, Iterator, List, Optional, Tuple, TypeVar, Union)
+    Any, Callable, Dict, Generic, Iterator, List, Optional, Sequence, Tuple,
+    TypeVar, Union)
 
 import torch
 from torch.utils.data import sampler as torch_sampler
@@ -29,6 +30,7 @@ from texar.torch.data.data.data_base import DatasetBase
 __all__ = [
     "BatchingStrategy",
     "TokenCountBatchingStrategy",
+    "BucketBatchingStrategy",
 ]
 
 Example = TypeVar('Example')
@@ -47,6 +49,8 @@ class SamplerBase(torch_sampler.Sampler, Generic[Example]):
     - Returning raw examples when required.
     - Creating iterators with unknown dataset size.
 
+    - Sharding examples across multiple processes (see :meth:`shard`).
+
     This class is used internally in
     :class:`~texar.torch.data.data.DataIterator`. It calls the
     :meth:`~texar.torch.data.data.DatasetBase._prefetch_source` method to ensure
@@ -62,6 +66,80 @@ class SamplerBase(torch_sampler.Sampler, Generic[Example]):
 
         self._data = data
         self.size = None
+        self._num_shards = 1
+        self._shard_index = 0
+        self._shard_seed = 0
+        self._epoch = 0
+        # The random number generator used for shuffling when sharding is
+        # enabled. If `None`, the global generator is used.
+        self._generator: Optional[torch.Generator] = None
+
+    def shard(self, num_shards: int, shard_index: int, seed: int = 0) -> None:
+        r"""Only sample examples belonging to a single shard. This is used for
+        distributed training, where each process iterates over a different
+        shard of the dataset.
+
+        The sampled sequence of examples is split into consecutive groups of
+        :attr:`num_shards` examples, and the shard with index
+        :attr:`shard_index` contains the :attr:`shard_index`-th example of each
+        group. Examples in the final incomplete group are dropped, so that all
+        shards contain the same number of examples.
+
+        The random number generator used for shuffling is seeded with
+        :attr:`seed` plus the number of previous epochs, so that processes
+        sample the same sequence and shards do not overlap.
+
+        Args:
+            num_shards: The total number of shards.
+            shard_index: The index of the shard to sample, in range
+                ``[0, num_shards)``.
+            seed: The random seed used for shuffling. Must be the same for all
+                shards.
+        """
+        if not 0 <= shard_index < num_shards:
+            raise ValueError(
+                f"`shard_index` must be in range [0, {num_shards})")
+        self._num_shards = num_shards
+        self._shard_index = shard_index
+        self._shard_seed = seed
+
+    def _shard_iterator(self, iterator: Iterator[int]) -> Iterator[int]:
+        group_size = 0
+        for index in iterator:
+            if group_size == self._shard_index:
+                shard_example = index
+            group_size += 1
+            if group_size == self._num_shards:
+                yield shard_example
+                group_size = 0
+
+    def _randperm(self, n: int) -> List[int]:
+        r"""Return a random permutation of integers from 0 to :attr:`n` - 1,
+        drawn from the shuffling generator.
+        """
+        if self._generator is None:
+            return torch.randperm(n).tolist()
+        return torch.randperm(n, generator=self._generator).tolist()
+
+    def _randint(self, high: int) -> int:
+        r"""Return a random integer from 0 to :attr:`high` - 1, drawn from the
+        shuffling generator.
+        """
+        if self._generator is None:
+            return torch.randint(high, (1,)).item()
+        return torch.randint(high, (1,), generator=self._generator).item()
+
+    def _fork_generator(self) -> Optional[torch.Generator]:
+        r"""Return a new generator seeded from the shuffling generator, or
+        `None` if the global generator is used. This is used by batch
+        samplers to shuffle batches, so that the order is determined by the
+        shard seed without affecting the sequence of sampled examples.
+        """
+        if self._generator is None:
+            return None
+        generator = torch.Generator()
+        generator.manual_seed(self._randint(2 ** 62))
+        return generator
 
     def _iterator_given_size(self, size: int) -> Iterator[int]:
         r"""Return an iterator that generates samples when the dataset size
@@ -85,7 +163,18 @@ class SamplerBase(torch_sampler.Sampler, Generic[Example]):
         r"""Return an iterator based on the dataset settings.
         """
         self.size = self._data._dataset_size
-        if (not self._data._fully_cached or
+        if self._num_shards > 1:
+            # All shards must sample the same sequence, so a separate generator
+            # is seeded for each epoch. This does not affect the global RNG.
+            self._generator = torch.Generator()
+            self._generator.manual_seed(self._shard_seed + self._epoch)
+            self._epoch += 1
+        if (self.size is not None and self._data._supports_random_access and
+                not self._data._should_call_prefetch_processed):
+            # Data source supports random access, so examples can be loaded
+            # in arbitrary order even if lazy loading is used.
+            iterator = self._iterator_given_size(self.size)
+        elif (not self._data._fully_cached or
                 self._data._should_call_prefetch_source):
             self._data._start_iteration()
             # First epoch of lazy loading, calling prefetch, and returning
@@ -96,6 +185,9 @@ class SamplerBase(torch_sampler.Sampler, Generic[Example]):
             assert self.size is not None
             iterator = self._iterator_given_size(self.size)
 
+        if self._num_shards > 1:
+            iterator = self._shard_iterator(iterator)
+
         if self._data._should_call_prefetch_processed:
             # Processing routine is performed in main process. Yield
             # processed examples instead.
@@ -112,7 +204,7 @@ class SamplerBase(torch_sampler.Sampler, Generic[Example]):
 
     def __len__(self):
         if self.size is not None:
-            return self.size
+            return self.size // self._num_shards
         raise AttributeError("Dataset size cannot be determined at this point")
 
 
@@ -159,8 +251,15 @@ class RandomSampler(SamplerBase[Example]):
             data, replacement, num_samples)
 
     def _iterator_given_size(self, size: int) -> Iterator[int]:
-        del size  # not used
-        return iter(self._sampler)
+        if self._generator is None:
+            return iter(self._sampler)
+        # `torch.utils.data.RandomSampler` draws from the global generator, so
+        # sampling is performed here instead.
+        num_samples = self._sampler.num_samples
+        if self._sampler.replacement:
+            return iter(torch.randint(
+                size, (num_samples,), generator=self._generator).tolist())
+        return iter(self._randperm(size)[:num_samples])
 
     def _iterator_unknown_size(self) -> Iterator[int]:
         raise TypeError(
@@ -192,22 +291,22 @@ class BufferShuffleSampler(SamplerBase[Example]):
 
     def _iterator_given_size(self, size) -> Iterator[int]:
         if self.buffer_size >= size:
-            yield from iter(torch.randperm(size).tolist())
+            yield from iter(self._randperm(size))
             return
 
         buffer = list(range(self.buffer_size))
         for x in range(self.buffer_size, size):
-            sample = torch.randint(self.buffer_size, (1,)).item()
+            sample = self._randint(self.buffer_size)
             index = buffer[sample]
             yield index
             buffer[sample] = x
-        yield from (buffer[x] for x in torch.randperm(self.buffer_size))
+        yield from (buffer[x] for x in self._randperm(self.buffer_size))
 
     def _iterator_unknown_size(self) -> Iterator[int]:
         buffer = list(range(self.buffer_size))
         x = self.buffer_size
         while True:
-            sample = torch.randint(self.buffer_size, (1,)).item()
+            sample = self._randint(self.buffer_size)
             index = buffer[sample]
             cur_size = self._data._prefetch_source(index)
             if cur_size is not None and index >= cur_size:
@@ -217,7 +316,7 @@ class BufferShuffleSampler(SamplerBase[Example]):
             yield index
             buffer[sample] = x
             x += 1
-        yield from (buffer[x] for x in torch.randperm(self.buffer_size)
+        yield from (buffer[x] for x in self._randperm(self.buffer_size)
                     if buffer[x] < self.size)
 
 
@@ -291,6 +390,119 @@ class TokenCountBatchingStrategy(BatchingStrategy[Example]):
         return True
 
 
+class BucketBatchingStrategy(BatchingStrategy[Example]):
+    r"""Create dynamically-sized batches of examples with similar lengths, so
+    that the number of tokens inside each batch **including padding** is
+    constrained.
+
+    When passed to :class:`~texar.torch.data.DataIterator` (or the
+    :class:`~texar.torch.run.Executor`), examples are drawn from the sampler in
+    windows of :attr:`window_size` examples. Each window is sorted by length
+    and split into batches, and the batches are yielded in shuffled order.
+    Examples inside a batch therefore have similar lengths, which greatly
+    reduces the amount of padding compared to batching examples in arrival
+    order with :class:`TokenCountBatchingStrategy`.
+
+    The strategy keeps track of the number of actual and padded tokens in the
+    batches it creates. See :attr:`padding_ratio`.
+
+    Args:
+        max_tokens (int): The maximum number of tokens inside each batch,
+            including padding. This equals the batch size times the length of
+            the longest example in the batch.
+        max_batch_size (int, optional): The maximum number of examples for each
+            batch. If `None`, batches can contain arbitrary number of examples
+            as long as the number of padded tokens does not exceed
+            :attr:`max_tokens`.
+        length_fn (callable, optional): A function taking a data example as
+            argument, and returning the number of tokens in the example. By
+            default, :python:`len` is used.
+        window_size (int, optional): The number of examples to sort by length
+            at a time. Larger windows result in less padding, but also less
+            randomness and more memory usage. If `None`, the whole dataset is
+            sorted at once. Defaults to `None`.
+        lengths (sequence of int, optional): Precomputed lengths for each
+            example in a random-access dataset, indexed by the example index.
+            If specified, :attr:`length_fn` is not used by the bucketing
+            sampler, and examples are not loaded to compute batch boundaries.
+        shuffle_batches (bool): Whether to shuffle the order of batches created
+            from each window. Defaults to `True`.
+    """
+    max_length: int
+    cur_batch_size: int
+
+    def __init__(self, max_tokens: int, max_batch_size: Optional[int] = None,
+                 length_fn: Optional[Callable[[Example], int]] = None,
+                 window_size: Optional[int] = None,
+                 lengths: Optional[Sequence[int]] = None,
+                 shuffle_batches: bool = True):
+        if window_size is not None and window_size <= 0:
+            raise ValueError("`window_size` must be a positive integer")
+        self.max_tokens = max_tokens
+        self.max_batch_size = max_batch_size
+        self.length_fn: Callable[[Example], int]
+        self.length_fn = length_fn or len  # type: ignore
+        self.window_size = window_size
+        self.lengths = lengths
+        self.shuffle_batches = shuffle_batches
+        self.reset_stats()
+
+    def reset_batch(self) -> None:
+        self.max_length = 0
+        self.cur_batch_size = 0
+
+    def add_example(self, example: Example) -> bool:
+        return self.add_length(self.length_fn(example))
+
+    def add_length(self, length: int) -> bool:
+        r"""Add an example with the given length into the current batch. This
+        is the same as :meth:`add_example`, but takes the length of the example
+        instead of the example itself.
+
+        Args:
+            length: The number of tokens in the example.
+
+        Returns:
+            A boolean value indicating whether the example should be added to
+            the batch.
+        """
+        if self.cur_batch_size == self.max_batch_size:
+            return False
+        max_length = max(self.max_length, length)
+        if (self.cur_batch_size + 1) * max_length > self.max_tokens:
+            return False
+        self.max_length = max_length
+        self.cur_batch_size += 1
+        return True
+
+    def reset_stats(self) -> None:
+        r"""Reset the token counters :attr:`num_tokens` and
+        :attr:`num_padded_tokens`.
+        """
+        self.num_tokens = 0
+        self.num_padded_tokens = 0
+
+    def record_batch(self, lengths: List[int]) -> None:
+        r"""Update the token counters with a created batch. This method is
+        called by the bucketing sampler each time a batch is yielded.
+
+        Args:
+            lengths: Lengths of the examples in the batch.
+        """
+        self.num_tokens += sum(lengths)
+        self.num_padded_tokens += max(lengths) * len(lengths)
+
+    @property
+    def padding_ratio(self) -> float:
+        r"""The fraction of padding tokens among all tokens (including
+        padding) in the batches created since the last call to
+        :meth:`reset_stats`.
+        """
+        if self.num_padded_tokens == 0:
+            return 0.0
+        return 1.0 - self.num_tokens / self.num_padded_tokens
+
+
 class DynamicBatchSampler(torch_sampler.BatchSampler, Generic[Example]):
     r"""A subclass of :torch_docs:`~torch.utils.data.BatchSampler
     <data.html#torch.utils.data.BatchSampler>` that supports dynamic batching
@@ -334,3 +546,104 @@ class DynamicBatchSampler(torch_sampler.BatchSampler, Generic[Example]):
 
     def __len__(self):
         raise TypeError("DynamicBatchSampler does not support __len__")
+
+
+class BucketBatchSampler(DynamicBatchSampler[Example]):
+    r"""A :class:`DynamicBatchSampler` that groups examples of similar lengths
+    into the same batch, using a :class:`BucketBatchingStrategy`. This class is
+    used internally.
+
+    Examples are drawn from :attr:`sampler` in windows of
+    :attr:`strategy.window_size` examples. Each window is sorted by length and
+    split into batches, which are then yielded in shuffled order. As the order
+    of examples within the window is already randomized by the sampler, ties
+    between examples with the same length are also broken randomly.
+
+    Unless :attr:`strategy.lengths` is given, the length of each example is
+    computed once and cached, so that examples are not processed again in
+    later epochs only to compute their lengths.
+
+    Args:
+        dataset: The dataset to create batches from.
+        sampler: An instance of :class:`SamplerBase` that returns indices of
+            each sampled example.
+        strategy: An instance of :class:`BucketBatchingStrategy`.
+    """
+    sampler: SamplerBase
+    strategy: BucketBatchingStrategy[Example]
+
+    def __init__(self, dataset: DatasetBase[Any, Example],
+                 sampler: SamplerBase,
+                 strategy: BucketBatchingStrategy[Example]):
+        super().__init__(dataset, sampler, strategy)
+        self._length_cache: Dict[int, int] = {}
+        # The generator used for shuffling batches. See
+        # :meth:`SamplerBase._fork_generator`.
+        self._generator: Optional[torch.Generator] = None
+
+    def _get_length(self, idx: Union[int, Tuple[int, Example]]) -> int:
+        index = idx[0] if isinstance(idx, tuple) else idx
+        if self.strategy.lengths is not None:
+            return self.strategy.lengths[index]
+        length = self._length_cache.get(index, None)
+        if length is None:
+            # `DatasetBase.__getitem__` accepts both an index and a tuple of
+            # `(index, example)`. The latter does not access the data source.
+            # Cached processed examples are returned without processing.
+            length = self.strategy.length_fn(self.dataset[idx])
+            self._length_cache[index] = length
+        return length
+
+    def _create_batches(self, window: List[Any], lengths: List[int]) \
+            -> Iterator[Tuple[List[Any], List[int]]]:
+        order = sorted(range(len(window)), key=lengths.__getitem__)
+        batches: List[Tuple[List[Any], List[int]]] = []
+        batch: List[Any] = []
+        batch_lengths: List[int] = []
+        self.strategy.reset_batch()
+        for pos in order:
+            while not self.strategy.add_length(lengths[pos]):
+                if len(batch) == 0:
+                    idx = window[pos]
+                    if isinstance(idx, tuple):
+                        idx = idx[0]
+                    raise ValueError(f"Batching strategy refused to add "
+                                     f"example {idx} to empty batch.")
+                batches.append((batch, batch_lengths))
+                batch, batch_lengths = [], []
+                self.strategy.reset_batch()
+            batch.append(window[pos])
+            batch_lengths.append(lengths[pos])
+        if len(batch) > 0:
+            batches.append((batch, batch_lengths))
+            self.strategy.reset_batch()
+        if self.strategy.shuffle_batches:
+            if self._generator is None:
+                permutation = torch.randperm(len(batches)).tolist()
+            else:
+                permutation = torch.randperm(
+                    len(batches), generator=self._generator).tolist()
+            batches = [batches[x] for x in permutation]
+        return iter(batches)
+
+    def __iter__(self) -> Union[Iterator[List[int]],  # type: ignore
+                                Iterator[List[Tuple[int, Example]]]]:
+        window_size = self.strategy.window_size
+        window: List[Any] = []
+        lengths: List[int] = []
+        sampler_iter = iter(self.sampler)
+        # Forked after the sampler seeds its generator for this epoch.
+        self._generator = self.sampler._fork_generator()
+        for idx in sampler_iter:
+            window.append(idx)
+            lengths.append(self._get_length(idx))
+            if window_size is not None and len(window) == window_size:
+                for batch, batch_lengths in self._create_batches(
+                        window, lengths):
+                    self.strategy.record_batch(batch_lengths)
+                    yield batch
+                window, lengths = [], []
+        if len(window) > 0:
+            for batch, batch_lengths in self._create_batches(window, lengths):
+                self.strategy.record_batch(batch_lengths)
+                yield batch
@@ -14,13 +14,18 @@
 """
 Base text data class that is inherited by all text data classes.
 """
+import bisect
 import io
+import json
 import locale
+import os
 from abc import ABC
-from typing import IO, Iterator, List, Optional, TypeVar
+from typing import IO, Iterator, List, Optional, Tuple, TypeVar
 
+import numpy as np
 import torch
 from texar.torch.data.data.data_base import DatasetBase, DataSource
+from texar.torch.data.data.dataset_utils import _file_fingerprint
 from texar.torch.utils.types import MaybeList
 
 __all__ = [
@@ -36,7 +41,8 @@ class TextLineDataSource(DataSource[List[str]]):
     r"""Data source for reading from (multiple) text files. Each line is
     tokenized and yielded as an example.
 
-    This data source does not support indexing.
+    This data source supports indexing only if :attr:`build_line_index` is
+    `True`.
 
     Args:
         file_paths (str or list[str]): Paths to the text files.
@@ -52,13 +58,29 @@ class TextLineDataSource(DataSource[List[str]]):
             is measured as the number of tokens in a line after being
             tokenized using the provided ``delimiter``. Lines with more than
             ``max_length`` tokens will be dropped.
+        build_line_index (bool): If `True`, the byte offsets of lines in each
+            file are indexed, so that the data source supports random access
+            through :meth:`__getitem__` without loading the files into memory.
+            The index is saved beside each file (with suffix ``".lineidx"``)
+            and reused if the file is not modified, which is determined by
+            the size and modification time of the file. If the index cannot
+            be saved (e.g., due to permissions), it is kept in memory only.
+            Default is `False`.
+
+            This is not supported for compressed files. Lines are split on
+            ``"\n"``, so the encoding must be ASCII-compatible (e.g.,
+            UTF-8), and lone ``"\r"`` characters are not treated as line
+            breaks.
     """
 
+    _INDEX_SUFFIX = ".lineidx"
+
     def __init__(self, file_paths: MaybeList[str],
                  compression_type: Optional[str] = None,
                  encoding: Optional[str] = None,
                  delimiter: Optional[str] = None,
-                 max_length: Optional[int] = None):
+                 max_length: Optional[int] = None,
+                 build_line_index: bool = False):
         if compression_type is not None:
             compression_type = compression_type.lower()
             if compression_type not in ['gzip', 'zlib']:
@@ -72,6 +94,129 @@ class TextLineDataSource(DataSource[List[str]]):
         self._max_length = max_length
         self._delimiter = delimiter
 
+        self._line_offsets: Optional[List[np.ndarray]] = None
+        self._cumulative_sizes: List[int] = []
+        self._handles: List[IO[bytes]] = []
+        self._handles_pid: Optional[int] = None
+        if build_line_index:
+            if compression_type is not None:
+                raise ValueError(
+                    "Line index is not supported for compressed files")
+            self._line_offsets = [self._load_or_build_index(path)
+                                  for path in file_paths]
+            self._cumulative_sizes = np.cumsum(
+                [len(offsets) for offsets in self._line_offsets]).tolist()
+
+    def _index_key(self, path: str) -> dict:
+        stat = os.stat(path)
+        return {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "encoding": self._encoding,
+            "delimiter": self._delimiter,
+            "max_length": self._max_length,
+        }
+
+    def _build_index(self, path: str) -> np.ndarray:
+        if self._max_length is None:
+            # Fast path: find line breaks in large binary chunks.
+            chunk_size = 1 << 24
+            offsets = [np.zeros(1, dtype=np.int64)]
+            position = 0
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    breaks = np.flatnonzero(
+                        np.frombuffer(chunk, dtype=np.uint8) == ord('\n'))
+                    offsets.append(breaks.astype(np.int64) + (position + 1))
+                    position += len(chunk)
+            line_offsets = np.concatenate(offsets)
+            # Drop the offset past the final line break.
+            if line_offsets[-1] == position:
+                line_offsets = line_offsets[:-1]
+            return line_offsets
+
+        # Lines have to be tokenized to apply the length filter.
+        kept_offsets = []
+        position = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                tokens = self._decode_line(line).split(self._delimiter)
+                if len(tokens) <= self._max_length:
+                    kept_offsets.append(position)
+                position += len(line)
+        return np.asarray(kept_offsets, dtype=np.int64)
+
+    def _load_or_build_index(self, path: str) -> np.ndarray:
+        index_path = path + self._INDEX_SUFFIX
+        key = self._index_key(path)
+        try:
+            with open(index_path + ".json") as f:
+                if json.load(f) == key:
+                    return np.load(index_path + ".npy", mmap_mode='r')
+        except (OSError, ValueError):
+            pass
+
+        line_offsets = self._build_index(path)
+        try:
+            np.save(index_path + ".npy", line_offsets)
+            # The key is written last, so that a partially written index is
+            # never considered valid.
+            with open(index_path + ".json", 'w') as f:
+                json.dump(key, f)
+        except OSError:
+            pass
+        return line_offsets
+
+    def _decode_line(self, line: bytes) -> str:
+        text = line.decode(self._encoding)
+        # Match universal newlines mode used in `__iter__`.
+        if text.endswith('\r\n'):
+            text = text[:-2] + '\n'
+        return text
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_handles"] = []
+        state["_handles_pid"] = None
+        return state
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        if self._line_offsets is None:
+            raise TypeError("This DataSource does not support random access. "
+                            "Set `build_line_index` to `True` to enable it.")
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(
+                f"Data index ({index}) out of range [0, {size})")
+        file_idx = bisect.bisect_right(self._cumulative_sizes, index)
+        if file_idx > 0:
+            index -= self._cumulative_sizes[file_idx - 1]
+        return file_idx, int(self._line_offsets[file_idx][index])
+
+    def __getitem__(self, index: int) -> List[str]:
+        file_idx, offset = self._locate(index)
+        # File handles share positions with the parent process after forking,
+        # so each process must open its own.
+        if self._handles_pid != os.getpid():
+            self._handles = [open(path, 'rb') for path in self._file_paths]
+            self._handles_pid = os.getpid()
+        f = self._handles[file_idx]
+        f.seek(offset)
+        return self._decode_line(f.readline()).split(self._delimiter)
+
+    def __len__(self) -> int:
+        if self._line_offsets is None:
+            raise TypeError("This DataSource does not support random access. "
+                            "Set `build_line_index` to `True` to enable it.")
+        if len(self._cumulative_sizes) == 0:
+            return 0
+        return self._cumulative_sizes[-1]
+
     class _ZlibWrapper(io.BufferedReader):
         def __init__(self, raw: IO[bytes]):
             super().__init__(raw)  # type: ignore
@@ -150,6 +295,11 @@ class TextLineDataSource(DataSource[List[str]]):
                         continue
                     yield tokens
 
+    def fingerprint(self) -> List:
+        return [[_file_fingerprint(path) for path in self._file_paths],
+                self._compression_type, self._encoding, self._delimiter,
+                self._max_length]
+
 
 class TextDataBase(DatasetBase[RawExample, Example], ABC):
     r"""Base class inherited by all text data classes.
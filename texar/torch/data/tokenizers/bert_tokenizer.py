@@ -20,8 +20,11 @@ Code structure adapted from:
 
 from typing import Any, Dict, List, Optional, Tuple
 
+import multiprocessing
 import os
 
+import numpy as np
+
 from texar.torch.modules.pretrained.bert import PretrainedBERTMixin
 from texar.torch.data.tokenizers.tokenizer_base import TokenizerBase
 from texar.torch.data.tokenizers.bert_tokenizer_utils import \
@@ -270,6 +273,58 @@ class BERTTokenizer(PretrainedBERTMixin, TokenizerBase):
 
         return input_ids, segment_ids, input_mask
 
+    def batch_encode(self,
+                     texts_a: List[str],
+                     texts_b: Optional[List[Optional[str]]] = None,
+                     max_seq_length: Optional[int] = None,
+                     num_workers: int = 0) -> \
+            Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        r"""Encodes a batch of texts or text pairs with :meth:`encode_text`,
+        and stacks the results into arrays.
+
+        Args:
+            texts_a: A list of first input texts.
+            texts_b (optional): A list of second input texts, of the same
+                length as :attr:`texts_a`.
+            max_seq_length: Maximum sequence length.
+            num_workers: Number of worker processes used to encode the texts.
+                If 0 or 1, texts are encoded in the current process.
+                Otherwise, large inputs are split into chunks and encoded in
+                parallel by a process pool.
+
+        Returns:
+            A tuple of `(input_ids, segment_ids, input_mask)`, each a NumPy
+            array of shape `[len(texts_a), max_seq_length]`. See
+            :meth:`encode_text` for details.
+        """
+        if max_seq_length is None:
+            max_seq_length = self.max_len
+        if texts_b is None:
+            texts_b = [None] * len(texts_a)
+        if len(texts_a) != len(texts_b):
+            raise ValueError("`texts_a` and `texts_b` must have the same "
+                             "length")
+        examples = [(text_a, text_b, max_seq_length)
+                    for text_a, text_b in zip(texts_a, texts_b)]
+
+        if num_workers > 1 and \
+                len(examples) >= num_workers * _MIN_EXAMPLES_PER_WORKER:
+            chunk_size = -(-len(examples) // (num_workers * 4))
+            with multiprocessing.Pool(
+                    num_workers, initializer=_init_worker,
+                    initargs=(self,)) as pool:
+                results = pool.map(_encode_example, examples,
+                                   chunksize=chunk_size)
+        else:
+            results = [self.encode_text(*example) for example in examples]
+
+        if len(results) == 0:
+            empty = np.zeros((0, max_seq_length), dtype=np.int64)
+            return empty, empty.copy(), empty.copy()
+        input_ids, segment_ids, input_mask = (
+            np.array(arrays, dtype=np.int64) for arrays in zip(*results))
+        return input_ids, segment_ids, input_mask
+
     @staticmethod
     def default_hparams() -> Dict[str, Any]:
         r"""Returns a dictionary of hyperparameters with default values.
@@ -379,3 +434,22 @@ class BERTTokenizer(PretrainedBERTMixin, TokenizerBase):
             'do_basic_tokenize': True,
             'non_split_tokens': None,
         }
+
+
+# Minimum number of examples for each worker process in
+# :meth:`BERTTokenizer.batch_encode`. Smaller inputs are encoded in the current
+# process, since starting the processes would outweigh the gain.
+_MIN_EXAMPLES_PER_WORKER = 1000
+
+_worker_tokenizer: Optional[BERTTokenizer] = None
+
+
+def _init_worker(tokenizer: BERTTokenizer) -> None:
+    global _worker_tokenizer
+    _worker_tokenizer = tokenizer
+
+
+def _encode_example(example: Tuple[str, Optional[str], int]) -> \
+        Tuple[List[int], List[int], List[int]]:
+    assert _worker_tokenizer is not None
+    return _worker_tokenizer.encode_text(*example)
@@ -8,6 +8,8 @@ import os
 import pickle
 import tempfile
 
+import numpy as np
+
 from texar.torch.data.tokenizers.bert_tokenizer import \
     BERTTokenizer
 from texar.torch.utils.test import pretrained_test
@@ -153,6 +155,23 @@ class BERTTokenizerTest(unittest.TestCase):
         self.assertEqual(tokens[-2],
                          tokenizer.map_token_to_id(tokenizer.pad_token))
 
+    def test_split_on_added_tokens(self):
+        tokenizer = BERTTokenizer.load(self.vocab_file)
+        tokenizer.add_tokens(["xyz", "yzw", "xy", "zzz"])
+
+        # Earlier added tokens take precedence over overlapping later ones.
+        tokens = tokenizer.map_text_to_token(
+            u"lowxyzw runningyzw  xy zzzz [CLS]low")
+        self.assertListEqual(
+            tokens, ["low", "xyz", "[UNK]", "runn", "##ing", "yzw", "xy",
+                     "zzz", "[UNK]", "[CLS]", "low"])
+
+        tokenizer.add_tokens(["zw"])
+        tokens = tokenizer.map_text_to_token(u"xyzw")
+        self.assertListEqual(tokens, ["xyz", "[UNK]"])
+
+        self.assertListEqual(tokenizer.map_text_to_token(u""), [])
+
     def test_encode_text(self):
         tokenizer = BERTTokenizer.load(self.vocab_file)
 
@@ -181,6 +200,24 @@ class BERTTokenizerTest(unittest.TestCase):
         self.assertListEqual(segment_ids, [0, 0, 0, 0, 1, 1, 1])
         self.assertListEqual(input_mask, [1, 1, 1, 1, 1, 1, 1])
 
+    def test_batch_encode(self):
+        tokenizer = BERTTokenizer.load(self.vocab_file)
+
+        texts_a = [u"He is very happy", u"unwanted, running", u"low"]
+        texts_b = [u"unwanted, running", None, u"lowest"]
+
+        for num_workers in [0, 2]:
+            input_ids, segment_ids, input_mask = tokenizer.batch_encode(
+                texts_a, texts_b, max_seq_length=7, num_workers=num_workers)
+            for array in [input_ids, segment_ids, input_mask]:
+                self.assertIsInstance(array, np.ndarray)
+                self.assertEqual(array.shape, (3, 7))
+            for idx, (text_a, text_b) in enumerate(zip(texts_a, texts_b)):
+                expected = tokenizer.encode_text(text_a, text_b, 7)
+                self.assertListEqual(input_ids[idx].tolist(), expected[0])
+                self.assertListEqual(segment_ids[idx].tolist(), expected[1])
+                self.assertListEqual(input_mask[idx].tolist(), expected[2])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -17,7 +17,7 @@ Code structure adapted from:
     `https://github.com/huggingface/pytorch-transformers/blob/master/pytorch_transformers/tokenization_bert.py`
 """
 
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import collections
 import unicodedata
@@ -95,7 +95,10 @@ class BasicTokenizer:
             if self.do_lower_case and token not in never_split:
                 token = token.lower()
                 token = self._run_strip_accents(token)
-            split_tokens.extend(self._run_split_on_punc(token))
+            # Tokens contain no whitespace, so surrounding punctuations with
+            # spaces is equivalent to `_run_split_on_punc` after the
+            # whitespace tokenization below.
+            split_tokens.append(token.translate(_PUNCTUATION_TABLE))
 
         output_tokens = whitespace_tokenize(" ".join(split_tokens))
         return output_tokens
@@ -109,13 +112,7 @@ class BasicTokenizer:
             _run_strip_accents(accented_string)  # 'Malaga'
         """
         text = unicodedata.normalize("NFD", text)
-        output = []
-        for char in text:
-            cat = unicodedata.category(char)
-            if cat == "Mn":
-                continue
-            output.append(char)
-        return "".join(output)
+        return text.translate(_STRIP_ACCENTS_TABLE)
 
     @classmethod
     def _run_split_on_punc(cls, text: str,
@@ -157,16 +154,7 @@ class BasicTokenizer:
             _tokenize_chinese_chars(text)
             # ' 今  天  天  气  不  错 '
         """
-        output = []
-        for char in text:
-            cp = ord(char)
-            if self._is_chinese_char(cp):
-                output.append(" ")
-                output.append(char)
-                output.append(" ")
-            else:
-                output.append(char)
-        return "".join(output)
+        return text.translate(_CHINESE_CHARS_TABLE)
 
     @classmethod
     def _is_chinese_char(cls, cp: int) -> bool:
@@ -201,27 +189,77 @@ class BasicTokenizer:
             _clean_text(text)
             # 'Texar-PyTorch is an open-source toolkit based on PyTorch.'
         """
-        output = []
-        for char in text:
-            cp = ord(char)
-            if cp == 0 or cp == 0xfffd or _is_control(char):
-                continue
-            if _is_whitespace(char):
-                output.append(" ")
-            else:
-                output.append(char)
-        return "".join(output)
+        return text.translate(_CLEAN_TEXT_TABLE)
 
 
 class WordpieceTokenizer:
-    r"""Runs WordPiece tokenization."""
+    r"""Runs WordPiece tokenization.
+
+    Word pieces are matched using prefix tries built from the vocabulary, and
+    the word pieces of recently seen words are kept in a bounded LRU cache.
+
+    Args:
+        vocab: A dictionary mapping word pieces to ids.
+        unk_token: The token used for words that cannot be tokenized.
+        max_input_chars_per_word: Words longer than this are mapped to
+            :attr:`unk_token`.
+        cache_size: Maximum number of words to cache. Set to 0 to disable
+            caching.
+    """
 
     def __init__(self, vocab: Dict[str, int],
                  unk_token: str,
-                 max_input_chars_per_word: int = 100):
+                 max_input_chars_per_word: int = 100,
+                 cache_size: int = 10000):
         self.vocab = vocab
         self.unk_token = unk_token
         self.max_input_chars_per_word = max_input_chars_per_word
+        self.cache_size = cache_size
+
+        # `_trie` matches pieces at the start of a word, and `_suffix_trie`
+        # matches pieces prefixed with "##" (with the prefix removed).
+        self._trie: Dict[str, Any] = {}
+        self._suffix_trie: Dict[str, Any] = {}
+        for token in vocab:
+            self._add_to_trie(self._trie, token, token)
+            if token.startswith("##"):
+                self._add_to_trie(self._suffix_trie, token[2:], token)
+        self._cache: 'collections.OrderedDict[str, List[str]]' = \
+            collections.OrderedDict()
+
+    @staticmethod
+    def _add_to_trie(trie: Dict[str, Any], key: str, token: str) -> None:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[_TRIE_END] = token
+
+    def _tokenize_word(self, word: str) -> List[str]:
+        if len(word) > self.max_input_chars_per_word:
+            return [self.unk_token]
+
+        sub_tokens = []
+        start = 0
+        trie = self._trie
+        while start < len(word):
+            # Walk down the trie to find the longest piece in the vocabulary
+            # starting from `start`.
+            node = trie
+            cur_substr = None
+            end = start
+            for pos in range(start, len(word)):
+                node = node.get(word[pos])
+                if node is None:
+                    break
+                if _TRIE_END in node:
+                    cur_substr = node[_TRIE_END]
+                    end = pos + 1
+            if cur_substr is None:
+                return [self.unk_token]
+            sub_tokens.append(cur_substr)
+            start = end
+            trie = self._suffix_trie
+        return sub_tokens
 
     def tokenize(self, text: str) -> List[str]:
         r"""Tokenizes a piece of text into its word pieces.
@@ -243,35 +281,16 @@ class WordpieceTokenizer:
         output_tokens = []
         for token in whitespace_tokenize(text):
             assert token is not None
-            chars = list(token)
-            if len(chars) > self.max_input_chars_per_word:
-                output_tokens.append(self.unk_token)
-                continue
-
-            is_bad = False
-            start = 0
-            sub_tokens = []
-            while start < len(chars):
-                end = len(chars)
-                cur_substr = None
-                while start < end:
-                    substr = "".join(chars[start:end])
-                    if start > 0:
-                        substr = "##" + substr
-                    if substr in self.vocab:
-                        cur_substr = substr
-                        break
-                    end -= 1
-                if cur_substr is None:
-                    is_bad = True
-                    break
-                sub_tokens.append(cur_substr)
-                start = end
-
-            if is_bad:
-                output_tokens.append(self.unk_token)
+            sub_tokens = self._cache.get(token)
+            if sub_tokens is not None:
+                self._cache.move_to_end(token)
             else:
-                output_tokens.extend(sub_tokens)
+                sub_tokens = self._tokenize_word(token)
+                if self.cache_size > 0:
+                    self._cache[token] = sub_tokens
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            output_tokens.extend(sub_tokens)
         return output_tokens
 
 
@@ -334,3 +353,46 @@ def _is_punctuation(char: str) -> bool:
     if cat.startswith("P"):
         return True
     return False
+
+
+class _CharTable(dict):
+    r"""A translation table for :meth:`str.translate` that computes the
+    replacement of each character with :attr:`fn` on its first lookup, and
+    caches it afterwards.
+    """
+
+    def __init__(self, fn: Callable[[str], Optional[str]]):
+        super().__init__()
+        self._fn = fn
+
+    def __missing__(self, cp: int) -> Optional[str]:
+        value = self._fn(chr(cp))
+        self[cp] = value
+        return value
+
+
+def _clean_char(char: str) -> Optional[str]:
+    cp = ord(char)
+    if cp == 0 or cp == 0xfffd or _is_control(char):
+        return None
+    if _is_whitespace(char):
+        return " "
+    return char
+
+
+def _pad_char(predicate: Callable[[str], bool]) -> \
+        Callable[[str], Optional[str]]:
+    def fn(char: str) -> Optional[str]:
+        return " " + char + " " if predicate(char) else char
+    return fn
+
+
+# Marks the end of a word piece in the tries of `WordpieceTokenizer`.
+_TRIE_END = ""
+
+_CLEAN_TEXT_TABLE = _CharTable(_clean_char)
+_STRIP_ACCENTS_TABLE = _CharTable(
+    lambda char: None if unicodedata.category(char) == "Mn" else char)
+_CHINESE_CHARS_TABLE = _CharTable(
+    _pad_char(lambda char: BasicTokenizer._is_chinese_char(ord(char))))
+_PUNCTUATION_TABLE = _CharTable(_pad_char(_is_punctuation))
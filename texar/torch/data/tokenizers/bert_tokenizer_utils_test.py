@@ -57,6 +57,33 @@ class BERTTokenizerUtilsTest(unittest.TestCase):
         self.assertListEqual(
             tokenizer.tokenize("unwantedX running"), ["[UNK]", "runn", "##ing"])
 
+    def test_wordpiece_tokenizer_cache(self):
+
+        vocab_tokens = [
+            "[UNK]", "[CLS]", "[SEP]", "want", "##want", "##ed", "wa", "un",
+            "runn", "##ing", "##"
+        ]
+
+        vocab = {}
+        for (i, token) in enumerate(vocab_tokens):
+            vocab[token] = i
+        tokenizer = WordpieceTokenizer(
+            vocab=vocab, unk_token="[UNK]", cache_size=2)
+
+        for _ in range(2):
+            self.assertListEqual(
+                tokenizer.tokenize("unwanted running wa"),
+                ["un", "##want", "##ed", "runn", "##ing", "wa"])
+            self.assertListEqual(
+                tokenizer.tokenize("##want unwantedX"), ["##want", "[UNK]"])
+        self.assertEqual(len(tokenizer._cache), 2)
+
+        tokenizer = WordpieceTokenizer(
+            vocab=vocab, unk_token="[UNK]", cache_size=0)
+        self.assertListEqual(
+            tokenizer.tokenize("wanting"), ["want", "##ing"])
+        self.assertEqual(len(tokenizer._cache), 0)
+
     def test_is_whitespace(self):
 
         self.assertTrue(_is_whitespace(u" "))
@@ -22,12 +22,14 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import os
 import json
+
+import numpy as np
 import regex as re
 
 from texar.torch.modules.pretrained.gpt2 import PretrainedGPT2Mixin
 from texar.torch.data.tokenizers.tokenizer_base import TokenizerBase
 from texar.torch.data.tokenizers.gpt2_tokenizer_utils import \
-    bytes_to_unicode, get_pairs
+    bytes_to_unicode, bpe_merge, BPECache
 
 __all__ = [
     'GPT2Tokenizer',
@@ -98,7 +100,8 @@ class GPT2Tokenizer(TokenizerBase, PretrainedGPT2Mixin):
         super().__init__(hparams=None)
 
         self.config = {
-            'errors': self.hparams['errors']
+            'errors': self.hparams['errors'],
+            'bpe_cache_size': self.hparams['bpe_cache_size'],
         }
 
         if self.pretrained_model_dir is not None:
@@ -136,7 +139,9 @@ class GPT2Tokenizer(TokenizerBase, PretrainedGPT2Mixin):
             bpe_data = fp.read().split('\n')[1:-1]
         bpe_merges = [tuple(merge.split()) for merge in bpe_data]
         self.bpe_ranks = dict(zip(bpe_merges, range(len(bpe_merges))))
-        self.cache: Dict[str, str] = {}
+        # The cache can be shared between tokenizers with the same merges by
+        # assigning the same `BPECache` instance.
+        self.cache = BPECache(self.hparams['bpe_cache_size'])
 
         # Should haved added re.IGNORECASE so BPE merges can happen for
         # capitalized versions of contractions
@@ -182,46 +187,10 @@ class GPT2Tokenizer(TokenizerBase, PretrainedGPT2Mixin):
         return (vocab_file, merge_file)
 
     def _bpe(self, token: str) -> str:
-        if token in self.cache:
-            return self.cache[token]
-        word = tuple(token)
-        pairs = get_pairs(word)
-
-        if not pairs:
-            return token
-
-        while True:
-            bigram = min(pairs, key=lambda pair: self.bpe_ranks.get(
-                pair, float('inf')))
-            if bigram not in self.bpe_ranks:
-                break
-            first, second = bigram
-            new_word: List[str] = []
-            i = 0
-            while i < len(word):
-                try:
-                    j = word.index(first, i)
-                    new_word.extend(word[i:j])
-                    i = j
-                except ValueError:
-                    new_word.extend(word[i:])
-                    break
-
-                if word[i] == first and i < len(word) - 1 \
-                        and word[i + 1] == second:
-                    new_word.append(first + second)
-                    i += 2
-                else:
-                    new_word.append(word[i])
-                    i += 1
-            new_word = tuple(new_word)
-            word = new_word
-            if len(word) == 1:
-                break
-            else:
-                pairs = get_pairs(word)
-        word = ' '.join(word)
-        self.cache[token] = word
+        word = self.cache.get(token)
+        if word is None:
+            word = ' '.join(bpe_merge(token, self.bpe_ranks))
+            self.cache.put(token, word)
         return word
 
     @property
@@ -296,6 +265,35 @@ class GPT2Tokenizer(TokenizerBase, PretrainedGPT2Mixin):
 
         return input_ids, seq_len
 
+    def batch_encode(self,
+                     texts: List[str],
+                     max_seq_length: Optional[int] = None,
+                     append_eos_token: bool = True) -> \
+            Tuple[np.ndarray, np.ndarray]:
+        r"""Encodes a list of texts with :meth:`encode_text`, and stacks the
+        results into arrays. BPE results are shared across the texts through
+        the BPE cache.
+
+        Args:
+            texts: A list of input texts.
+            max_seq_length: Maximum sequence length.
+            append_eos_token: Whether to append ``eos_token`` after each
+                sequence.
+
+        Returns:
+            A tuple of `(input_ids, seq_lens)`, where ``input_ids`` is a NumPy
+            array of shape `[len(texts), max_seq_length]`, and ``seq_lens`` is
+            a NumPy array of shape `[len(texts)]`.
+        """
+        if max_seq_length is None:
+            max_seq_length = self.max_len
+        input_ids = np.zeros((len(texts), max_seq_length), dtype=np.int64)
+        seq_lens = np.zeros(len(texts), dtype=np.int64)
+        for idx, text in enumerate(texts):
+            input_ids[idx], seq_lens[idx] = self.encode_text(
+                text, max_seq_length, append_eos_token)
+        return input_ids, seq_lens
+
     @staticmethod
     def default_hparams() -> Dict[str, Any]:
         r"""Returns a dictionary of hyperparameters with default values.
@@ -321,6 +319,7 @@ class GPT2Tokenizer(TokenizerBase, PretrainedGPT2Mixin):
                 "unk_token": "<|endoftext|>",
                 "pad_token": "<|endoftext|>",
                 "errors": "replace",
+                "bpe_cache_size": 100000,
                 "name": "gpt2_tokenizer",
             }
 
@@ -354,6 +353,11 @@ class GPT2Tokenizer(TokenizerBase, PretrainedGPT2Mixin):
             Response when mapping tokens to text fails. The possible values are
             `ignore`, `replace`, and `strict`.
 
+        `"bpe_cache_size"`: int or None
+            Maximum number of tokens whose BPE results are cached. Least
+            recently used results are evicted when the cache is full. If
+            `None`, the cache is unbounded.
+
         `"name"`: str
             Name of the tokenizer.
         """
@@ -367,6 +371,7 @@ class GPT2Tokenizer(TokenizerBase, PretrainedGPT2Mixin):
             'unk_token': '<|endoftext|>',
             'pad_token': '<|endoftext|>',
             'errors': 'replace',
+            'bpe_cache_size': 100000,
             'name': 'gpt2_tokenizer',
             '@no_typecheck': ['pretrained_model_name'],
         }
@@ -9,6 +9,8 @@ import os
 import pickle
 import tempfile
 
+import numpy as np
+
 from texar.torch.data.tokenizers.gpt2_tokenizer import \
     GPT2Tokenizer
 from texar.torch.utils.test import pretrained_test
@@ -190,6 +192,47 @@ class GPT2TokenizerTest(unittest.TestCase):
                              [pad_token_id])
         self.assertEqual(seq_len, 9)
 
+    def test_batch_encode(self):
+        tokenizer = GPT2Tokenizer.load(self.tmp_dir.name,
+                                       self.special_tokens_map)
+
+        texts = [u"lower newer", u"low", u"lower lower lower lower"]
+        input_ids, seq_lens = tokenizer.batch_encode(
+            texts, max_seq_length=10)
+
+        self.assertIsInstance(input_ids, np.ndarray)
+        self.assertEqual(input_ids.shape, (3, 10))
+        self.assertEqual(seq_lens.shape, (3,))
+        for idx, text in enumerate(texts):
+            ids, seq_len = tokenizer.encode_text(text, max_seq_length=10)
+            self.assertListEqual(input_ids[idx].tolist(), ids)
+            self.assertEqual(seq_lens[idx], seq_len)
+
+    def test_bpe_cache(self):
+        hparams = {
+            "pretrained_model_name": None,
+            "vocab_file": self.vocab_file,
+            "merges_file": self.merges_file,
+            "bpe_cache_size": 2,
+        }
+        tokenizer = GPT2Tokenizer(hparams=hparams)
+
+        self.assertListEqual(tokenizer.map_text_to_token(u"lower"),
+                             ["low", "er"])
+        self.assertEqual(tokenizer.cache.misses, 1)
+        self.assertListEqual(tokenizer.map_text_to_token(u"lower"),
+                             ["low", "er"])
+        self.assertEqual(tokenizer.cache.hits, 1)
+
+        _ = tokenizer.map_text_to_token(u"lower newer wider")
+        self.assertEqual(len(tokenizer.cache), 2)
+        self.assertNotIn(u"lower", tokenizer.cache)
+
+        other_tokenizer = GPT2Tokenizer(hparams=hparams)
+        other_tokenizer.cache = tokenizer.cache
+        _ = other_tokenizer.map_text_to_token(u"newer wider")
+        self.assertEqual(tokenizer.cache.hits, 3)
+
 
 if __name__ == "__main__":
     unittest.main()
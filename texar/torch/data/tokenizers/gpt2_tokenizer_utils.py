@@ -17,11 +17,18 @@ Code structure adapted from:
     `https://github.com/huggingface/pytorch-transformers/blob/master/pytorch_transformers/tokenization_gpt2.py`
 """
 
+from typing import Dict, List, Optional, Tuple
+
+import collections
+import heapq
+import threading
 from functools import lru_cache
 
 __all__ = [
     "bytes_to_unicode",
     "get_pairs",
+    "bpe_merge",
+    "BPECache",
 ]
 
 
@@ -66,3 +73,122 @@ def get_pairs(word):
         pairs.add((prev_char, char))
         prev_char = char
     return pairs
+
+
+def bpe_merge(token: str,
+              bpe_ranks: Dict[Tuple[str, ...], int]) -> List[str]:
+    r"""Split a token into BPE symbols by repeatedly merging the adjacent pair
+    of symbols with the lowest rank in :attr:`bpe_ranks`.
+
+    Candidate pairs are kept in a priority queue ordered by rank and position,
+    and symbols are kept in a linked list, so that each merge only updates the
+    pairs around the merged position.
+
+    Example:
+        bpe_ranks = {('t', 'e'): 0, ('x', 'a'): 1, ('te', 'xa'): 2}
+        bpe_merge("texar", bpe_ranks)
+        # ['texa', 'r']
+    """
+    symbols: List[Optional[str]] = list(token)
+    length = len(symbols)
+    if length < 2:
+        return list(token)
+    next_pos = list(range(1, length)) + [-1]
+    prev_pos = list(range(-1, length - 1))
+
+    def make_entry(pos: int) -> Optional[Tuple[int, int, str, str]]:
+        right = next_pos[pos]
+        if pos == -1 or right == -1:
+            return None
+        first, second = symbols[pos], symbols[right]
+        rank = bpe_ranks.get((first, second))  # type: ignore
+        if rank is None:
+            return None
+        return rank, pos, first, second  # type: ignore
+
+    heap = [entry for entry in map(make_entry, range(length - 1))
+            if entry is not None]
+    heapq.heapify(heap)
+
+    while heap:
+        _, pos, first, second = heapq.heappop(heap)
+        right = next_pos[pos]
+        # Skip pairs that have been invalidated by previous merges.
+        if symbols[pos] != first or right == -1 or symbols[right] != second:
+            continue
+        symbols[pos] = first + second
+        symbols[right] = None
+        next_pos[pos] = next_pos[right]
+        if next_pos[pos] != -1:
+            prev_pos[next_pos[pos]] = pos
+        # Add the new pairs formed with the neighbors of the merged symbol.
+        for new_pos in (prev_pos[pos], pos):
+            entry = make_entry(new_pos)
+            if entry is not None:
+                heapq.heappush(heap, entry)
+
+    return [symbol for symbol in symbols if symbol is not None]
+
+
+class BPECache:
+    r"""A thread-safe least-recently-used cache of BPE results, which can be
+    shared by multiple tokenizers with the same merges.
+
+    Args:
+        max_size (int, optional): Maximum number of cached tokens. If `None`,
+            the size of the cache is unbounded.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: 'collections.OrderedDict[str, str]' = \
+            collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[str]:
+        r"""Returns the cached result of :attr:`token`, or `None` if it is not
+        cached.
+        """
+        with self._lock:
+            value = self._cache.get(token)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._cache.move_to_end(token)
+            return value
+
+    def put(self, token: str, value: str) -> None:
+        r"""Caches the result of :attr:`token`, evicting the least recently
+        used result if the cache is full.
+        """
+        if self.max_size is not None and self.max_size <= 0:
+            return
+        with self._lock:
+            self._cache[token] = value
+            if self.max_size is not None and len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        r"""Removes all cached results and resets the counters."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._cache
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
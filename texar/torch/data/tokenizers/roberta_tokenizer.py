@@ -17,6 +17,8 @@ Pre-trained RoBERTa tokenizer.
 
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
 from texar.torch.data.tokenizers.gpt2_tokenizer import GPT2Tokenizer
 from texar.torch.utils.utils import truncate_seq_pair
 
@@ -140,6 +142,44 @@ class RoBERTaTokenizer(GPT2Tokenizer):
 
         return input_ids, input_mask
 
+    def batch_encode(self,
+                     texts: List[str],
+                     max_seq_length: Optional[int] = None,
+                     append_eos_token: bool = True,  # pylint: disable=unused-argument
+                     *,
+                     texts_b: Optional[List[Optional[str]]] = None) -> \
+            Tuple[np.ndarray, np.ndarray]:
+        r"""Encodes a batch of texts or text pairs with :meth:`encode_text`,
+        and stacks the results into arrays. BPE results are shared across the
+        texts through the BPE cache.
+
+        Args:
+            texts: A list of first input texts.
+            max_seq_length: Maximum sequence length.
+            append_eos_token: Unused, since ``</s>`` is always appended for
+                RoBERTa. Kept for compatibility with
+                :meth:`GPT2Tokenizer.batch_encode`.
+            texts_b (optional): A list of second input texts, of the same
+                length as :attr:`texts`.
+
+        Returns:
+            A tuple of `(input_ids, input_mask)`, each a NumPy array of shape
+            `[len(texts), max_seq_length]`. See :meth:`encode_text` for
+            details.
+        """
+        if max_seq_length is None:
+            max_seq_length = self.max_len
+        if texts_b is None:
+            texts_b = [None] * len(texts)
+        if len(texts) != len(texts_b):
+            raise ValueError("`texts` and `texts_b` must have the same length")
+        input_ids = np.zeros((len(texts), max_seq_length), dtype=np.int64)
+        input_mask = np.zeros((len(texts), max_seq_length), dtype=np.int64)
+        for idx, (text_a, text_b) in enumerate(zip(texts, texts_b)):
+            input_ids[idx], input_mask[idx] = self.encode_text(
+                text_a, text_b, max_seq_length)
+        return input_ids, input_mask
+
     @staticmethod
     def default_hparams() -> Dict[str, Any]:
         r"""Returns a dictionary of hyperparameters with default values.
@@ -168,6 +208,7 @@ class RoBERTaTokenizer(GPT2Tokenizer):
                 "pad_token": "<pad>",
                 "mask_token": "<mask>",
                 "errors": "replace",
+                "bpe_cache_size": 100000,
                 "name": "roberta_tokenizer",
             }
 
@@ -210,6 +251,11 @@ class RoBERTaTokenizer(GPT2Tokenizer):
             Response when decoding fails. The possible values are
             `ignore`, `replace`, and `strict`.
 
+        `"bpe_cache_size"`: int or None
+            Maximum number of tokens whose BPE results are cached. Least
+            recently used results are evicted when the cache is full. If
+            `None`, the cache is unbounded.
+
         `"name"`: str
             Name of the tokenizer.
         """
@@ -226,6 +272,7 @@ class RoBERTaTokenizer(GPT2Tokenizer):
             'pad_token': '<pad>',
             'mask_token': '<mask>',
             'errors': 'replace',
+            'bpe_cache_size': 100000,
             'name': 'roberta_tokenizer',
             '@no_typecheck': ['pretrained_model_name'],
         }
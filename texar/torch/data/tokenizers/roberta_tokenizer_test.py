@@ -9,6 +9,8 @@ import os
 import pickle
 import tempfile
 
+import numpy as np
+
 from texar.torch.data.tokenizers.roberta_tokenizer import \
     RoBERTaTokenizer
 from texar.torch.utils.test import pretrained_test
@@ -198,6 +200,23 @@ class RoBERTaTokenizerTest(unittest.TestCase):
                              + [sep_token_id])
         self.assertListEqual(input_mask, [1, 1, 1, 1, 1, 1, 1])
 
+    def test_batch_encode(self):
+        tokenizer = RoBERTaTokenizer.load(self.tmp_dir.name,
+                                          self.special_tokens_map)
+
+        texts_a = [u"lower newer", u"low"]
+        texts_b = [u"He is very happy", None]
+        input_ids, input_mask = tokenizer.batch_encode(
+            texts_a, 7, texts_b=texts_b)
+
+        self.assertIsInstance(input_ids, np.ndarray)
+        self.assertEqual(input_ids.shape, (2, 7))
+        self.assertEqual(input_mask.shape, (2, 7))
+        for idx, (text_a, text_b) in enumerate(zip(texts_a, texts_b)):
+            ids, mask = tokenizer.encode_text(text_a, text_b, 7)
+            self.assertListEqual(input_ids[idx].tolist(), ids)
+            self.assertListEqual(input_mask[idx].tolist(), mask)
+
 
 if __name__ == "__main__":
     unittest.main()
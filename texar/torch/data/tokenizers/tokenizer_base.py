@@ -20,8 +20,10 @@ The code structure adapted from:
 
 from typing import Any, Dict, List, Optional, Tuple, overload
 
+import bisect
 import os
 import json
+import re
 
 from texar.torch.module_base import ModuleBase
 
@@ -75,6 +77,8 @@ class TokenizerBase(ModuleBase):
         self.max_len = int(1e12)
         self.added_tokens_encoder = {}
         self.added_tokens_decoder = {}
+        # Built lazily in `map_text_to_token`.
+        self._added_tokens_splitter: Optional[_AddedTokensSplitter] = None
 
         for key, value in self.hparams.items():
             if key in self._SPECIAL_TOKENS_ATTRIBUTES:
@@ -329,19 +333,24 @@ class TokenizerBase(ModuleBase):
             A list of tokens.
         """
 
-        def split_on_tokens(tok_list, string):
-            if not string:
-                return []
-            if not tok_list:
-                return self._map_text_to_token(string, **kwargs)
-            tok = tok_list[0]
-            split_text = string.split(tok)
-            return sum((split_on_tokens(tok_list[1:], sub_text.strip()) + [tok]
-                        for sub_text in split_text), [])[:-1]
-
+        if not text:
+            return []
         added_tokens = list(
             self.added_tokens_encoder.keys()) + self.all_special_tokens
-        tokenized_text = split_on_tokens(added_tokens, text)
+        if not added_tokens:
+            return self._map_text_to_token(text, **kwargs)
+
+        splitter = getattr(self, '_added_tokens_splitter', None)
+        if splitter is None or splitter.tokens != added_tokens:
+            splitter = _AddedTokensSplitter(added_tokens)
+            self._added_tokens_splitter = splitter
+
+        tokenized_text: List[str] = []
+        for piece, is_added_token in splitter.split(text):
+            if is_added_token:
+                tokenized_text.append(piece)
+            else:
+                tokenized_text.extend(self._map_text_to_token(piece, **kwargs))
         return tokenized_text
 
     def _map_text_to_token(self, text: str, **kwargs) -> List[str]:
@@ -540,3 +549,130 @@ class TokenizerBase(ModuleBase):
             replace(" do not", " don't").replace(" 's", "'s"). \
             replace(" 've", "'ve").replace(" 're", "'re")
         return out_string
+
+
+class _AddedTokensSplitter:
+    r"""Splits text on added and special tokens in a single pass.
+
+    The result is the same as splitting the text on each token in the order
+    of :attr:`tokens`, where each piece is split on the following tokens after
+    stripping whitespaces. That is, occurrences of earlier tokens take
+    precedence over overlapping occurrences of later tokens.
+
+    Occurrences of all tokens are found with an Aho-Corasick automaton built
+    once from :attr:`tokens`.
+
+    Args:
+        tokens: The list of tokens to split on, in the order of precedence.
+    """
+
+    _WHITESPACE = re.compile(r'\s+')
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = list(tokens)
+        # Duplicate tokens have no effect, since all occurrences are split by
+        # the first copy.
+        self._unique_tokens = [token for token in dict.fromkeys(tokens)
+                               if token]
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._outputs: List[List[int]] = [[]]
+        for idx, token in enumerate(self._unique_tokens):
+            node = 0
+            for char in token:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._outputs.append([])
+                node = next_node
+            self._outputs[node].append(idx)
+
+        # Compute failure links in breadth-first order.
+        self._fail = [0] * len(self._goto)
+        # Children of the root fail to the root.
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._outputs[child] = (self._outputs[child] +
+                                        self._outputs[self._fail[child]])
+                queue.append(child)
+
+    def _find_occurrences(self, text: str) -> Dict[int, List[int]]:
+        r"""Returns the start positions of all (possibly overlapping)
+        occurrences of each token in ascending order.
+        """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        occurrences: Dict[int, List[int]] = {}
+        node = 0
+        for pos, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for idx in outputs[node]:
+                start = pos + 1 - len(self._unique_tokens[idx])
+                occurrences.setdefault(idx, []).append(start)
+        return occurrences
+
+    def split(self, text: str) -> List[Tuple[str, bool]]:
+        r"""Splits :attr:`text` into a list of `(piece, is_token)` tuples,
+        where `is_token` is `True` if `piece` is one of the tokens. Pieces
+        between tokens are stripped, and empty pieces are omitted.
+        """
+        occurrences = self._find_occurrences(text)
+        whitespaces = [m.span() for m in self._WHITESPACE.finditer(text)]
+        ws_starts = [start for start, _ in whitespaces]
+
+        def strip(start: int, end: int) -> Tuple[int, int]:
+            if start >= end:
+                return start, end
+            idx = bisect.bisect_right(ws_starts, start) - 1
+            if idx >= 0 and whitespaces[idx][1] > start:
+                start = min(whitespaces[idx][1], end)
+            idx = bisect.bisect_right(ws_starts, end - 1) - 1
+            if idx >= 0 and whitespaces[idx][1] > end - 1:
+                end = max(whitespaces[idx][0], start)
+            return start, end
+
+        # Sorted spans of tokens split so far.
+        starts: List[int] = []
+        spans: List[Tuple[int, int, int]] = []
+        for idx, token in enumerate(self._unique_tokens):
+            positions = occurrences.get(idx)
+            if not positions:
+                continue
+            selected = []
+            cursor = 0
+            for pos in positions:
+                if pos < cursor:
+                    continue
+                span_idx = bisect.bisect_right(starts, pos)
+                gap_start = spans[span_idx - 1][1] if span_idx > 0 else 0
+                gap_end = (spans[span_idx][0] if span_idx < len(spans)
+                           else len(text))
+                # Only the whole text is split on the first token without
+                # stripping.
+                if idx > 0:
+                    gap_start, gap_end = strip(gap_start, gap_end)
+                if gap_start <= pos and pos + len(token) <= gap_end:
+                    selected.append((pos, pos + len(token), idx))
+                    cursor = pos + len(token)
+            if selected:
+                spans = sorted(spans + selected)
+                starts = [span[0] for span in spans]
+
+        pieces: List[Tuple[str, bool]] = []
+        gap_start = 0
+        for start, end, idx in spans + [(len(text), len(text), -1)]:
+            piece_start, piece_end = strip(gap_start, start)
+            if piece_start < piece_end:
+                pieces.append((text[piece_start:piece_end], False))
+            if idx >= 0:
+                pieces.append((self._unique_tokens[idx], True))
+            gap_start = end
+        return pieces
@@ -15,6 +15,7 @@
 """
 Helper functions and classes for vocabulary processing.
 """
+import itertools
 import warnings
 from collections import defaultdict
 from typing import DefaultDict, Dict, List, Optional, Sequence, Tuple, Union
@@ -22,7 +23,7 @@ from typing import DefaultDict, Dict, List, Optional, Sequence, Tuple, Union
 import numpy as np
 
 from texar.torch.utils.utils import (
-    _recur_split, dict_lookup, str_join, strip_special_tokens)
+    _recur_split, str_join, strip_special_tokens)
 
 __all__ = [
     "SpecialTokens",
@@ -102,6 +103,11 @@ class Vocab:
         self._id_to_token_map_py, self._token_to_id_map_py \
             = self.load(self._filename)
 
+        # Array of tokens indexed by ids, used for vectorized lookup of ids.
+        self._id_to_token_array = np.array(
+            [self._id_to_token_map_py[idx]
+             for idx in range(len(self._id_to_token_map_py))])
+
     def load(self, filename: str) \
             -> Tuple[Dict[int, str], Dict[str, int]]:
         r"""Loads the vocabulary from the file.
@@ -160,7 +166,22 @@ class Vocab:
         Returns:
             A numpy array of text tokens of the same shape as :attr:`ids`.
         """
-        return dict_lookup(self.id_to_token_map_py, ids, self.unk_token)
+        ids = np.asarray(ids, dtype=np.int64)
+        valid = (ids >= 0) & (ids < len(self._id_to_token_array))
+        tokens = self._id_to_token_array[np.where(valid, ids, 0)]
+        if not valid.all():
+            tokens[~valid] = self.unk_token
+        return tokens
+
+    def _lookup_token_ids(self, tokens: Sequence[str]) -> np.ndarray:
+        r"""Maps a flat sequence of text tokens into an `int64` numpy array of
+        ids. Lookup is performed by C-level iteration over the hash table,
+        without calling into Python code for each token.
+        """
+        return np.fromiter(
+            map(self._token_to_id_map_py.get, tokens,
+                itertools.repeat(self.unk_token_id)),
+            dtype=np.int64, count=len(tokens))
 
     def map_tokens_to_ids_py(self, tokens: List[str]) -> np.ndarray:
         r"""Maps text tokens into ids.
@@ -174,7 +195,45 @@ class Vocab:
         Returns:
             A numpy array of token ids of the same shape as :attr:`tokens`.
         """
-        return dict_lookup(self.token_to_id_map_py, tokens, self.unk_token_id)
+        if isinstance(tokens, list) and (
+                len(tokens) == 0 or isinstance(tokens[0], str)):
+            return self._lookup_token_ids(tokens)
+        array = np.asarray(tokens)
+        ids = self._lookup_token_ids(array.ravel().tolist())
+        return ids.reshape(array.shape)
+
+    def map_tokens_to_padded_ids_py(self, tokens: Sequence[Sequence[str]],
+                                    pad_length: Optional[int] = None) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        r"""Maps a batch of text token lists with (possibly) different lengths
+        into a padded array of ids.
+
+        This is equivalent to calling :meth:`map_tokens_to_ids_py` on each list
+        and padding the results with :attr:`pad_token_id`, but avoids creating
+        intermediate arrays for each list.
+
+        Args:
+            tokens: A list of lists of text tokens.
+            pad_length (int, optional): The desired length after padding. If
+                `None`, or smaller than the maximum length of lists, use the
+                maximum length of lists.
+
+        Returns:
+            A tuple of two `int64` numpy arrays: the padded ids of shape
+            ``[batch_size, pad_length]``, and the original lengths of each
+            list, of shape ``[batch_size]``.
+        """
+        lengths = np.fromiter(map(len, tokens), dtype=np.int64,
+                              count=len(tokens))
+        max_length = int(lengths.max()) if len(tokens) > 0 else 0
+        pad_length = max(pad_length or 0, max_length)
+        flat_ids = self._lookup_token_ids(
+            list(itertools.chain.from_iterable(tokens)))
+        padded = np.full((len(tokens), pad_length), self.pad_token_id,
+                         dtype=np.int64)
+        mask = np.arange(pad_length) < lengths[:, np.newaxis]
+        padded[mask] = flat_ids
+        return padded, lengths
 
     @property
     def id_to_token_map_py(self) -> Dict[int, str]:
@@ -4,6 +4,8 @@ Unit tests for vocabulary related operations.
 import tempfile
 import unittest
 
+import numpy as np
+
 from texar.torch.data import vocabulary
 
 
@@ -45,6 +47,45 @@ class VocabularyTest(unittest.TestCase):
         unk_token_text = vocab.map_ids_to_tokens_py(unk_token_id)
         self.assertEqual(unk_token_text[0], vocab.unk_token)
 
+    def test_vocab_lookup(self):
+        """Test vectorized lookup of tokens and ids.
+        """
+        vocab_list = ['word', '词', 'longer_word']
+        vocab_file = tempfile.NamedTemporaryFile()
+        vocab_file.write('\n'.join(vocab_list).encode("utf-8"))
+        vocab_file.flush()
+
+        vocab = vocabulary.Vocab(vocab_file.name)
+        word, ci, longer = [vocab.token_to_id_map_py[token]
+                            for token in vocab_list]
+        unk = vocab.unk_token_id
+
+        ids = vocab.map_tokens_to_ids_py(['word', 'new', '词'])
+        np.testing.assert_array_equal(ids, [word, unk, ci])
+        self.assertEqual(ids.dtype, np.int64)
+
+        ids = vocab.map_tokens_to_ids_py([['word', 'new'], ['词', 'word']])
+        np.testing.assert_array_equal(ids, [[word, unk], [ci, word]])
+
+        tokens = vocab.map_ids_to_tokens_py([[longer, word], [100, -1]])
+        np.testing.assert_array_equal(
+            tokens, [['longer_word', 'word'], [vocab.unk_token] * 2])
+
+        ids, lengths = vocab.map_tokens_to_padded_ids_py(
+            [['word', 'new', '词'], [], ['longer_word']])
+        np.testing.assert_array_equal(
+            ids, [[word, unk, ci], [vocab.pad_token_id] * 3,
+                  [longer] + [vocab.pad_token_id] * 2])
+        np.testing.assert_array_equal(lengths, [3, 0, 1])
+
+        ids, _ = vocab.map_tokens_to_padded_ids_py([['word']], pad_length=4)
+        self.assertEqual(ids.shape, (1, 4))
+
+        strs = vocabulary.map_ids_to_strs(
+            [[vocab.bos_token_id, word, ci, vocab.eos_token_id,
+              vocab.pad_token_id]], vocab)
+        self.assertEqual(strs, ['word 词'])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -302,11 +302,12 @@ class SampleEmbeddingHelper(SingleEmbeddingHelper):
             representing the start tokens for each sequence in batch.
         end_token: Python int or scalar :tensor:`LongTensor`, denoting the
             token that marks end of decoding.
-        softmax_temperature (float, optional): Value to divide the logits by
-            before computing the softmax. Larger values (above 1.0) result
-            in more random samples, while smaller values push the sampling
-            distribution towards the argmax. Must be strictly greater than
-            0. Defaults to 1.0.
+        softmax_temperature (float or Tensor, optional): Value to divide the
+            logits by before computing the softmax. Larger values (above 1.0)
+            result in more random samples, while smaller values push the
+            sampling distribution towards the argmax. Must be strictly greater
+            than 0. Can also be a 1D tensor shaped ``[batch_size]`` of
+            per-example values. Defaults to 1.0.
 
     Raises:
         ValueError: if :attr:`start_tokens` is not a 1D tensor or
@@ -315,7 +316,8 @@ class SampleEmbeddingHelper(SingleEmbeddingHelper):
 
     def __init__(self, start_tokens: torch.LongTensor,
                  end_token: Union[int, torch.LongTensor],
-                 softmax_temperature: Optional[float] = None):
+                 softmax_temperature: Optional[
+                     Union[float, torch.Tensor]] = None):
         super().__init__(start_tokens, end_token)
         self._softmax_temperature = softmax_temperature
 
@@ -325,10 +327,7 @@ class SampleEmbeddingHelper(SingleEmbeddingHelper):
         if not torch.is_tensor(outputs):
             raise TypeError(
                 f"Expected outputs to be a single Tensor, got: {type(outputs)}")
-        if self._softmax_temperature is None:
-            logits = outputs
-        else:
-            logits = outputs / self._softmax_temperature
+        logits = _apply_temperature(outputs, self._softmax_temperature)
 
         sample_id_sampler = Categorical(logits=logits)
         sample_ids = sample_id_sampler.sample()
@@ -336,27 +335,62 @@ class SampleEmbeddingHelper(SingleEmbeddingHelper):
         return sample_ids
 
 
-def _top_k_logits(logits: torch.Tensor, k: int) -> torch.Tensor:
+def _apply_temperature(logits: torch.Tensor,
+                       temperature: Optional[Union[float, torch.Tensor]]) \
+        -> torch.Tensor:
+    r"""Divides the logits by the softmax temperature, which is either a
+    scalar or a per-example 1D tensor shaped ``[batch_size]``.
+    """
+    if temperature is None:
+        return logits
+    if isinstance(temperature, torch.Tensor) and temperature.dim() == 1:
+        temperature = temperature.unsqueeze(-1)
+    return logits / temperature
+
+
+def _top_k_logits(logits: torch.Tensor,
+                  k: Union[int, torch.LongTensor]) -> torch.Tensor:
     r"""Adapted from
     https://github.com/openai/gpt-2/blob/master/src/sample.py#L63-L77
+
+    :attr:`k` is either an int, or a 1D tensor shaped ``[batch_size]`` of
+    per-example values. Examples with ``k == 0`` are not truncated.
     """
-    if k == 0:
-        # no truncation
+    if not isinstance(k, torch.Tensor):
+        if k == 0:
+            # no truncation
+            return logits
+
+        values, _ = torch.topk(logits, k=k)
+        min_values: torch.Tensor = values[:, -1].unsqueeze(-1)
+        return torch.where(
+            logits < min_values,
+            torch.full_like(logits, float('-inf')), logits)
+
+    k = k.to(device=logits.device).unsqueeze(-1)
+    max_k = min(int(k.max().item()), logits.size(-1))
+    if max_k == 0:
         return logits
-
-    values, _ = torch.topk(logits, k=k)
-    min_values: torch.Tensor = values[:, -1].unsqueeze(-1)
-    return torch.where(
-        logits < min_values,
-        torch.full_like(logits, float('-inf')), logits)
+    values, _ = torch.topk(logits, k=max_k)
+    min_values = values.gather(1, (k - 1).clamp(0, max_k - 1))
+    # Examples with `k == 0` keep all candidates.
+    min_values = min_values.masked_fill(k == 0, float('-inf'))
+    return logits.masked_fill(logits < min_values, float('-inf'))
 
 
-def _top_p_logits(logits: torch.Tensor, p: float) -> torch.Tensor:
+def _top_p_logits(logits: torch.Tensor,
+                  p: Union[float, torch.Tensor]) -> torch.Tensor:
     r"""Adapted from
-    https://gist.github.com/thomwolf/1a5a29f6962089e871b94cbd09daf317#file-top-k-top-p-py-L16-L27"""
+    https://gist.github.com/thomwolf/1a5a29f6962089e871b94cbd09daf317#file-top-k-top-p-py-L16-L27
+
+    :attr:`p` is either a float, or a 1D tensor shaped ``[batch_size]`` of
+    per-example values.
+    """
     sorted_logits, sorted_indices = torch.sort(logits, descending=True)
     cumulative_probs = torch.cumsum(F.softmax(sorted_logits, dim=-1), dim=-1)
 
+    if isinstance(p, torch.Tensor):
+        p = p.to(device=logits.device).unsqueeze(-1)
     # Remove tokens with cumulative probability above the threshold
     sorted_indices_to_remove = cumulative_probs > p
     # Shift the indices to the right to keep also the first token above the
@@ -364,10 +398,10 @@ def _top_p_logits(logits: torch.Tensor, p: float) -> torch.Tensor:
     sorted_indices_to_remove[:, 1:] = sorted_indices_to_remove[:, :-1].clone()
     sorted_indices_to_remove[:, 0] = 0
 
-    for idx in range(logits.size(0)):
-        batch_indices = sorted_indices[idx, sorted_indices_to_remove[idx]]
-        logits[idx, batch_indices] = float("-inf")
-    return logits
+    # Scatter the mask back to the original order of the vocabulary.
+    indices_to_remove = sorted_indices_to_remove.scatter(
+        1, sorted_indices, sorted_indices_to_remove)
+    return logits.masked_fill(indices_to_remove, float('-inf'))
 
 
 class TopKSampleEmbeddingHelper(SingleEmbeddingHelper):
@@ -381,14 +415,17 @@ class TopKSampleEmbeddingHelper(SingleEmbeddingHelper):
             representing the start tokens for each sequence in batch.
         end_token: Python int or scalar :tensor:`LongTensor`, denoting the
             token that marks end of decoding.
-        top_k (int, optional): Number of top candidates to sample from. Must
-            be `>=0`. If set to 0, samples from all candidates (i.e.,
-            regular random sample decoding). Defaults to 10.
-        softmax_temperature (float, optional): Value to divide the logits by
-            before computing the softmax. Larger values (above 1.0) result
-            in more random samples, while smaller values push the sampling
-            distribution towards the argmax. Must be strictly greater than
-            0. Defaults to 1.0.
+        top_k (int or LongTensor, optional): Number of top candidates to
+            sample from. Must be `>=0`. If set to 0, samples from all
+            candidates (i.e., regular random sample decoding). Can also be a
+            1D :tensor:`LongTensor` shaped ``[batch_size]`` of per-example
+            values. Defaults to 10.
+        softmax_temperature (float or Tensor, optional): Value to divide the
+            logits by before computing the softmax. Larger values (above 1.0)
+            result in more random samples, while smaller values push the
+            sampling distribution towards the argmax. Must be strictly greater
+            than 0. Can also be a 1D tensor shaped ``[batch_size]`` of
+            per-example values. Defaults to 1.0.
 
     Raises:
         ValueError: if :attr:`start_tokens` is not a 1D tensor or
@@ -396,8 +433,10 @@ class TopKSampleEmbeddingHelper(SingleEmbeddingHelper):
     """
 
     def __init__(self, start_tokens: torch.LongTensor,
-                 end_token: Union[int, torch.LongTensor], top_k: int = 10,
-                 softmax_temperature: Optional[float] = None):
+                 end_token: Union[int, torch.LongTensor],
+                 top_k: Union[int, torch.LongTensor] = 10,
+                 softmax_temperature: Optional[
+                     Union[float, torch.Tensor]] = None):
         super().__init__(start_tokens, end_token)
         self._top_k = top_k
         self._softmax_temperature = softmax_temperature
@@ -408,10 +447,7 @@ class TopKSampleEmbeddingHelper(SingleEmbeddingHelper):
         if not torch.is_tensor(outputs):
             raise TypeError(
                 f"Expected outputs to be a single Tensor, got: {type(outputs)}")
-        if self._softmax_temperature is None:
-            logits = outputs
-        else:
-            logits = outputs / self._softmax_temperature
+        logits = _apply_temperature(outputs, self._softmax_temperature)
 
         logits = _top_k_logits(logits, k=self._top_k)
 
@@ -435,16 +471,18 @@ class TopPSampleEmbeddingHelper(SingleEmbeddingHelper):
             representing the start tokens for each sequence in batch.
         end_token: Python int or scalar :tensor:`LongTensor`, denoting the
             token that marks end of decoding.
-        p (float, optional): A value used to filter out tokens whose cumulative
-            probability is greater than `p` when arranged in decreasing order of
-            probabilities. Must be between [0, 1.0]. If set to 1, samples from
-            all candidates (i.e., regular random sample decoding). Defaults to
-            0.5.
-        softmax_temperature (float, optional): Value to divide the logits by
-            before computing the softmax. Larger values (above 1.0) result
-            in more random samples, while smaller values push the sampling
-            distribution towards the argmax. Must be strictly greater than
-            0. Defaults to 1.0.
+        p (float or Tensor, optional): A value used to filter out tokens whose
+            cumulative probability is greater than `p` when arranged in
+            decreasing order of probabilities. Must be between [0, 1.0]. If set
+            to 1, samples from all candidates (i.e., regular random sample
+            decoding). Can also be a 1D tensor shaped ``[batch_size]`` of
+            per-example values. Defaults to 0.9.
+        softmax_temperature (float or Tensor, optional): Value to divide the
+            logits by before computing the softmax. Larger values (above 1.0)
+            result in more random samples, while smaller values push the
+            sampling distribution towards the argmax. Must be strictly greater
+            than 0. Can also be a 1D tensor shaped ``[batch_size]`` of
+            per-example values. Defaults to 1.0.
 
     Raises:
         ValueError: if :attr:`start_tokens` is not a 1D tensor or
@@ -452,8 +490,10 @@ class TopPSampleEmbeddingHelper(SingleEmbeddingHelper):
     """
 
     def __init__(self, start_tokens: torch.LongTensor,
-                 end_token: Union[int, torch.LongTensor], p: float = 0.9,
-                 softmax_temperature: Optional[float] = None):
+                 end_token: Union[int, torch.LongTensor],
+                 p: Union[float, torch.Tensor] = 0.9,
+                 softmax_temperature: Optional[
+                     Union[float, torch.Tensor]] = None):
         super().__init__(start_tokens, end_token)
         self._p = p
         self._softmax_temperature = softmax_temperature
@@ -465,10 +505,7 @@ class TopPSampleEmbeddingHelper(SingleEmbeddingHelper):
         if not torch.is_tensor(outputs):
             raise TypeError(
                 f"Expected outputs to be a single Tensor, got: {type(outputs)}")
-        if self._softmax_temperature is None:
-            logits = outputs
-        else:
-            logits = outputs / self._softmax_temperature
+        logits = _apply_temperature(outputs, self._softmax_temperature)
 
         logits = _top_p_logits(logits, p=self._p)
 
@@ -6,7 +6,8 @@ import unittest
 import torch
 
 from texar.torch.modules.decoders.decoder_helpers import (
-    GreedyEmbeddingHelper, TopKSampleEmbeddingHelper, TopPSampleEmbeddingHelper)
+    GreedyEmbeddingHelper, TopKSampleEmbeddingHelper, TopPSampleEmbeddingHelper,
+    _top_k_logits, _top_p_logits)
 
 
 class SamplerTest(unittest.TestCase):
@@ -41,6 +42,54 @@ class SamplerTest(unittest.TestCase):
         index = sampler.sample(time=0, outputs=self.logits)
         assert index.item() in [0, 1, 2]
 
+    def test_batched_top_p_logits(self):
+        """Tests top-p filtering with per-example `p` against filtering
+        each example separately."""
+        logits = torch.randn(8, 50)
+        p = torch.rand(8)
+        filtered = _top_p_logits(logits.clone(), p=p)
+        for idx in range(logits.size(0)):
+            sorted_logits, sorted_indices = torch.sort(
+                logits[idx], descending=True)
+            cumulative_probs = torch.cumsum(
+                torch.softmax(sorted_logits, dim=-1), dim=-1)
+            to_remove = cumulative_probs > p[idx]
+            to_remove[1:] = to_remove[:-1].clone()
+            to_remove[0] = 0
+            expected = logits[idx].clone()
+            expected[sorted_indices[to_remove]] = float('-inf')
+            assert torch.equal(filtered[idx], expected)
+
+        assert torch.equal(_top_p_logits(logits, p=0.7),
+                           _top_p_logits(logits, p=torch.full((8,), 0.7)))
+
+    def test_batched_top_k_logits(self):
+        """Tests top-k filtering with per-example `k`."""
+        logits = torch.randn(4, 10)
+        k = torch.LongTensor([0, 1, 3, 10])
+        filtered = _top_k_logits(logits, k=k)
+        for idx in range(logits.size(0)):
+            expected = _top_k_logits(logits[idx:(idx + 1)], k=k[idx].item())
+            assert torch.equal(filtered[idx:(idx + 1)], expected)
+
+    def test_batched_samplers(self):
+        """Tests samplers with per-example parameters."""
+        logits = self.logits.repeat(2, 1)
+        start_tokens = self.start_token.repeat(2)
+        temperature = torch.Tensor([1.0, 0.5])
+
+        sampler = TopKSampleEmbeddingHelper(
+            start_tokens=start_tokens, end_token=self.end_token,
+            top_k=torch.LongTensor([1, 0]), softmax_temperature=temperature)
+        index = sampler.sample(time=0, outputs=logits)
+        assert index[0].item() == 2
+
+        sampler = TopPSampleEmbeddingHelper(
+            start_tokens=start_tokens, end_token=self.end_token,
+            p=torch.Tensor([0.0, 1.0]), softmax_temperature=temperature)
+        index = sampler.sample(time=0, outputs=logits)
+        assert index[0].item() == 2
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -135,6 +135,7 @@ class GPT2Decoder(PretrainedGPT2Mixin):
                     "residual_dropout": 0,
                     "multihead_attention": {
                         "use_bias": True,
+                        "attention_backend": "default",
                         "num_units": 768,
                         "num_heads": 12,
                         "dropout_rate": 0.0,
@@ -211,6 +212,7 @@ class GPT2Decoder(PretrainedGPT2Mixin):
                 'residual_dropout': 0,
                 'multihead_attention': {
                     'use_bias': True,
+                    'attention_backend': 'default',
                     'num_units': 768,
                     'num_heads': 12,
                     "dropout_rate": 0.0,
@@ -31,7 +31,7 @@ from texar.torch.modules.decoders.decoder_base import (
 from texar.torch.modules.decoders.decoder_helpers import Helper
 from texar.torch.modules.decoders.rnn_decoder_base import RNNDecoderBase
 from texar.torch.utils import utils
-from texar.torch.utils.beam_search import beam_search
+from texar.torch.utils.beam_search import batched_beam_search
 from texar.torch.utils.types import MaybeList, MaybeTuple
 from texar.torch.utils.utils import check_or_get_instance, get_function
 
@@ -784,28 +784,25 @@ class AttentionRNNDecoder(RNNDecoderBase[AttentionWrapperState,
                     length_penalty: float = 0.6) \
             -> Tuple[torch.LongTensor, torch.Tensor]:
 
-        def _prepare_beam_search(x):
-            x = x.unsqueeze(1).repeat(1, beam_width, *([1] * (x.dim() - 1)))
-            x = x.view(-1, *x.size()[2:])
-            return x
-
-        memory_beam_search = _prepare_beam_search(self.memory)
-        memory_sequence_length_beam_search = _prepare_beam_search(
-            self.memory_sequence_length)
-
-        def _symbols_to_logits_fn(ids, state):
+        def _symbols_to_logits_fn(ids, state, memory):
+            memory, memory_sequence_length = memory
             batch_size = ids.size(0)
+            # The beam search removes finished examples from `memory`, so the
+            # memory preprocessed by attention mechanisms must be recomputed.
+            for attention_mechanism in self._cell.attention_mechanisms:
+                if (attention_mechanism.values is not None and
+                        attention_mechanism.values.size(0) != batch_size):
+                    attention_mechanism.clear_cache()
             step = ids.size(-1) - 1
             times = ids.new_full((batch_size,), step)
             inputs = self.embed_tokens(ids[:, -1], times)
             wrapper_outputs, wrapper_state = self._cell(
-                inputs, state, memory_beam_search,
-                memory_sequence_length_beam_search)
+                inputs, state, memory, memory_sequence_length)
             logits = self._output_layer(wrapper_outputs)
             return logits, wrapper_state
 
         assert self._vocab_size is not None
-        outputs, log_prob = beam_search(
+        outputs, log_prob = batched_beam_search(
             symbols_to_logits_fn=_symbols_to_logits_fn,
             initial_ids=start_tokens,
             beam_size=beam_width,
@@ -813,6 +810,7 @@ class AttentionRNNDecoder(RNNDecoderBase[AttentionWrapperState,
             vocab_size=self._vocab_size,
             alpha=length_penalty,
             states=initial_state,
+            memory=(self.memory, self.memory_sequence_length),
             eos_id=end_token)
 
         # Ignores <BOS>
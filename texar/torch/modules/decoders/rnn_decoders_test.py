@@ -311,6 +311,56 @@ class AttentionRNNDecoderTest(unittest.TestCase):
 
             self._test_outputs(decoder, outputs, final_state, sequence_lengths)
 
+    def test_beam_search(self):
+        r"""Tests beam search decoding. Results of each example should not
+        depend on other examples in the batch.
+        """
+        seq_length = np.random.randint(
+            self._max_time, size=[self._batch_size]) + 1
+        encoder_values_length = torch.tensor(seq_length)
+        beam_width = 3
+        start_tokens = torch.tensor([1] * self._batch_size)
+
+        for (cell_type, is_multi), hparams in self._test_hparams.items():
+            decoder = AttentionRNNDecoder(
+                encoder_output_size=64,
+                token_embedder=self._embedder,
+                vocab_size=self._vocab_size,
+                input_size=self._emb_dim,
+                hparams=hparams)
+            decoder.eval()
+
+            outputs = decoder(
+                memory=self._encoder_output,
+                memory_sequence_length=encoder_values_length,
+                beam_width=beam_width,
+                start_tokens=start_tokens,
+                end_token=2,
+                max_decoding_length=10)
+            sample_id = outputs['sample_id']
+            self.assertEqual(outputs['log_prob'].size(),
+                             (self._batch_size, beam_width))
+            self.assertEqual(sample_id.size(0), self._batch_size)
+            self.assertLessEqual(sample_id.size(1), 10)
+            self.assertEqual(sample_id.size(2), beam_width)
+
+            for idx in range(self._batch_size):
+                single_outputs = decoder(
+                    memory=self._encoder_output[idx:(idx + 1)],
+                    memory_sequence_length=encoder_values_length[
+                        idx:(idx + 1)],
+                    beam_width=beam_width,
+                    start_tokens=start_tokens[idx:(idx + 1)],
+                    end_token=2,
+                    max_decoding_length=10)
+                single_id = single_outputs['sample_id'][0, :, 0]
+                length = single_id.size(0)
+                self.assertEqual(sample_id[idx, :length, 0].tolist(),
+                                 single_id.tolist())
+                np.testing.assert_allclose(
+                    outputs['log_prob'][idx, 0].item(),
+                    single_outputs['log_prob'][0, 0].item(), rtol=1e-4)
+
 
 if __name__ == "__main__":
     unittest.main()
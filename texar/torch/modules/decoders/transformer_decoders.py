@@ -26,12 +26,12 @@ from texar.torch.modules.decoders.decoder_base import (
 from texar.torch.modules.decoders.decoder_helpers import (
     EmbeddingHelper, Helper)
 from texar.torch.modules.encoders.multihead_attention import (
-    Cache, MultiheadAttentionEncoder)
+    Cache, KVCache, MultiheadAttentionEncoder)
 from texar.torch.modules.encoders.transformer_encoder import (
     default_transformer_poswise_net_hparams)
 from texar.torch.modules.networks.networks import FeedForwardNetwork
 from texar.torch.utils import transformer_attentions as attn
-from texar.torch.utils.beam_search import beam_search
+from texar.torch.utils.beam_search import batched_beam_search
 from texar.torch.utils.shapes import mask_sequences
 from texar.torch.utils.utils import sequence_mask
 
@@ -110,6 +110,9 @@ class TransformerDecoder(DecoderBase[Cache, TransformerDecoderOutput]):
     _state_context_sequence_length: Optional[torch.LongTensor]
     _state_cache: Cache
 
+    # Maximum number of positions preallocated in the key/value cache.
+    _MAX_CACHE_PREALLOC_LENGTH = 256
+
     def __init__(self,
                  token_embedder: Optional[TokenEmbedder] = None,
                  token_pos_embedder: Optional[TokenPosEmbedder] = None,
@@ -211,6 +214,7 @@ class TransformerDecoder(DecoderBase[Cache, TransformerDecoderOutput]):
                     'num_heads': 8,
                     'dropout_rate': 0.1,
                     'use_bias': False,
+                    'attention_backend': 'default',
                 },
                 "eps": 1e-12,
                 "initializer": None,
@@ -294,6 +298,7 @@ class TransformerDecoder(DecoderBase[Cache, TransformerDecoderOutput]):
                 'dropout_rate': 0.1,
                 'output_dim': 512,
                 'use_bias': False,
+                'attention_backend': 'default',
             },
             'eps': 1e-12,
             'initializer': None,
@@ -544,7 +549,8 @@ class TransformerDecoder(DecoderBase[Cache, TransformerDecoderOutput]):
 
             self._state_cache = self._init_cache(
                 memory, memory_attention_bias,
-                beam_search_decoding=False, batch_size=helper.batch_size)
+                beam_search_decoding=False, batch_size=helper.batch_size,
+                max_length=max_decoding_length)
             if context is not None:
                 assert self._state_context is not None
                 pad_length = max_decoding_length - self._state_context.size(1)
@@ -595,7 +601,9 @@ class TransformerDecoder(DecoderBase[Cache, TransformerDecoderOutput]):
             self._state_cache = self._init_cache(
                 memory, memory_attention_bias,
                 beam_search_decoding=True,
-                batch_size=_batch_size)
+                batch_size=_batch_size,
+                max_length=max_decoding_length,
+                beam_width=beam_width)
             end_token: int = kwargs.get('end_token')  # type: ignore
 
             # The output format is different when running beam search.
@@ -653,39 +661,42 @@ class TransformerDecoder(DecoderBase[Cache, TransformerDecoderOutput]):
     def _init_cache(self, memory: Optional[torch.Tensor],
                     memory_attention_bias: Optional[torch.Tensor],
                     beam_search_decoding: bool,
-                    batch_size: int) -> Cache:
+                    batch_size: int,
+                    max_length: Optional[int] = None,
+                    beam_width: int = 1) -> Cache:
         r"""Returns an initialized cache.
 
-        In order to support both inference-like decoding and beam-search
-        decoding, the elements of each layer must be initialized and extended
-        as different structure respectively. Specifically, for inference-like
-        decoding, a simple list is used; for beam-search decoding, a
-        :tensor:`Tensor` of shape ``[batch_size, current_steps, num_units]``
-        is maintained, where ``current_steps`` is the number of steps currently
-        decoded.
+        The keys and values of each self-attention layer are stored in a
+        :class:`~texar.torch.modules.encoders.multihead_attention.KVCache`,
+        which preallocates buffers of shape
+        ``[batch_size, num_heads, max_length, head_dim]`` and writes each
+        decoding step in place. At most :attr:`_MAX_CACHE_PREALLOC_LENGTH`
+        positions are preallocated, since :attr:`max_length` may be
+        effectively unbounded (e.g., the default ``max_decoding_length``);
+        the buffers are enlarged as needed. For beam-search decoding, the
+        buffers are allocated for ``batch_size * beam_width`` hypotheses, and
+        are reordered in place by the beam search to follow the surviving
+        beams.
         """
 
-        device = next(self.parameters()).device
-
-        def _create_ta():
-            return []
+        params = next(self.parameters())
+        num_heads = self._hparams.multihead_attention.num_heads
+        head_dim = self._hparams.multihead_attention.num_units // num_heads
+        if max_length is None:
+            max_length = self._hparams.max_decoding_length
+        max_length = min(max_length, self._MAX_CACHE_PREALLOC_LENGTH)
+        if not beam_search_decoding:
+            beam_width = 1
 
-        def _create_empty_tensor():
-            ret = torch.zeros(
-                batch_size, 0, self._hparams.multihead_attention.num_units,
-                dtype=torch.float, device=device)
-            return ret
-
-        _create_fn = (_create_empty_tensor if beam_search_decoding
-                      else _create_ta)
+        def _create_kv_cache():
+            return KVCache(batch_size * beam_width, num_heads, max_length,
+                           head_dim, dtype=params.dtype, device=params.device)
 
         cache: Cache = {
             'memory': memory,
             'memory_attention_bias': memory_attention_bias,
-            'layers': [{
-                'keys': _create_fn(),
-                'values': _create_fn(),
-            } for _ in range(self._hparams.num_blocks)],
+            'layers': [_create_kv_cache()
+                       for _ in range(self._hparams.num_blocks)],
         }
 
         return cache
@@ -697,23 +708,31 @@ class TransformerDecoder(DecoderBase[Cache, TransformerDecoderOutput]):
                     length_penalty: float = 0.6) \
             -> Tuple[torch.Tensor, torch.Tensor]:
 
-        def _symbols_to_logits_fn(ids, cache):
+        cache = self._state_cache
+
+        def _symbols_to_logits_fn(ids, layer_caches, memory):
             batch_size = ids.size(0)
             step = ids.size(-1) - 1
             times = ids.new_full((batch_size,), step)
             inputs = embedding_fn(ids[:, -1], times)
-            return self._inputs_to_outputs(inputs, cache)
+            # The beam search reorders `layer_caches` in place, and only
+            # reduces `memory` when examples finish.
+            cache['memory'], cache['memory_attention_bias'] = memory
+            cache['layers'] = layer_caches
+            logits, _ = self._inputs_to_outputs(inputs, cache)
+            return logits, layer_caches
 
         assert self._vocab_size is not None
 
-        outputs, log_prob = beam_search(
+        outputs, log_prob = batched_beam_search(
             _symbols_to_logits_fn,
             start_tokens,
             beam_width,
             decode_length,
             self._vocab_size,
             length_penalty,
-            states=self._state_cache,
+            states=cache['layers'],
+            memory=(cache['memory'], cache['memory_attention_bias']),
             eos_id=end_token)
 
         # Ignores <BOS>
@@ -10,6 +10,7 @@ from texar.torch.core.layers import identity
 from texar.torch.modules.decoders import decoder_helpers
 from texar.torch.modules.decoders.transformer_decoders import (
     TransformerDecoder, TransformerDecoderOutput)
+from texar.torch.modules.encoders.multihead_attention import KVCache
 
 
 class TransformerDecoderTest(unittest.TestCase):
@@ -118,6 +119,119 @@ class TransformerDecoderTest(unittest.TestCase):
 
         self.assertIsInstance(outputs, TransformerDecoderOutput)
 
+    def test_decode_infer_greedy_cache(self):
+        """Tests that incremental decoding with the preallocated cache gives
+        the same logits as running over the full sequence.
+        """
+        decoder = TransformerDecoder(
+            token_pos_embedder=self._embedding_fn,
+            vocab_size=self._vocab_size, output_layer=self._output_layer)
+        decoder.eval()
+        helper = decoder_helpers.GreedyEmbeddingHelper(
+            self._start_tokens, self._end_token)
+
+        with torch.no_grad():
+            outputs, _ = decoder(
+                memory=self._memory,
+                memory_sequence_length=self._memory_sequence_length,
+                helper=helper,
+                max_decoding_length=self._max_decode_len)
+            inputs = torch.cat([self._start_tokens.unsqueeze(1),
+                                outputs.sample_id[:, :-1]], dim=1)
+            train_outputs = decoder(
+                memory=self._memory,
+                memory_sequence_length=self._memory_sequence_length,
+                inputs=inputs,
+                decoding_strategy='train_greedy')
+
+        self.assertTrue(torch.allclose(
+            outputs.logits, train_outputs.logits, atol=1e-4))
+
+    def test_decode_infer_default_max_length(self):
+        """Tests inference without specifying `max_decoding_length`, in which
+        case the (effectively unbounded) default hyperparameter is used.
+        """
+        # All logits are zero, so greedy decoding emits token 0, which is used
+        # as the end token.
+        decoder = TransformerDecoder(
+            token_pos_embedder=self._embedding_fn,
+            vocab_size=self._vocab_size,
+            output_layer=torch.zeros(self._vocab_size, self._emb_dim))
+        decoder.eval()
+
+        outputs, length = decoder(
+            memory=self._memory,
+            memory_sequence_length=self._memory_sequence_length,
+            decoding_strategy='infer_greedy',
+            start_tokens=self._start_tokens,
+            end_token=0)
+
+        self.assertEqual(outputs.sample_id.size(), (self._batch_size, 1))
+        self.assertEqual(length.tolist(), [1] * self._batch_size)
+
+    def test_decode_attention_backend(self):
+        """Tests that the efficient attention backend gives the same logits as
+        the default backend, in both training and incremental decoding.
+        """
+        decoder = TransformerDecoder(
+            token_pos_embedder=self._embedding_fn,
+            vocab_size=self._vocab_size, output_layer=self._output_layer)
+        efficient_decoder = TransformerDecoder(
+            token_pos_embedder=self._embedding_fn,
+            vocab_size=self._vocab_size, output_layer=self._output_layer,
+            hparams={"multihead_attention": {
+                "attention_backend": "efficient"}})
+        efficient_decoder.load_state_dict(decoder.state_dict())
+        decoder.eval()
+        efficient_decoder.eval()
+        helper = decoder_helpers.GreedyEmbeddingHelper(
+            self._start_tokens, self._end_token)
+
+        with torch.no_grad():
+            outputs, _ = decoder(
+                memory=self._memory,
+                memory_sequence_length=self._memory_sequence_length,
+                helper=helper,
+                max_decoding_length=self._max_decode_len)
+            efficient_outputs, _ = efficient_decoder(
+                memory=self._memory,
+                memory_sequence_length=self._memory_sequence_length,
+                helper=helper,
+                max_decoding_length=self._max_decode_len)
+            self.assertTrue(torch.allclose(
+                outputs.logits, efficient_outputs.logits, atol=1e-4))
+
+            train_outputs = decoder(
+                memory=self._memory,
+                memory_sequence_length=self._memory_sequence_length,
+                inputs=self._inputs,
+                decoding_strategy='train_greedy')
+            efficient_train_outputs = efficient_decoder(
+                memory=self._memory,
+                memory_sequence_length=self._memory_sequence_length,
+                inputs=self._inputs,
+                decoding_strategy='train_greedy')
+            self.assertTrue(torch.allclose(
+                train_outputs.logits, efficient_train_outputs.logits,
+                atol=1e-4))
+
+    def test_kv_cache(self):
+        """Tests :class:`KVCache` writes, enlargement and reordering.
+        """
+        cache = KVCache(batch_size=2, num_heads=3, max_length=2, head_dim=4)
+        steps = [torch.rand(2, 3, 1, 4) for _ in range(3)]
+        for step in steps:
+            keys, values = cache.append(step, -step)
+        self.assertEqual(cache.length, 3)
+        self.assertEqual(keys.size(), (2, 3, 3, 4))
+        self.assertTrue(torch.equal(keys, torch.cat(steps, dim=2)))
+        self.assertTrue(torch.equal(values, -keys))
+
+        keys = keys.clone()
+        cache.reorder_(torch.tensor([1, 1]))
+        self.assertTrue(torch.equal(cache.keys[0], keys[1]))
+        self.assertTrue(torch.equal(cache.keys[1], keys[1]))
+
     def test_infer_greedy_with_context_without_memory(self):
         """Tests train_greedy with context
         """
@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Type, Union
+from collections import deque
+from typing import (
+    Any, Deque, Dict, List, NamedTuple, Optional, Tuple, Type, Union)
 
 import torch
 from torch.nn import functional as F
@@ -20,7 +22,10 @@ from torch.nn import functional as F
 from texar.torch.modules.decoders.decoder_base import DecoderBase
 from texar.torch.modules.decoders.decoder_helpers import (
     Helper, SampleEmbeddingHelper)
+from texar.torch.modules.encoders.multihead_attention import KVCache
 from texar.torch.modules.encoders.xlnet_encoder import XLNetEncoder
+from texar.torch.modules.pretrained.xlnet_utils import (
+    RelativeMultiheadAttention)
 from texar.torch.utils import get_instance
 
 __all__ = [
@@ -73,6 +78,12 @@ class XLNetDecoder(XLNetEncoder, DecoderBase[Optional[State], Output]):
     _state_recompute_memory: bool
     # required for recomputing memory
     _state_previous_inputs: List[torch.Tensor]
+    # required for incremental decoding
+    _state_incremental: bool
+    _state_mem_len: int
+    _state_kv_caches: List[KVCache]
+    _state_pos_keys: List[torch.Tensor]
+    _state_hidden: List[Deque[torch.Tensor]]
 
     @staticmethod
     def default_hparams() -> Dict[str, Any]:
@@ -247,9 +258,70 @@ class XLNetDecoder(XLNetEncoder, DecoderBase[Optional[State], Output]):
             self.embed_tokens, inputs, sequence_length)
         return initial_finished, initial_inputs, initial_state
 
+    def _init_incremental_state(self, memory: Optional[State],
+                                batch_size: int) -> None:
+        r"""Create the caches used in incremental decoding from the initial
+        memory.
+        """
+        mem_len = memory[0].size(1) if memory is not None else 0
+        max_len = max(mem_len, self._state_cache_len) + 2
+        self._state_mem_len = mem_len
+        self._state_kv_caches = []
+        self._state_pos_keys = []
+        self._state_hidden = []
+
+        # Relative distances `max_len - 1, ..., 0`.
+        pos_embed = self.pos_embed(
+            1, 1, max_len - 1, attn_type='uni', bi_data=False)[:, 0]
+        pos_embed = self.dropout(pos_embed)
+        for idx in range(self._hparams.num_layers):
+            attn_layer: RelativeMultiheadAttention
+            attn_layer = self.attn_layers[idx]  # type: ignore
+            cache = KVCache(
+                batch_size, self._hparams.num_heads,
+                mem_len + self._state_cache_len, self._hparams.head_dim,
+                dtype=pos_embed.dtype, device=pos_embed.device)
+            if memory is not None:
+                cache.append(*attn_layer.project_memory(memory[idx]))
+            self._state_kv_caches.append(cache)
+            self._state_pos_keys.append(
+                attn_layer.project_positions(pos_embed))
+            self._state_hidden.append(deque(
+                memory[idx].unbind(dim=1) if memory is not None else [],
+                maxlen=max(mem_len, self._state_cache_len)))
+
+    def _incremental_step(self, inputs: torch.Tensor) -> torch.Tensor:
+        r"""Compute the query stream output of the position after
+        :attr:`inputs`, reusing cached states of previous positions.
+        """
+        mem_len = self._state_mem_len
+        states_h = self.dropout(inputs)
+        states_g = self.dropout(
+            self.mask_emb.view(1, -1).expand_as(states_h))
+        for idx in range(self._hparams.num_layers):
+            self._state_hidden[idx].append(states_h)
+            attn_layer: RelativeMultiheadAttention
+            attn_layer = self.attn_layers[idx]  # type: ignore
+            states_h, states_g = attn_layer.forward_incremental(
+                states_h, states_g, self._state_pos_keys[idx],
+                self._state_kv_caches[idx], mem_len)
+            states_h = self.ff_layers[idx](states_h)
+            states_g = self.ff_layers[idx](states_g)
+        # Keep the same number of positions in memory as the non-incremental
+        # path, which drops the target position from `cache_len` positions.
+        self._state_mem_len = min(mem_len + 1, self._state_cache_len - 1)
+        return self.dropout(states_g)
+
     def step(self, helper: Helper, time: int, inputs: torch.Tensor,
              state: Optional[State]) -> \
             Tuple[Output, Optional[State]]:
+        if self._state_incremental:
+            net_output = self._incremental_step(inputs)
+            logits = F.linear(net_output, self.word_embed.weight, self.lm_bias)
+            sample_ids = helper.sample(time=time, outputs=logits)
+            outputs = XLNetDecoderOutput(logits=logits, sample_id=sample_ids)
+            return outputs, state
+
         self._state_previous_inputs.append(inputs)
         if self._state_recompute_memory:
             net_output, memory = self._forward(
@@ -279,8 +351,19 @@ class XLNetDecoder(XLNetEncoder, DecoderBase[Optional[State], Output]):
         return next_inputs, finished
 
     def finalize(self, outputs, final_state, sequence_lengths):
+        if self._state_incremental:
+            mem_len = self._state_mem_len
+            final_state = None
+            if mem_len > 0:
+                final_state = [torch.stack(list(hidden)[-mem_len:], dim=1)
+                               for hidden in self._state_hidden]
+            del self._state_mem_len
+            del self._state_kv_caches
+            del self._state_pos_keys
+            del self._state_hidden
         del self._state_cache_len
         del self._state_recompute_memory
+        del self._state_incremental
         del self._state_previous_inputs
         return super().finalize(outputs, final_state, sequence_lengths)
 
@@ -290,6 +373,7 @@ class XLNetDecoder(XLNetEncoder, DecoderBase[Optional[State], Output]):
                 cache_len: int = 512,
                 max_decoding_length: Optional[int] = 500,
                 recompute_memory: bool = True,
+                incremental: bool = True,
                 print_steps: bool = False,
                 helper_type: Optional[Union[str, Type[Helper]]] = None,
                 **helper_kwargs) \
@@ -309,6 +393,14 @@ class XLNetDecoder(XLNetEncoder, DecoderBase[Optional[State], Output]):
                 other, compared to reusing previous memory which is equivalent
                 to using a causal attention mask. However, it is computationally
                 more expensive. Defaults to `True`.
+            incremental (bool): Only used when :attr:`recompute_memory` is
+                `False`. If `True`, content keys and values of previous
+                positions are cached for each layer, and each decoding step
+                only computes the new position, so that the cost of a step
+                does not grow with the length of the generated sequence. If
+                `False`, memory states are concatenated and projected again at
+                each step. Both settings compute the same results up to
+                floating point errors. Defaults to `True`.
             print_steps (bool): If `True`, will print decoding progress.
             helper: Type (or name of the type) of any sub-class of
                 :class:`~texar.torch.modules.Helper`.
@@ -322,6 +414,7 @@ class XLNetDecoder(XLNetEncoder, DecoderBase[Optional[State], Output]):
 
         start_tokens = start_tokens.t()
         self._state_recompute_memory = recompute_memory
+        self._state_incremental = incremental and not recompute_memory
         self._state_cache_len = cache_len
         self._state_previous_inputs = list(
             self.word_embed(start_tokens).unbind(dim=0))[:-1]
@@ -335,6 +428,8 @@ class XLNetDecoder(XLNetEncoder, DecoderBase[Optional[State], Output]):
                 **self._create_input(
                     self._state_previous_inputs, initial=True))
         start_tokens = start_tokens[-1]
+        if self._state_incremental:
+            self._init_incremental_state(memory, start_tokens.size(0))
 
         helper_kwargs.update(start_tokens=start_tokens)
 
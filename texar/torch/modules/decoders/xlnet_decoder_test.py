@@ -111,6 +111,40 @@ class XLNetDecoderTest(unittest.TestCase):
 
         self.assertIsInstance(outputs, XLNetDecoderOutput)
 
+    def test_incremental_decoding(self):
+        r"""Tests that incremental decoding gives the same results as decoding
+        with memory reuse."""
+        hparams = {
+            "pretrained_model_name": None,
+            "num_layers": 2,
+            "num_heads": 4,
+            "hidden_dim": 32,
+            "head_dim": 8,
+            "ffn_inner_dim": 64,
+            "vocab_size": 100,
+        }
+        decoder = XLNetDecoder(hparams=hparams)
+        decoder.eval()
+
+        start_tokens = torch.randint(100, (self.batch_size, 5))
+        for cache_len in [512, 4]:
+            results = []
+            for incremental in [False, True]:
+                with torch.no_grad():
+                    results.append(decoder(
+                        start_tokens, cache_len=cache_len,
+                        recompute_memory=False, incremental=incremental,
+                        max_decoding_length=10, end_token=-1,
+                        helper_type="GreedyEmbeddingHelper"))
+            (output, memory), (inc_output, inc_memory) = results
+            self.assertTrue(torch.equal(output.sample_id, inc_output.sample_id))
+            self.assertTrue(torch.allclose(
+                output.logits, inc_output.logits, atol=1e-5))
+            self.assertEqual(len(memory), len(inc_memory))
+            for mem, inc_mem in zip(memory, inc_memory):
+                self.assertEqual(mem.size(), inc_mem.size())
+                self.assertTrue(torch.allclose(mem, inc_mem, atol=1e-5))
+
 
 if __name__ == "__main__":
     unittest.main()
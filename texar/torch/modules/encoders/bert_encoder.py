@@ -143,7 +143,8 @@ class BERTEncoder(EncoderBase, PretrainedBERTMixin):
                         "num_heads": 12,
                         "num_units": 768,
                         "output_dim": 768,
-                        "use_bias": True
+                        "use_bias": True,
+                        "attention_backend": "default"
                     },
                     "name": "encoder",
                     "num_blocks": 12,
@@ -170,7 +171,8 @@ class BERTEncoder(EncoderBase, PretrainedBERTMixin):
                         ]
                     },
                     "residual_dropout": 0.1,
-                    "use_bert_config": True
+                    "use_bert_config": True,
+                    "unpad_inputs": False
                     },
                 "hidden_size": 768,
                 "initializer": None,
@@ -206,7 +208,8 @@ class BERTEncoder(EncoderBase, PretrainedBERTMixin):
         `"encoder"`: dict
             Hyperparameters for the TransformerEncoder.
             See :func:`~texar.torch.modules.TransformerEncoder.default_hparams`
-            for details.
+            for details. Set ``"unpad_inputs"`` to `True` to skip computation
+            on padding positions.
 
         `"hidden_size"`: int
             Size of the pooler dense layer.
@@ -250,7 +253,8 @@ class BERTEncoder(EncoderBase, PretrainedBERTMixin):
                     'num_heads': 12,
                     'num_units': 768,
                     'output_dim': 768,
-                    'use_bias': True
+                    'use_bias': True,
+                    'attention_backend': 'default'
                 },
                 'name': 'encoder',
                 'num_blocks': 12,
@@ -277,7 +281,8 @@ class BERTEncoder(EncoderBase, PretrainedBERTMixin):
                     ]
                 },
                 'residual_dropout': 0.1,
-                'use_bert_config': True
+                'use_bert_config': True,
+                'unpad_inputs': False
             },
             'hidden_size': 768,
             'initializer': None,
@@ -190,6 +190,35 @@ class BERTEncoderTest(unittest.TestCase):
             pooled_output.shape,
             torch.Size([self.batch_size, encoder.output_size]))
 
+    def test_unpad_inputs(self):
+        r"""Tests encoding with padding positions removed.
+        """
+        hparams = {
+            "pretrained_model_name": None,
+            "encoder": {
+                "num_blocks": 2,
+            },
+        }
+        encoder = BERTEncoder(hparams=hparams)
+        hparams["encoder"]["unpad_inputs"] = True
+        unpad_encoder = BERTEncoder(hparams=hparams)
+        self.assertTrue(unpad_encoder.hparams.encoder.unpad_inputs)
+        unpad_encoder.load_state_dict(encoder.state_dict())
+        encoder.eval()
+        unpad_encoder.eval()
+
+        inputs = torch.randint(30521, (self.batch_size, self.max_length))
+        sequence_length = torch.tensor([2, 3])
+        outputs, pooled_output = encoder(inputs, sequence_length)
+        unpad_outputs, unpad_pooled_output = unpad_encoder(
+            inputs, sequence_length)
+        self.assertTrue(torch.allclose(
+            unpad_outputs[0, :2], outputs[0, :2], atol=1e-5))
+        self.assertTrue(torch.allclose(
+            unpad_outputs[1], outputs[1], atol=1e-5))
+        self.assertTrue(torch.allclose(
+            unpad_pooled_output, pooled_output, atol=1e-5))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -117,6 +117,7 @@ class GPT2Encoder(EncoderBase, PretrainedGPT2Mixin):
                     "residual_dropout": 0,
                     "multihead_attention": {
                         "use_bias": True,
+                        "attention_backend": "default",
                         "num_units": 768,
                         "num_heads": 12,
                         "output_dim": 768
@@ -205,6 +206,7 @@ class GPT2Encoder(EncoderBase, PretrainedGPT2Mixin):
                 'residual_dropout': 0,
                 'multihead_attention': {
                     'use_bias': True,
+                    'attention_backend': 'default',
                     'num_units': 768,
                     'num_heads': 12,
                     'output_dim': 768
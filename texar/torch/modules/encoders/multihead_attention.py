@@ -15,7 +15,7 @@
 Transformer encoders with multi-head self attention.
 """
 
-from typing import List, Optional
+from typing import List, Optional, Tuple, Union
 
 import torch
 import torch.nn.functional as F
@@ -40,17 +40,217 @@ class LayerCache(TypedDict):
     values: MaybeList[torch.Tensor]
 
 
+class KVCache:
+    r"""Preallocated key/value cache for a single self-attention layer in
+    :class:`MultiheadAttentionEncoder`, used in incremental decoding.
+
+    Keys and values are stored in buffers of shape
+    ``[batch_size, num_heads, max_length, head_dim]``. Each decoding step
+    writes its keys and values into the buffers in place, and attention is
+    computed over a view of the first :attr:`length` positions. Thus the cost
+    of a decoding step does not depend on the number of steps already decoded.
+    The buffers are enlarged if more than ``max_length`` steps are decoded.
+
+    Args:
+        batch_size (int): The batch size. For beam search decoding, this should
+            be ``batch_size * beam_width``.
+        num_heads (int): Number of attention heads.
+        max_length (int): Number of positions to preallocate.
+        head_dim (int): Dimension of keys and values for each head.
+        dtype (optional): Data type of the buffers.
+        device (optional): Device to allocate the buffers on.
+    """
+
+    def __init__(self, batch_size: int, num_heads: int, max_length: int,
+                 head_dim: int, dtype: torch.dtype = torch.float,
+                 device: Optional[torch.device] = None):
+        size = (batch_size, num_heads, max(max_length, 1), head_dim)
+        self._keys = torch.zeros(size, dtype=dtype, device=device)
+        self._values = torch.zeros(size, dtype=dtype, device=device)
+        self.length = 0
+
+    @property
+    def keys(self) -> torch.Tensor:
+        r"""The cached keys, of shape
+        ``[batch_size, num_heads, length, head_dim]``.
+        """
+        return self._keys[:, :, :self.length]
+
+    @property
+    def values(self) -> torch.Tensor:
+        r"""The cached values, of shape
+        ``[batch_size, num_heads, length, head_dim]``.
+        """
+        return self._values[:, :, :self.length]
+
+    @staticmethod
+    def _in_place(*tensors: torch.Tensor) -> bool:
+        # In-place writes would modify tensors saved for the backward pass of
+        # previous steps, so they're only allowed when no gradient is needed.
+        return not (torch.is_grad_enabled() and
+                    any(t.requires_grad for t in tensors))
+
+    def _grow(self, min_length: int) -> None:
+        capacity = self._keys.size(2)
+        new_capacity = max(min_length, 2 * capacity)
+        size = self._keys.size()
+        pad_size = (size[0], size[1], new_capacity - capacity, size[3])
+        pad = self._keys.new_zeros(pad_size)
+        self._keys = torch.cat([self._keys, pad], dim=2)
+        self._values = torch.cat([self._values, pad], dim=2)
+
+    def append(self, keys: torch.Tensor, values: torch.Tensor) \
+            -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Writes the keys and values of new positions into the cache.
+
+        Args:
+            keys: A tensor of shape
+                ``[batch_size, num_heads, num_steps, head_dim]``.
+            values: A tensor of the same shape as :attr:`keys`.
+
+        Returns:
+            A tuple of cached keys and values (including the new positions),
+            each of shape ``[batch_size, num_heads, length, head_dim]``.
+        """
+        start = self.length
+        end = start + keys.size(2)
+        if end > self._keys.size(2):
+            self._grow(end)
+        if self._in_place(keys, values):
+            self._keys[:, :, start:end] = keys
+            self._values[:, :, start:end] = values
+        else:
+            self._keys = torch.cat(
+                [self._keys[:, :, :start], keys, self._keys[:, :, end:]],
+                dim=2)
+            self._values = torch.cat(
+                [self._values[:, :, :start], values, self._values[:, :, end:]],
+                dim=2)
+        self.length = end
+        return self.keys, self.values
+
+    def reorder_(self, index: torch.LongTensor) -> None:
+        r"""Reorders the batch dimension of the cache in place, so that the
+        ``i``-th example becomes the ``index[i]``-th example before
+        reordering. Only the filled positions are moved. This is used in beam
+        search decoding to follow the surviving beams.
+
+        :attr:`index` may contain fewer entries than the batch size, in which
+        case the cache is reduced to the selected examples, e.g., when some
+        examples finish decoding.
+
+        Args:
+            index: A :tensor:`LongTensor` of shape ``[new_batch_size]``.
+        """
+        if index.size(0) != self._keys.size(0):
+            size = (index.size(0),) + self._keys.size()[1:]
+            keys = self._keys.new_zeros(size)
+            values = self._values.new_zeros(size)
+            keys[:, :, :self.length] = self.keys.index_select(0, index)
+            values[:, :, :self.length] = self.values.index_select(0, index)
+            self._keys, self._values = keys, values
+        elif self.length == 0:
+            return
+        elif self._in_place(self._keys, self._values):
+            self._keys[:, :, :self.length] = self.keys.index_select(0, index)
+            self._values[:, :, :self.length] = \
+                self.values.index_select(0, index)
+        else:
+            self._keys = self._keys.index_select(0, index)
+            self._values = self._values.index_select(0, index)
+
+
+class _FusedLinearSlice:
+    r"""One of the query, key and value projections of a
+    :class:`MultiheadAttentionEncoder` with fused projections. This provides
+    the interface of the :torch_nn:`Linear` module it replaces, so that
+    ``Q_dense``, ``K_dense`` and ``V_dense`` can still be called, and their
+    parameters loaded, e.g., by pre-trained checkpoint loaders.
+    """
+
+    def __init__(self, module: 'MultiheadAttentionEncoder', index: int):
+        self.weight = _ParameterSlice(module, 'qkv_weight', index)
+        self.bias = (_ParameterSlice(module, 'qkv_bias', index)
+                     if module.qkv_bias is not None else None)
+
+    def __call__(self, inputs: torch.Tensor) -> torch.Tensor:
+        return F.linear(inputs, self.weight.data_view(),
+                        None if self.bias is None else self.bias.data_view())
+
+
+class _ParameterSlice:
+    r"""A slice of a fused parameter, with the interface of a parameter.
+    Assigning to :attr:`data` replaces the slice within the fused parameter.
+    Other attributes (e.g., ``shape`` and ``dtype``) are those of the slice.
+    """
+
+    def __init__(self, module: 'MultiheadAttentionEncoder', name: str,
+                 index: int):
+        self._module = module
+        self._name = name
+        self._index = index
+
+    def data_view(self) -> torch.Tensor:
+        r"""Returns the slice of the fused parameter, which is differentiable
+        with respect to the fused parameter.
+        """
+        return getattr(self._module, self._name).chunk(3)[self._index]
+
+    @property
+    def data(self) -> torch.Tensor:
+        return self.data_view().data
+
+    @data.setter
+    def data(self, value: torch.Tensor) -> None:
+        param = getattr(self._module, self._name)
+        chunks = list(param.data.chunk(3))
+        chunks[self._index] = value.to(device=param.device, dtype=param.dtype)
+        param.data = torch.cat(chunks)
+
+    def __getattr__(self, item):
+        return getattr(self.data, item)
+
+
+_QKV_NAMES = ['Q_dense', 'K_dense', 'V_dense']
+
+
+def _split_qkv_state_dict(module: nn.Module, state_dict, prefix: str,
+                          local_metadata) -> None:
+    r"""State dict hook of :class:`MultiheadAttentionEncoder` with fused
+    projections, which stores the fused parameters as separate projections.
+    Slices are copied, so that each is saved without the fused storage.
+    """
+    # pylint: disable=unused-argument
+    for kind in ['weight', 'bias']:
+        fused = state_dict.pop(f"{prefix}qkv_{kind}", None)
+        if fused is None:
+            continue
+        for name, chunk in zip(_QKV_NAMES, fused.chunk(3)):
+            state_dict[f"{prefix}{name}.{kind}"] = chunk.clone()
+
+
 class Cache(TypedDict):
     r"""Cache (state) for the entire :class:`MultiheadAttentionEncoder`.
     """
     memory: Optional[torch.Tensor]
     memory_attention_bias: Optional[torch.Tensor]
-    layers: List[LayerCache]
+    layers: List[Union[LayerCache, KVCache]]
 
 
 class MultiheadAttentionEncoder(EncoderBase):
     r"""Multi-head Attention Encoder.
 
+    The ``"attention_backend"`` hyperparameter selects how attention is
+    computed. With the ``"efficient"`` backend, queries, keys and values of
+    self attention are projected with a single matrix multiplication, and
+    attention is computed by
+    :func:`torch.nn.functional.scaled_dot_product_attention` if the installed
+    PyTorch provides it, or otherwise in blocks of queries so that the full
+    attention matrix is never materialized. The projections are stored in the
+    fused parameters ``qkv_weight`` and ``qkv_bias``, but are saved and loaded
+    as separate ``Q_dense``, ``K_dense`` and ``V_dense`` parameters, so
+    checkpoints can be used interchangeably between backends.
+
     Args:
         hparams (dict or HParams, optional): Hyperparameters. Missing
             hyperparameters will be set to default values. See
@@ -60,16 +260,36 @@ class MultiheadAttentionEncoder(EncoderBase):
     .. document private functions
     """
 
+    # Number of queries per block in the chunked fallback of the
+    # ``"efficient"`` backend.
+    _CHUNK_SIZE = 256
+
     def __init__(self, input_size: int, hparams=None):
         super().__init__(hparams=hparams)
         use_bias = self._hparams.use_bias
-
-        self.Q_dense = nn.Linear(input_size, self._hparams.num_units,
-                                 bias=use_bias)
-        self.K_dense = nn.Linear(input_size, self._hparams.num_units,
-                                 bias=use_bias)
-        self.V_dense = nn.Linear(input_size, self._hparams.num_units,
-                                 bias=use_bias)
+        if self._hparams.attention_backend not in ['default', 'efficient']:
+            raise ValueError(
+                f"Unknown attention backend: "
+                f"{self._hparams.attention_backend}")
+        denses = [nn.Linear(input_size, self._hparams.num_units,
+                            bias=use_bias) for _ in range(3)]
+        self.qkv_weight: Optional[nn.Parameter]
+        self.qkv_bias: Optional[nn.Parameter]
+        if self._hparams.attention_backend == 'efficient':
+            # Query, key and value projections are fused into a single
+            # weight (and bias), whose slices are initialized the same as the
+            # separate projections.
+            self.qkv_weight = nn.Parameter(
+                torch.cat([dense.weight.detach() for dense in denses]))
+            self.qkv_bias = (nn.Parameter(
+                torch.cat([dense.bias.detach() for dense in denses]))
+                             if use_bias else None)
+            # Checkpoints store separate projections, as for the default
+            # backend.
+            self._register_state_dict_hook(_split_qkv_state_dict)
+        else:
+            self.qkv_weight = self.qkv_bias = None
+            self.Q_dense, self.K_dense, self.V_dense = denses
         self.O_dense = nn.Linear(self._hparams.num_units,
                                  self._hparams.output_dim, bias=use_bias)
 
@@ -82,6 +302,31 @@ class MultiheadAttentionEncoder(EncoderBase):
                 if name.split('.')[-1] == 'weight':
                     print('name:{}'.format(name))
                     initialize(param)
+                elif name == 'qkv_weight':
+                    # Initialize as separate projections.
+                    for chunk in param.data.chunk(3):
+                        initialize(chunk)
+
+    def __getattr__(self, name: str):
+        if (name in _QKV_NAMES and
+                self.__dict__.get('_parameters', {}).get('qkv_weight')
+                is not None):
+            return _FusedLinearSlice(self, _QKV_NAMES.index(name))
+        return super().__getattr__(name)  # type: ignore
+
+    def _load_from_state_dict(self, state_dict, prefix, local_metadata,
+                              strict, missing_keys, unexpected_keys,
+                              error_msgs):
+        if self.qkv_weight is not None:
+            # Fuse separate projections stored in the checkpoint.
+            for kind in ['weight', 'bias']:
+                keys = [f"{prefix}{name}.{kind}" for name in _QKV_NAMES]
+                if all(key in state_dict for key in keys):
+                    state_dict[f"{prefix}qkv_{kind}"] = torch.cat(
+                        [state_dict.pop(key) for key in keys])
+        super()._load_from_state_dict(
+            state_dict, prefix, local_metadata, strict, missing_keys,
+            unexpected_keys, error_msgs)
 
     @staticmethod
     def default_hparams():
@@ -96,6 +341,7 @@ class MultiheadAttentionEncoder(EncoderBase):
                 'num_units': 512,
                 'dropout_rate': 0.1,
                 'use_bias': False,
+                'attention_backend': 'default',
                 "name": "multihead_attention"
             }
 
@@ -122,6 +368,12 @@ class MultiheadAttentionEncoder(EncoderBase):
         `"use_bias"`: bool
             Use bias when projecting the key, value and query.
 
+        `"attention_backend"`: str
+            How attention is computed. Either ``"default"``, which computes
+            the full attention matrix, or ``"efficient"``, which fuses the
+            projections of self attention and uses a memory-efficient
+            attention kernel.
+
         `"name"`: str
             Name of the module.
         """
@@ -132,6 +384,7 @@ class MultiheadAttentionEncoder(EncoderBase):
             'num_units': 512,
             'dropout_rate': 0.1,
             'use_bias': False,
+            'attention_backend': 'default',
             'name': 'multihead_attention',
         }
 
@@ -139,7 +392,7 @@ class MultiheadAttentionEncoder(EncoderBase):
                 queries: torch.Tensor,
                 memory: torch.Tensor,
                 memory_attention_bias: torch.Tensor,
-                cache: Optional[LayerCache] = None) \
+                cache: Optional[Union[LayerCache, KVCache]] = None) \
             -> torch.Tensor:
         r"""Encodes the inputs.
 
@@ -151,6 +404,9 @@ class MultiheadAttentionEncoder(EncoderBase):
             memory_attention_bias: A 3D tensor with shape of
                 ``[batch, length_key, num_units]``.
             cache: Memory cache only when inferring the sentence from scratch.
+                For self attention, this can also be a :class:`KVCache`, in
+                which case keys and values are written into its preallocated
+                buffers.
 
         Returns:
             A tensor of shape ``[batch_size, max_time, dim]`` containing the
@@ -171,6 +427,7 @@ class MultiheadAttentionEncoder(EncoderBase):
 
                 if cache is not None:
                     # decoder self attention when dynamic decoding
+                    assert not isinstance(cache, KVCache)
                     res: MaybeList[torch.Tensor] = cache[key]
                     if isinstance(res, list):
                         # inference-like decoding
@@ -185,6 +442,7 @@ class MultiheadAttentionEncoder(EncoderBase):
             else:
                 # encoder decoder attention
                 if cache is not None:
+                    assert not isinstance(cache, KVCache)
                     res: MaybeList[torch.Tensor] = cache[key]  # type: ignore
                     if isinstance(res, list):
                         # inference-like decoding
@@ -203,32 +461,156 @@ class MultiheadAttentionEncoder(EncoderBase):
 
             return out
 
-        Q = self.Q_dense(queries)
-        K = _update_and_return(self.K_dense, 'keys')
-        V = _update_and_return(self.V_dense, 'values')
+        fuse_qkv = (self._hparams.attention_backend == 'efficient' and
+                    (memory is None or memory is queries) and
+                    (cache is None or isinstance(cache, KVCache)))
+        if fuse_qkv:
+            # self attention with a single projection
+            Q, K, V = self._project_qkv(queries)
+            K_ = self._split_heads(K)
+            V_ = self._split_heads(V)
+            if isinstance(cache, KVCache):
+                K_, V_ = cache.append(K_, V_)
+        elif isinstance(cache, KVCache):
+            # decoder self attention with preallocated cache
+            Q = self.Q_dense(queries)
+            K_, V_ = cache.append(self._split_heads(self.K_dense(queries)),
+                                  self._split_heads(self.V_dense(queries)))
+        else:
+            Q = self.Q_dense(queries)
+            K = _update_and_return(self.K_dense, 'keys')
+            V = _update_and_return(self.V_dense, 'values')
+            K_ = self._split_heads(K)
+            V_ = self._split_heads(V)
 
         Q_ = self._split_heads(Q)
-        K_ = self._split_heads(K)
-        V_ = self._split_heads(V)
         # [batch_size, num_heads, seq_length, memory_depth]
-        key_depth_per_head = num_units // num_heads
-        Q_ *= key_depth_per_head ** -0.5
-
-        logits = torch.matmul(Q_, K_.transpose(-2, -1))
-        if memory_attention_bias is not None:
-            memory_attention_bias = memory_attention_bias.to(
-                device=logits.device)
-            logits += memory_attention_bias
-        weights = torch.softmax(logits, dim=-1)
-        weights = F.dropout(weights, self._hparams.dropout_rate, self.training)
-        outputs = torch.matmul(weights, V_)
-
-        outputs = self._combine_heads(outputs)
+        outputs = self._attention(Q_, K_, V_, memory_attention_bias)
         outputs = self.O_dense(outputs)
         # (batch_size, length_query, output_dim)
 
         return outputs
 
+    def forward_unpadded(self,
+                         queries: torch.Tensor,
+                         indices: torch.LongTensor,
+                         padded_shape: Tuple[int, int],
+                         memory_attention_bias: Optional[torch.Tensor]) \
+            -> torch.Tensor:
+        r"""Self attention over sequences packed without padding, as used
+        by :class:`~texar.torch.modules.TransformerEncoder` when
+        ``"unpad_inputs"`` is `True`.
+
+        The projections are applied to the packed tokens only. Queries, keys
+        and values are then scattered into per-sequence blocks, so that
+        attention scores are computed within each sequence, and gathered back
+        into the packed layout.
+
+        Args:
+            queries: A 2D tensor of shape ``[total_tokens, depth_query]``,
+                containing the non-padding positions of all sequences.
+            indices: A 1D :tensor:`LongTensor` of shape ``[total_tokens]``,
+                containing the positions of :attr:`queries` in the flattened
+                ``[batch_size * max_time]`` padded layout.
+            padded_shape: A tuple ``(batch_size, max_time)``.
+            memory_attention_bias: A tensor of shape
+                ``[batch_size, 1, 1, max_time]`` masking out padding
+                positions.
+
+        Returns:
+            A tensor of shape ``[total_tokens, output_dim]``.
+        """
+        num_heads = self._hparams.num_heads
+        num_units = self._hparams.num_units
+        if num_units % num_heads != 0:
+            raise ValueError(
+                f"Value depth ({num_units}) must be divisible by "
+                f"the number of attention heads ({num_heads}).")
+        batch_size, max_time = padded_shape
+
+        def _pad_and_split(x: torch.Tensor) -> torch.Tensor:
+            padded = x.new_zeros(batch_size * max_time, x.size(-1)) \
+                .index_copy(0, indices, x)
+            return self._split_heads(padded.view(batch_size, max_time, -1))
+
+        if self._hparams.attention_backend == 'efficient':
+            Q, K, V = self._project_qkv(queries)
+        else:
+            Q = self.Q_dense(queries)
+            K = self.K_dense(queries)
+            V = self.V_dense(queries)
+        Q_ = _pad_and_split(Q)
+        K_ = _pad_and_split(K)
+        V_ = _pad_and_split(V)
+        outputs = self._attention(Q_, K_, V_, memory_attention_bias)
+        outputs = outputs.reshape(-1, num_units).index_select(0, indices)
+        return self.O_dense(outputs)
+
+    def _project_qkv(self, queries: torch.Tensor) \
+            -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        r"""Projects queries, keys and values of self attention with a single
+        matrix multiplication.
+
+        Only used with the ``"efficient"`` backend, where the projections are
+        stored in the fused parameters :attr:`qkv_weight` and
+        :attr:`qkv_bias`.
+        """
+        assert self.qkv_weight is not None
+        outputs = F.linear(queries, self.qkv_weight, self.qkv_bias)
+        Q, K, V = outputs.chunk(3, dim=-1)
+        return Q, K, V
+
+    def _attention(self, Q_: torch.Tensor, K_: torch.Tensor, V_: torch.Tensor,
+                   memory_attention_bias: Optional[torch.Tensor]) \
+            -> torch.Tensor:
+        r"""Computes scaled dot-product attention over split heads, and
+        returns the combined heads of shape
+        ``[batch_size, length_query, num_units]``.
+        """
+        efficient = self._hparams.attention_backend == 'efficient'
+        dropout_rate = self._hparams.dropout_rate
+        if memory_attention_bias is not None:
+            memory_attention_bias = memory_attention_bias.to(
+                device=Q_.device)
+
+        if efficient and hasattr(F, 'scaled_dot_product_attention'):
+            if memory_attention_bias is not None:
+                memory_attention_bias = memory_attention_bias.to(
+                    dtype=Q_.dtype)
+            outputs = F.scaled_dot_product_attention(
+                Q_, K_, V_, attn_mask=memory_attention_bias,
+                dropout_p=dropout_rate if self.training else 0.0)
+            return self._combine_heads(outputs)
+
+        key_depth_per_head = self._hparams.num_units // self._hparams.num_heads
+        Q_ = Q_ * key_depth_per_head ** -0.5
+
+        def _attend(Q_chunk: torch.Tensor,
+                    bias: Optional[torch.Tensor]) -> torch.Tensor:
+            logits = torch.matmul(Q_chunk, K_.transpose(-2, -1))
+            if bias is not None:
+                logits += bias
+            weights = torch.softmax(logits, dim=-1)
+            weights = F.dropout(weights, dropout_rate, self.training)
+            return torch.matmul(weights, V_)
+
+        length_query = Q_.size(2)
+        if not efficient or length_query <= self._CHUNK_SIZE:
+            outputs = _attend(Q_, memory_attention_bias)
+        else:
+            # Attend in blocks of queries to bound the size of the attention
+            # matrix.
+            chunks = []
+            for start in range(0, length_query, self._CHUNK_SIZE):
+                end = start + self._CHUNK_SIZE
+                bias = memory_attention_bias
+                if bias is not None and bias.size(-2) > 1:
+                    bias = bias[:, :, start:end]
+                chunks.append(_attend(Q_[:, :, start:end], bias))
+            outputs = torch.cat(chunks, dim=2)
+
+        return self._combine_heads(outputs)
+
     def _split_heads(self, x: torch.Tensor) -> torch.Tensor:
         r"""Split channels (dimension 2) into multiple heads,
         becomes dimension 1). Must ensure ``x.shape[-1]`` can be
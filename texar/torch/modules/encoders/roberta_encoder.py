@@ -92,7 +92,8 @@ class RoBERTaEncoder(PretrainedRoBERTaMixin, BERTEncoder):
                         "num_heads": 12,
                         "num_units": 768,
                         "output_dim": 768,
-                        "use_bias": True
+                        "use_bias": True,
+                        "attention_backend": "default"
                     },
                     "name": "encoder",
                     "num_blocks": 12,
@@ -119,7 +120,8 @@ class RoBERTaEncoder(PretrainedRoBERTaMixin, BERTEncoder):
                         ]
                     },
                     "residual_dropout": 0.1,
-                    "use_bert_config": True
+                    "use_bert_config": True,
+                    "unpad_inputs": False
                     },
                 "hidden_size": 768,
                 "initializer": None,
@@ -149,7 +151,8 @@ class RoBERTaEncoder(PretrainedRoBERTaMixin, BERTEncoder):
         `"encoder"`: dict
             Hyperparameters for the TransformerEncoder.
             See :func:`~texar.torch.modules.TransformerEncoder.default_hparams`
-            for details.
+            for details. Set ``"unpad_inputs"`` to `True` to skip computation
+            on padding positions.
 
         `"hidden_size"`: int
             Size of the pooler dense layer.
@@ -188,7 +191,8 @@ class RoBERTaEncoder(PretrainedRoBERTaMixin, BERTEncoder):
                     'num_heads': 12,
                     'num_units': 768,
                     'output_dim': 768,
-                    'use_bias': True
+                    'use_bias': True,
+                    'attention_backend': 'default'
                 },
                 'name': 'encoder',
                 'num_blocks': 12,
@@ -215,7 +219,8 @@ class RoBERTaEncoder(PretrainedRoBERTaMixin, BERTEncoder):
                     ]
                 },
                 'residual_dropout': 0.1,
-                'use_bert_config': True
+                'use_bert_config': True,
+                'unpad_inputs': False
             },
             'hidden_size': 768,
             'initializer': None,
@@ -19,6 +19,7 @@ from typing import Any, Dict
 
 import torch
 from torch import nn
+from torch.nn import functional as F
 
 from texar.torch.core import layers
 from texar.torch.modules.encoders.encoder_base import EncoderBase
@@ -228,9 +229,11 @@ class TransformerEncoder(EncoderBase):
                     'dropout_rate': 0.1,
                     'output_dim': 512,
                     'use_bias': False,
+                    'attention_backend': 'default',
                 },
                 "eps": 1e-6,
                 "initializer": None,
+                "unpad_inputs": False,
                 "name": "transformer_encoder"
             }
 
@@ -286,6 +289,17 @@ class TransformerEncoder(EncoderBase):
             variables created in this module.
             See :func:`~texar.torch.core.get_initializer` for details.
 
+        `"unpad_inputs"`: bool
+            If `True`, padding positions are removed before encoding, and the
+            non-padding positions of all sequences are packed into a tensor of
+            shape ``[total_tokens, dim]``. Layer normalization, the
+            position-wise networks and the attention projections then only
+            run on real tokens, and attention scores are only computed within
+            each sequence, up to the longest sequence in the batch. Outputs
+            are scattered back to ``[batch_size, max_time, dim]`` at the end,
+            with zeros at padding positions. This is faster when sequences in
+            a batch vary a lot in length.
+
         `"name"`: str
             Name of the module.
         """
@@ -304,9 +318,11 @@ class TransformerEncoder(EncoderBase):
                 'dropout_rate': 0.1,
                 'output_dim': 512,
                 'use_bias': False,
+                'attention_backend': 'default',
             },
             'initializer': None,
             'eps': 1e-6,
+            'unpad_inputs': False,
             'name': 'transformer_encoder',
         }
 
@@ -327,13 +343,25 @@ class TransformerEncoder(EncoderBase):
 
         Returns:
             A Tensor of shape ``[batch_size, max_time, dim]`` containing the
-            encoded vectors.
+            encoded vectors. If ``"unpad_inputs"`` is `True`, vectors at
+            padding positions are zero.
         """
         # Multiply input embedding with the sqrt of its dimension for
         # normalization
 
-        inputs_padding = 1 - sequence_mask(
-            sequence_length, inputs.size()[1]).float()
+        unpad_inputs = self._hparams.unpad_inputs
+        batch_size, max_time = inputs.size()[:2]
+        if unpad_inputs:
+            # Attention only needs to span the longest sequence in the batch.
+            sequence_length = sequence_length.to(device=inputs.device)
+            attn_time = min(int(sequence_length.max()), max_time) \
+                if batch_size > 0 else 0
+            inputs = inputs[:, :attn_time]
+        else:
+            attn_time = max_time
+
+        inputs_mask = sequence_mask(sequence_length, attn_time)
+        inputs_padding = 1 - inputs_mask.float()
         if self._hparams.use_bert_config:
             ignore_padding = attn.attention_bias_ignore_padding(
                 inputs_padding, bias_value=-1e4)
@@ -343,6 +371,12 @@ class TransformerEncoder(EncoderBase):
         encoder_self_attention_bias = ignore_padding
 
         input_embedding = inputs
+        if unpad_inputs:
+            # Indices of non-padding positions in the flattened
+            # `[batch_size * attn_time]` layout.
+            indices = inputs_mask.view(-1).nonzero().squeeze(1)
+            input_embedding = inputs.reshape(-1, self._hparams.dim) \
+                .index_select(0, indices)
         if self._hparams.use_bert_config:
             x = self.input_normalizer(input_embedding)
             x = self.embed_dropout(x)
@@ -356,11 +390,19 @@ class TransformerEncoder(EncoderBase):
             else:
                 _queries_input = self.self_attn_layer_norm[i](x)
 
-            attention_output = self.self_attns[i](
-                queries=_queries_input,
-                memory=_queries_input,
-                memory_attention_bias=encoder_self_attention_bias,
-            )
+            if unpad_inputs:
+                attention_output = self.self_attns[i].forward_unpadded(
+                    queries=_queries_input,
+                    indices=indices,
+                    padded_shape=(batch_size, attn_time),
+                    memory_attention_bias=encoder_self_attention_bias,
+                )
+            else:
+                attention_output = self.self_attns[i](
+                    queries=_queries_input,
+                    memory=_queries_input,
+                    memory_attention_bias=encoder_self_attention_bias,
+                )
 
             attention_output = self.residual_dropout(attention_output)
 
@@ -389,6 +431,12 @@ class TransformerEncoder(EncoderBase):
 
         if not self._hparams.use_bert_config:
             x = self.final_layer_norm(x)
+
+        if unpad_inputs:
+            x = x.new_zeros(batch_size * attn_time, self._hparams.dim) \
+                .index_copy(0, indices, x)
+            x = x.view(batch_size, attn_time, self._hparams.dim)
+            x = F.pad(x, [0, 0, 0, max_time - attn_time])
         return x
 
     @property
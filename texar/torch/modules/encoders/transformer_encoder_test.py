@@ -73,6 +73,86 @@ class TransformerEncoderTest(unittest.TestCase):
                                      self._max_time,
                                      self._emb_dim)))
 
+    def test_unpad_inputs(self):
+        r"""Tests encoding with padding positions removed.
+        """
+        inputs = torch.rand(3, 10, self._emb_dim, dtype=torch.float)
+        sequence_length = torch.tensor([4, 0, 8])
+
+        for use_bert_config in [False, True]:
+            encoder = TransformerEncoder(
+                hparams={"use_bert_config": use_bert_config})
+            unpad_encoder = TransformerEncoder(
+                hparams={"use_bert_config": use_bert_config,
+                         "unpad_inputs": True})
+            unpad_encoder.load_state_dict(encoder.state_dict())
+            encoder.eval()
+            unpad_encoder.eval()
+
+            outputs = encoder(inputs, sequence_length)
+            unpad_outputs = unpad_encoder(inputs, sequence_length)
+            self.assertEqual(unpad_outputs.size(), outputs.size())
+            for idx, length in enumerate(sequence_length.tolist()):
+                self.assertTrue(torch.allclose(
+                    unpad_outputs[idx, :length], outputs[idx, :length],
+                    atol=1e-5))
+                self.assertTrue(
+                    (unpad_outputs[idx, length:] == 0).all().item())
+
+    def test_attention_backend(self):
+        r"""Tests encoding with the efficient attention backend.
+        """
+        inputs = torch.rand(3, 10, self._emb_dim, dtype=torch.float)
+        sequence_length = torch.tensor([4, 10, 8])
+
+        encoder = TransformerEncoder()
+        for unpad_inputs in [False, True]:
+            efficient_encoder = TransformerEncoder(hparams={
+                "multihead_attention": {"attention_backend": "efficient"},
+                "unpad_inputs": unpad_inputs,
+            })
+            efficient_encoder.load_state_dict(encoder.state_dict())
+            for attn in efficient_encoder.self_attns:
+                # Test attention in blocks of queries.
+                attn._CHUNK_SIZE = 3
+            encoder.eval()
+            efficient_encoder.eval()
+
+            outputs = encoder(inputs, sequence_length)
+            efficient_outputs = efficient_encoder(inputs, sequence_length)
+            for idx, length in enumerate(sequence_length.tolist()):
+                self.assertTrue(torch.allclose(
+                    efficient_outputs[idx, :length], outputs[idx, :length],
+                    atol=1e-5))
+
+            # Gradients are the same as those of the default backend.
+            mask = (torch.arange(inputs.size(1)).unsqueeze(0) <
+                    sequence_length.unsqueeze(1)).unsqueeze(2).float()
+            encoder.zero_grad()
+            (encoder(inputs, sequence_length) * mask).sum().backward()
+            (efficient_encoder(inputs, sequence_length) * mask).sum().backward()
+            efficient_grads = {name: param.grad for name, param
+                               in efficient_encoder.named_parameters()}
+            for name, param in encoder.named_parameters():
+                if name in efficient_grads:
+                    grad = efficient_grads[name]
+                else:
+                    prefix, module_name, kind = name.rsplit('.', 2)
+                    grad = efficient_grads[f"{prefix}.qkv_{kind}"].chunk(3)[
+                        'QKV'.index(module_name[0])]
+                self.assertTrue(torch.allclose(param.grad, grad, atol=1e-4),
+                                name)
+
+            # Checkpoints are interchangeable between backends.
+            state_dict = efficient_encoder.state_dict()
+            self.assertEqual(sorted(state_dict.keys()),
+                             sorted(encoder.state_dict().keys()))
+            encoder.load_state_dict(state_dict)
+            for attn in efficient_encoder.self_attns:
+                self.assertEqual(len(list(attn.parameters())), 2)
+                self.assertEqual(attn.Q_dense.weight.size(),
+                                 (attn._hparams.num_units, self._emb_dim))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -14,12 +14,18 @@
 """
 Base class for Pre-trained Modules.
 """
+import hashlib
+import json
 import os
+import shutil
 import sys
+import tempfile
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import numpy as np
+import torch
 from torch import nn
 
 from texar.torch.data.data_utils import maybe_download, get_filename
@@ -35,6 +41,11 @@ __all__ = [
 
 _default_texar_download_dir: Optional[Path] = None
 
+# Name of the directory (under the directory of the downloaded checkpoint) in
+# which converted checkpoints are stored, and name of the index file.
+_CONVERTED_DIR = 'converted'
+_CONVERTED_INDEX = 'index.json'
+
 
 def default_download_dir(name: str) -> Path:
     r"""Return the directory to which packages will be downloaded by default.
@@ -143,12 +154,131 @@ class PretrainedMixin(ModuleBase, ABC):
 
     def init_pretrained_weights(self, *args, **kwargs):
         if self.pretrained_model_dir:
-            self._init_from_checkpoint(
-                self.pretrained_model_name,
-                self.pretrained_model_dir, *args, **kwargs)
+            converted_path = self._converted_checkpoint_path(*args, **kwargs)
+            if not self._load_converted_checkpoint(converted_path):
+                storage = {name: tensor.data_ptr()
+                           for name, tensor in self._named_tensors()}
+                self._init_from_checkpoint(
+                    self.pretrained_model_name,
+                    self.pretrained_model_dir, *args, **kwargs)
+                # Only tensors assigned from the checkpoint are cached. Other
+                # tensors keep their (possibly random) initialization.
+                loaded = [name for name, tensor in self._named_tensors()
+                          if tensor.data_ptr() != storage.get(name)]
+                self._save_converted_checkpoint(converted_path, loaded)
         else:
             self.reset_parameters()
 
+    def _named_tensors(self) -> List[Tuple[str, torch.Tensor]]:
+        tensors: List[Tuple[str, torch.Tensor]] = list(self.named_parameters())
+        tensors.extend(self.named_buffers())
+        return tensors
+
+    def _converted_checkpoint_path(self, *args, **kwargs) -> Path:
+        r"""Return the directory of the converted checkpoint for this module.
+
+        Converted checkpoints are stored in the directory of the downloaded
+        checkpoint, and keyed by a checksum of the module class, the module
+        parameters, arguments for :meth:`_init_from_checkpoint`, and the names,
+        sizes and modification times of the downloaded files. Thus, a
+        converted checkpoint is invalidated when any of these changes.
+        """
+        assert self.pretrained_model_dir is not None
+        model_dir = Path(self.pretrained_model_dir)
+        files = sorted(
+            (path.name, path.stat().st_size, path.stat().st_mtime_ns)
+            for path in model_dir.iterdir() if path.is_file())
+        params = [(name, tuple(tensor.size()), str(tensor.dtype))
+                  for name, tensor in self._named_tensors()]
+        key = repr((type(self).__module__, type(self).__qualname__,
+                    self.pretrained_model_name, files, params,
+                    args, sorted(kwargs.items())))
+        checksum = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return (model_dir / _CONVERTED_DIR /
+                f"{type(self).__name__}-{checksum}")
+
+    def _load_converted_checkpoint(self, path: Path) -> bool:
+        r"""Initialize model parameters from a converted checkpoint saved by
+        :meth:`_save_converted_checkpoint`. Tensors are memory-mapped in
+        copy-on-write mode, so that processes loading the same checkpoint
+        share memory until the parameters are modified.
+
+        Args:
+            path: Directory of the converted checkpoint.
+
+        Returns:
+            `True` if the converted checkpoint exists and is loaded, `False`
+            otherwise.
+        """
+        index_path = path / _CONVERTED_INDEX
+        if not index_path.exists():
+            return False
+        try:
+            with index_path.open() as f:
+                index: Dict[str, str] = json.load(f)
+            arrays: Dict[str, torch.Tensor] = {}
+            tensors = []
+            for name, filename in index.items():
+                if filename not in arrays:
+                    arrays[filename] = torch.from_numpy(
+                        np.load(str(path / filename), mmap_mode='c'))
+                pointer = self._name_to_variable(name)
+                if pointer.size() != arrays[filename].size():
+                    raise ValueError(f"Size mismatch for variable '{name}'")
+                tensors.append((pointer, arrays[filename]))
+        except (OSError, ValueError, AttributeError, IndexError) as e:
+            print(f"Failed to load converted pre-trained {self._MODEL_NAME} "
+                  f"checkpoint from {path}: {e}")
+            return False
+        for pointer, tensor in tensors:
+            pointer.data = tensor
+        print(f"Loaded converted pre-trained {self._MODEL_NAME} checkpoint "
+              f"from {path}.")
+        return True
+
+    def _save_converted_checkpoint(self, path: Path, names: List[str]) -> None:
+        r"""Save the specified tensors of the module as a converted checkpoint,
+        with one ``.npy`` file per tensor. Tensors sharing the same storage are
+        saved once. The checkpoint is written to a temporary directory and then
+        renamed, so concurrent processes never see a partial checkpoint.
+
+        Args:
+            path: Directory of the converted checkpoint.
+            names: Names of the tensors to save.
+        """
+        if path.exists() or len(names) == 0:
+            return
+        tensors = dict(self._named_tensors())
+        tmp_dir = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_dir = tempfile.mkdtemp(prefix=path.name, dir=str(path.parent))
+            os.chmod(tmp_dir, 0o755)
+            index: Dict[str, str] = {}
+            saved: Dict[Tuple[int, Tuple[int, ...]], str] = {}
+            for name in names:
+                tensor = tensors[name].detach()
+                key = (tensor.data_ptr(), tuple(tensor.size()))
+                if key not in saved:
+                    filename = f"{len(saved)}.npy"
+                    np.save(os.path.join(tmp_dir, filename),
+                            tensor.cpu().numpy())
+                    saved[key] = filename
+                index[name] = saved[key]
+            with open(os.path.join(tmp_dir, _CONVERTED_INDEX), 'w') as f:
+                json.dump(index, f)
+            # If another process has already saved the same checkpoint, the
+            # rename fails and the temporary directory is removed below.
+            os.rename(tmp_dir, str(path))
+            tmp_dir = None
+        except (OSError, TypeError) as e:
+            if not path.exists():
+                print(f"Failed to save converted pre-trained "
+                      f"{self._MODEL_NAME} checkpoint to {path}: {e}")
+        finally:
+            if tmp_dir is not None:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
     def reset_parameters(self):
         r"""Initialize parameters of the pre-trained model. This method is only
         called if pre-trained checkpoints are not loaded.
@@ -0,0 +1,102 @@
+"""
+Unit tests for pre-trained module base.
+"""
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch import nn
+
+from texar.torch.modules.pretrained.pretrained_base import PretrainedMixin
+
+
+class _DummyPretrainedModule(PretrainedMixin):
+    _MODEL_NAME = "Dummy"
+    _MODEL2URL = {'dummy': 'https://example.com/dummy.npz'}
+
+    def __init__(self, cache_dir: str):
+        super().__init__()
+        self.load_pretrained_config('dummy', cache_dir)
+        self.dense = nn.Linear(3, 4)
+        self.output_layer = nn.Linear(4, 5)
+        self.num_conversions = 0
+        self.init_pretrained_weights()
+
+    @classmethod
+    def _transform_config(cls, pretrained_model_name, cache_dir):
+        return {}
+
+    def _init_from_checkpoint(self, pretrained_model_name, cache_dir,
+                              **kwargs):
+        self.num_conversions += 1
+        weights = np.load(str(Path(cache_dir) / 'dummy.npz'))
+        # `output_layer` is not stored in the checkpoint.
+        self.dense.weight.data = torch.from_numpy(weights['kernel']).t()
+        self.dense.bias.data = torch.from_numpy(weights['bias'])
+
+    @staticmethod
+    def default_hparams():
+        return {
+            'pretrained_model_name': None,
+            'name': 'dummy',
+        }
+
+
+class PretrainedMixinTest(unittest.TestCase):
+    r"""Tests :class:`~texar.torch.modules.PretrainedMixin`.
+    """
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        model_dir = Path(self._tmp_dir.name) / 'dummy'
+        model_dir.mkdir()
+        self._kernel = np.random.randn(3, 4).astype(np.float32)
+        self._bias = np.random.randn(4).astype(np.float32)
+        np.savez(str(model_dir / 'dummy.npz'),
+                 kernel=self._kernel, bias=self._bias)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_converted_checkpoint(self):
+        r"""Tests that converted checkpoints are saved and reused.
+        """
+        module = _DummyPretrainedModule(self._tmp_dir.name)
+        self.assertEqual(module.num_conversions, 1)
+
+        module = _DummyPretrainedModule(self._tmp_dir.name)
+        self.assertEqual(module.num_conversions, 0)
+        np.testing.assert_array_equal(
+            module.dense.weight.detach().numpy(), self._kernel.T)
+        np.testing.assert_array_equal(
+            module.dense.bias.detach().numpy(), self._bias)
+
+        # Parameters not in the checkpoint are randomly initialized.
+        other = _DummyPretrainedModule(self._tmp_dir.name)
+        self.assertFalse(torch.equal(module.output_layer.weight,
+                                     other.output_layer.weight))
+
+        # Loaded parameters can be trained.
+        module.dense.weight.data.add_(1.0)
+        other = _DummyPretrainedModule(self._tmp_dir.name)
+        np.testing.assert_array_equal(
+            other.dense.weight.detach().numpy(), self._kernel.T)
+
+    def test_converted_checkpoint_invalidation(self):
+        r"""Tests that converted checkpoints are invalidated when the
+        downloaded checkpoint changes.
+        """
+        _DummyPretrainedModule(self._tmp_dir.name)
+        kernel = np.random.randn(3, 5).astype(np.float32)
+        np.savez(str(Path(self._tmp_dir.name) / 'dummy' / 'dummy.npz'),
+                 kernel=kernel[:, :4], bias=self._bias, extra=kernel)
+        module = _DummyPretrainedModule(self._tmp_dir.name)
+        self.assertEqual(module.num_conversions, 1)
+        np.testing.assert_array_equal(
+            module.dense.weight.detach().numpy(), kernel[:, :4].T)
+
+
+if __name__ == "__main__":
+    unittest.main()
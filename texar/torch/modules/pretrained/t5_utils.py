@@ -14,7 +14,7 @@
 
 import ast
 import math
-from typing import Dict, Optional, Tuple
+from typing import Dict, Optional, Tuple, Union
 
 import torch
 from torch.nn import functional as F
@@ -22,7 +22,8 @@ from torch import nn
 
 from texar.torch.core import layers
 from texar.torch.module_base import ModuleBase
-from texar.torch.modules.encoders.multihead_attention import LayerCache
+from texar.torch.modules.encoders.multihead_attention import (
+    KVCache, LayerCache)
 from texar.torch.utils.types import MaybeList
 
 __all__ = [
@@ -129,6 +130,9 @@ class MultiheadRPRAttention(ModuleBase):
         if self.stores_rpr:
             self.relative_attention_bias = nn.Embedding(
                 self.relative_attention_num_buckets, self._hparams.num_heads)
+        # Bucket indices of relative positions `-n, ..., n` on each device.
+        # See :meth:`_get_relative_position_buckets`.
+        self._rp_bucket_cache: Dict[torch.device, torch.Tensor] = {}
 
         if self._hparams.initializer:
             # TODO(haoransh): we may define kernel_initializer and bias
@@ -266,18 +270,52 @@ class MultiheadRPRAttention(ModuleBase):
         ret += torch.where(is_small, n, val_if_large)
         return ret
 
-    def compute_bias(self, qlen, klen):
-        """ Compute binned relative position bias """
-        context_position = torch.arange(qlen, dtype=torch.long)[:, None]
-        memory_position = torch.arange(klen, dtype=torch.long)[None, :]
+    def _get_relative_position_buckets(self, max_distance: int,
+                                       device: torch.device) -> torch.Tensor:
+        r"""Returns the bucket indices of relative positions
+        `-n, ..., n` for some `n >= max_distance`, as a tensor of shape
+        `[2n + 1]` on :attr:`device`. The indices are computed once and
+        cached, and only recomputed when a longer range is required.
+        """
+        buckets = self._rp_bucket_cache.get(device)
+        if buckets is None or buckets.size(0) < 2 * max_distance + 1:
+            if buckets is not None:
+                # Grow geometrically to amortize incremental decoding.
+                max_distance = max(max_distance, buckets.size(0) - 1)
+            # Buckets are computed on CPU, so that they're identical across
+            # devices.
+            relative_position = torch.arange(
+                -max_distance, max_distance + 1, dtype=torch.long)
+            buckets = self._relative_position_bucket(
+                relative_position,
+                bidirectional=not self.is_decoder,
+                num_buckets=self.relative_attention_num_buckets)
+            buckets = buckets.to(device=device)
+            self._rp_bucket_cache[device] = buckets
+        return buckets
+
+    def compute_bias(self, qlen, klen, query_offset=0):
+        """ Compute binned relative position bias.
+
+        Queries are at positions `query_offset, ..., query_offset + qlen - 1`,
+        e.g., `query_offset` is the number of previous positions in
+        incremental decoding.
+        """
+        device = self.relative_attention_bias.weight.device
+        buckets = self._get_relative_position_buckets(
+            max(klen, qlen + query_offset), device)
+        center = (buckets.size(0) - 1) // 2
+
+        context_position = torch.arange(
+            query_offset, query_offset + qlen, dtype=torch.long,
+            device=device)[:, None]
+        memory_position = torch.arange(
+            klen, dtype=torch.long, device=device)[None, :]
 
         relative_position = memory_position - context_position
         #  [length_query, length_key]
 
-        rp_bucket = self._relative_position_bucket(
-            relative_position,
-            bidirectional=not self.is_decoder,
-            num_buckets=self.relative_attention_num_buckets)
+        rp_bucket = buckets[relative_position + center]
         # [length_query, length_key]
 
         values = self.relative_attention_bias(rp_bucket)
@@ -290,7 +328,7 @@ class MultiheadRPRAttention(ModuleBase):
                 queries: torch.Tensor,
                 memory: torch.Tensor,
                 memory_attention_bias: torch.Tensor,
-                cache: Optional[LayerCache] = None,
+                cache: Optional[Union[LayerCache, KVCache]] = None,
                 position_bias: Optional[torch.Tensor] = None
                 ) \
             -> Tuple[torch.Tensor, torch.Tensor]:
@@ -315,10 +353,6 @@ class MultiheadRPRAttention(ModuleBase):
             position bias
         """
         length_query = queries.size(1)
-        if memory is None:
-            length_key = length_query  # Self-Attention
-        else:
-            length_key = memory.size(1)
 
         num_heads = self._hparams.num_heads
         num_units = self._hparams.num_units
@@ -335,6 +369,7 @@ class MultiheadRPRAttention(ModuleBase):
 
                 if cache is not None:
                     # decoder self attention when dynamic decoding
+                    assert not isinstance(cache, KVCache)
                     res: MaybeList[torch.Tensor] = cache[key]
                     if isinstance(res, list):
                         # inference-like decoding
@@ -349,6 +384,7 @@ class MultiheadRPRAttention(ModuleBase):
             else:
                 # encoder decoder attention
                 if cache is not None:
+                    assert not isinstance(cache, KVCache)
                     res: MaybeList[torch.Tensor] = cache[  # type: ignore
                         key]  # type: ignore
                     if isinstance(res, list):
@@ -369,12 +405,17 @@ class MultiheadRPRAttention(ModuleBase):
             return out
 
         Q = self.Q_dense(queries)
-        K = _update_and_return(self.K_dense, 'keys')
-        V = _update_and_return(self.V_dense, 'values')
+        if isinstance(cache, KVCache):
+            # decoder self attention with preallocated cache
+            K_, V_ = cache.append(self._split_heads(self.K_dense(queries)),
+                                  self._split_heads(self.V_dense(queries)))
+        else:
+            K = _update_and_return(self.K_dense, 'keys')
+            V = _update_and_return(self.V_dense, 'values')
+            K_ = self._split_heads(K)
+            V_ = self._split_heads(V)
 
         Q_ = self._split_heads(Q)
-        K_ = self._split_heads(K)
-        V_ = self._split_heads(V)
 
         # All of the above [batch_size, num_heads, seq_length, memory_depth]
         # Q_ *= key_depth_per_head ** -0.5  # T5 does not scale
@@ -387,7 +428,13 @@ class MultiheadRPRAttention(ModuleBase):
             if not self.stores_rpr:
                 raise ValueError("Layer must store embedding weights since"
                                  "relative bias not provided")
-            position_bias = self.compute_bias(length_query, length_key)
+            # In incremental decoding, queries of self attention are the
+            # last positions of the keys.
+            length_key = K_.size(2)
+            position_bias = self.compute_bias(
+                length_query, length_key,
+                query_offset=length_key - length_query if memory is None
+                else 0)
 
             if memory_attention_bias is not None:
                 memory_attention_bias = memory_attention_bias.to(
@@ -7,7 +7,10 @@ import unittest
 import os
 import tempfile
 
-from texar.torch.modules.pretrained.t5_utils import read_t5_gin_config_file
+import torch
+
+from texar.torch.modules.pretrained.t5_utils import (
+    MultiheadRPRAttention, read_t5_gin_config_file)
 
 
 class GinTest(unittest.TestCase):
@@ -65,5 +68,38 @@ class GinTest(unittest.TestCase):
         self.assertEqual(config, expect_config)
 
 
+class MultiheadRPRAttentionTest(unittest.TestCase):
+    r"""Tests :class:`~texar.torch.modules.MultiheadRPRAttention`.
+    """
+
+    def test_compute_bias(self):
+        r"""Tests cached relative position buckets against computing them
+        from scratch.
+        """
+        for is_decoder in [False, True]:
+            attn = MultiheadRPRAttention(
+                input_size=16,
+                hparams={"num_heads": 2, "num_units": 16, "output_dim": 16,
+                         "is_decoder": is_decoder},
+                stores_relative_position=True)
+            for qlen, klen in [(3, 3), (5, 200), (300, 7), (1, 1)]:
+                relative_position = (torch.arange(klen)[None, :] -
+                                     torch.arange(qlen)[:, None])
+                rp_bucket = attn._relative_position_bucket(
+                    relative_position, bidirectional=not is_decoder,
+                    num_buckets=attn.relative_attention_num_buckets)
+                expected = attn.relative_attention_bias(rp_bucket)
+                expected = expected.permute([2, 0, 1]).unsqueeze(0)
+                bias = attn.compute_bias(qlen, klen)
+                self.assertTrue(torch.equal(bias, expected))
+
+            # Incremental decoding computes the last row of the full bias.
+            full_bias = attn.compute_bias(10, 10)
+            for step in range(10):
+                bias = attn.compute_bias(1, step + 1, query_offset=step)
+                self.assertTrue(torch.equal(
+                    bias, full_bias[:, :, step:(step + 1), :(step + 1)]))
+
+
 if __name__ == "__main__":
     unittest.main()
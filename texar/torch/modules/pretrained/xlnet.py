@@ -72,6 +72,8 @@ class PretrainedXLNetMixin(PretrainedMixin, ABC):
 
     def reset_parameters(self):
         self.apply(init_weights)
+        if hasattr(self, 'mask_emb'):
+            nn.init.normal_(self.mask_emb, 0.0, 0.02)
         if not self._hparams.untie_r:
             nn.init.normal_(self.r_w_bias, 0.0, 0.02)
             nn.init.normal_(self.r_r_bias, 0.0, 0.02)
@@ -26,6 +26,7 @@ from torch.nn import functional as F
 
 from texar.torch.core import get_layer
 from texar.torch.module_base import ModuleBase
+from texar.torch.modules.encoders.multihead_attention import KVCache
 
 __all__ = [
     "PositionWiseFF",
@@ -294,6 +295,41 @@ class RelativeMultiheadAttention(ModuleBase):
         attn_vec = torch.einsum('ijbn,jbnd->ibnd', [attn_prob, v_head_h])
         return attn_vec.contiguous()
 
+    def _compute_incremental_attention(self,
+                                       q_head: torch.Tensor,
+                                       k_head_h: torch.Tensor,
+                                       v_head_h: torch.Tensor,
+                                       k_head_r: torch.Tensor) -> torch.Tensor:
+        # Same as `_compute_attention_score`, but for a single query position
+        # in the first segment, with keys in the `KVCache` layout.
+        # q_head: (batch_size, n_head, d_head)
+        # k_head_h, v_head_h: (batch_size, n_head, klen, d_head)
+        # k_head_r: (klen, n_head, d_head), relative distances in descending
+        #   order for each key position.
+        q_head_rw = q_head + self.r_w_bias
+        attn_ac = torch.einsum('bnd,bnjd->bnj', [q_head_rw, k_head_h])
+        q_head_rr = q_head + self.r_r_bias
+        attn_bd = torch.einsum('bnd,jnd->bnj', [q_head_rr, k_head_r])
+
+        if self._hparams.use_segments:
+            # All positions are in the same segment, so the segment based
+            # score is the same for all keys.
+            q_head_rs = q_head + self.r_s_bias
+            attn_ef = torch.einsum(
+                'bnd,nd->bn', [q_head_rs, self.segment_embed[0]])
+            attn_ef = attn_ef.unsqueeze(-1)
+        else:
+            attn_ef = 0
+
+        # attn_score: (batch_size, n_head, klen)
+        attn_score = attn_ac + attn_bd + attn_ef
+        attn_score.mul_(self.scale)
+        attn_prob = F.softmax(attn_score, dim=-1)
+        attn_prob = self.dropout_attn(attn_prob)
+
+        attn_vec = torch.einsum('bnj,bnjd->bnd', [attn_prob, v_head_h])
+        return attn_vec.contiguous()
+
     def _post_attention(self, attn_vec: torch.Tensor) -> torch.Tensor:
         attn_vec = attn_vec.view(*attn_vec.size()[:2], -1)
         attn_out = self.output_projection(attn_vec)
@@ -367,6 +403,104 @@ class RelativeMultiheadAttention(ModuleBase):
 
         return output_h, output_g
 
+    def project_memory(self, memory: torch.Tensor) \
+            -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Compute the content keys and values of memory states, in the
+        layout used by :class:`~texar.torch.modules.KVCache`.
+
+        Args:
+            memory: Hidden states of shape
+                `[batch_size, mem_len, hidden_dim]`.
+
+        Returns:
+            A tuple of keys and values, each of shape
+            `[batch_size, num_heads, mem_len, head_dim]`.
+        """
+        batch_size, mem_len = memory.size()[:2]
+        heads = self.head_projection(memory).view(
+            batch_size, mem_len, 3, self.num_heads, self.head_dim)
+        k_head_h = heads[:, :, 1].transpose(1, 2)
+        v_head_h = heads[:, :, 2].transpose(1, 2)
+        return k_head_h, v_head_h
+
+    def forward_incremental(self,
+                            states_h: torch.Tensor,
+                            states_g: torch.Tensor,
+                            pos_keys: torch.Tensor,
+                            cache: KVCache,
+                            mem_len: int) \
+            -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Compute two-stream attention for a single new position, reusing
+        the content keys and values of previous positions stored in
+        :attr:`cache`. The content stream of the new position attends to the
+        last :attr:`mem_len` previous positions and itself, and the query
+        stream of the position to predict (right after the new position)
+        attends to the same positions. This is equivalent to calling
+        :meth:`forward` with the previous states as memory, and the new
+        position followed by a masked target position as input.
+
+        Args:
+            states_h: Content stream of the new position, of shape
+                `[batch_size, hidden_dim]`.
+            states_g: Query stream of the position to predict, of shape
+                `[batch_size, hidden_dim]`.
+            pos_keys: Projected relative positional encodings for distances
+                in descending order down to 0, of shape
+                `[max_len, num_heads, head_dim]`. `max_len` must be at least
+                :attr:`mem_len` + 2. See :meth:`project_positions`.
+            cache: The cache containing keys and values of previous
+                positions. Keys and values of the new position are appended.
+            mem_len: Number of previous positions to attend to.
+
+        Returns:
+            A tuple of the new content stream and query stream states, each
+            of shape `[batch_size, hidden_dim]`.
+        """
+        batch_size = states_h.size(0)
+        klen = mem_len + 1
+        pos_len = pos_keys.size(0)
+
+        heads = self.head_projection(states_h).view(
+            batch_size, 3, 1, self.num_heads, self.head_dim)
+        q_head_h = heads[:, 0, 0]
+        k_head_h, v_head_h = cache.append(
+            heads[:, 1].transpose(1, 2), heads[:, 2].transpose(1, 2))
+        k_head_h = k_head_h[:, :, -klen:]
+        v_head_h = v_head_h[:, :, -klen:]
+
+        # Distances for the content stream are `mem_len, ..., 0`, and for the
+        # query stream are `mem_len + 1, ..., 1`.
+        attn_vec_h = self._compute_incremental_attention(
+            q_head_h, k_head_h, v_head_h, pos_keys[pos_len - klen:])
+        attn_out_h = self._post_attention(attn_vec_h.unsqueeze(0))[0]
+        output_h = self.layer_norm(states_h + attn_out_h)
+
+        proj_dim = self.num_heads * self.head_dim
+        proj_weight = self.head_projection.weight[:proj_dim]
+        q_head_g = F.linear(states_g, proj_weight).view(
+            batch_size, self.num_heads, self.head_dim)
+        attn_vec_g = self._compute_incremental_attention(
+            q_head_g, k_head_h, v_head_h,
+            pos_keys[pos_len - klen - 1:pos_len - 1])
+        attn_out_g = self._post_attention(attn_vec_g.unsqueeze(0))[0]
+        output_g = self.layer_norm(states_g + attn_out_g)
+
+        return output_h, output_g
+
+    def project_positions(self, pos_embed: torch.Tensor) -> torch.Tensor:
+        r"""Project relative positional encodings into positional keys used
+        in :meth:`forward_incremental`.
+
+        Args:
+            pos_embed: Relative positional encodings of shape
+                `[max_len, hidden_dim]`.
+
+        Returns:
+            Positional keys of shape `[max_len, num_heads, head_dim]`.
+        """
+        return self.pos_projection(pos_embed).view(
+            -1, self.num_heads, self.head_dim)
+
 
 def params_except_in(module: nn.Module,
                      except_names: List[str]) \
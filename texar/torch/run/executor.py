@@ -15,20 +15,28 @@
 The Executor module.
 """
 
+import contextlib
+import copy
+import os
 import pickle
 import random
 import re
 import sys
 import time
-from collections import OrderedDict, defaultdict  # pylint: disable=unused-import
+from collections import (  # pylint: disable=unused-import
+    OrderedDict, defaultdict, deque)
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import (
-    Any, Callable, Dict, IO, List, Optional, Sequence, Set, Union,
-    no_type_check, overload)
+    Any, Callable, ContextManager, Deque, Dict, IO, List, Optional, Sequence,
+    Set, Tuple, Union, no_type_check, overload)
 
 import numpy as np
+import pkg_resources
 import torch
+from torch import __version__ as _torch_version  # type: ignore
+from torch import distributed as dist
 from torch import nn
 from torch.optim.lr_scheduler import _LRScheduler as LRScheduler
 from torch.optim.optimizer import Optimizer
@@ -50,6 +58,8 @@ __all__ = [
 ActionFn = Callable[['Executor'], None]
 LogDest = Union[str, Path, IO[str]]
 
+_torch_version = pkg_resources.parse_version(_torch_version)
+
 
 def make_deterministic(seed: int = 19260817,
                        cudnn_deterministic: bool = False):
@@ -260,6 +270,7 @@ class Executor:
     - :ref:`Arguments for validation <executor-valid-args>`
     - :ref:`Arguments for testing <executor-test-args>`
     - :ref:`Arguments for logging <executor-log-args>`
+    - :ref:`Arguments for profiling <executor-profile-args>`
 
     .. _executor-general-args:
 
@@ -331,6 +342,35 @@ class Executor:
         The device on which the model and data should be placed. Defaults to
         `None`, in which case GPUs will be used if available.
 
+    `distributed`: bool
+        If `True`, train with multiple processes using
+        :torch_docs:`DistributedDataParallel
+        <nn.html#torch.nn.parallel.DistributedDataParallel>`. The default
+        process group is used if it is already initialized; otherwise, it is
+        initialized from environment variables (e.g., as set by
+        ``torch.distributed.launch``), using the NCCL backend on GPUs and the
+        Gloo backend on CPUs. If :attr:`device` is `None`, the GPU with index
+        equal to the ``LOCAL_RANK`` environment variable is used if available.
+        Defaults to `False`.
+
+        In distributed mode:
+
+        - Training data is sharded across processes. Each process iterates
+          over ``1 / world_size`` of the examples in each epoch.
+        - Gradients are only synchronized on iterations that update
+          parameters when :attr:`num_iters_per_update` is greater than 1.
+        - Inputs to training metrics are gathered from all processes, so that
+          metric values are computed over the global batch.
+        - Validation and testing are performed on the entire dataset in each
+          process, so that conditions are triggered identically in all
+          processes.
+        - Only the process with rank 0 writes logs, tensorboard logs, and
+          checkpoints.
+
+        Each process must produce the same number of training batches, so
+        :attr:`batching_strategy` should be used with care. Distributed
+        training requires PyTorch 1.8 or higher.
+
     .. _executor-tbx-logging-args:
 
     **Arguments for tensorboard logging:**
@@ -397,6 +437,18 @@ class Executor:
         save optimizer and scheduler states, along with random number generator
         states from Python, NumPy, and PyTorch. Defaults to `True`.
 
+    `async_save`: bool
+        If `True`, checkpoints are written to disk in a background thread, so
+        that training is not blocked by :meth:`save`. The state to save is
+        first copied to CPU memory (page-locked memory for CUDA tensors). Use
+        :meth:`wait` to block until all checkpoints are written. This is
+        called automatically when training ends, before checkpoints are
+        loaded, and when training is terminated. Defaults to `False`.
+
+        Logs of background saves (e.g., removal of previous checkpoints due to
+        :attr:`max_to_keep`) are written on the next call to :meth:`save` or
+        :meth:`wait`.
+
     .. _executor-train-args:
 
     **Arguments for training:**
@@ -464,6 +516,36 @@ class Executor:
         :torch_docs:`nn.utils.clip_grad_norm_ <nn.html#torch.nn.utils.clip_grad_norm_>`
         for details. Defaults to `None`, i.e. no clipping.
 
+    `precision`: str
+        The numerical precision used for forward passes during training,
+        validation, and testing. Available choices are:
+
+        - ``"fp32"``: Full single precision.
+        - ``"bf16"``: Forward passes are run under
+          :torch_docs:`autocast <amp.html#torch.autocast>` with
+          ``torch.bfloat16``. This is supported on both CPUs and GPUs.
+        - ``"fp16"``: Forward passes are run under autocast with
+          ``torch.float16``, and the loss is scaled with a
+          :torch_docs:`GradScaler <amp.html#torch.cuda.amp.GradScaler>` to
+          prevent gradients from underflowing. Only supported on GPUs.
+
+        Gradients are unscaled before clipping with :attr:`grad_clip`, and the
+        state of the gradient scaler is saved to and loaded from checkpoints
+        along with the training state. Mixed precision requires PyTorch 1.10
+        or higher. Defaults to ``"fp32"``.
+
+    `prefetch_batches`: int
+        Number of batches to prepare ahead of time in a background thread,
+        overlapping data loading and host-to-device transfer with the
+        computation on the current batch. This will be passed as the
+        :attr:`prefetch_batches` argument for
+        :class:`~texar.torch.data.DataIterator` for training, validation,
+        and testing. Defaults to 0, i.e., no prefetching.
+
+        The time that training spends waiting for batches can be monitored via
+        the ``data_wait_time`` status variable (see
+        :ref:`log_format <log-format>`).
+
     .. _executor-valid-args:
 
     **Arguments for validation:**
@@ -508,6 +590,33 @@ class Executor:
                 action.reset_params(), action.scale_lr(0.8),
                 action.early_stop(patience=2)]
 
+    `async_validation`: bool
+        If `True`, validation runs in a background thread on a replica of the
+        model, so that training is not blocked by validation. When validation
+        is triggered, the current weights are copied into the replica, and
+        training resumes immediately. This requires memory for an extra copy
+        of the model. Defaults to `False`.
+
+        Results are delivered at the start of the first training iteration
+        after validation finishes, or when training ends. At this point,
+        :attr:`valid_metrics` are updated and the end of the |Validation|
+        event is signaled, so conditions such as
+        :python:`cond.validation(better=True)` in :attr:`save_every` or
+        :attr:`plateau_condition` are checked against the new results. The
+        training iteration at which the weights were copied is available as
+        the ``valid_iteration`` status variable, while ``iteration`` is the
+        current iteration. Since training has advanced since the weights were
+        copied, checkpoints saved while delivering results (e.g., by
+        :python:`save_every=cond.validation(better=True)`) only contain the
+        validated weights, as if :attr:`save_training_state` were `False`.
+        The status stored with such checkpoints is that of the iteration at
+        which the weights were copied.
+
+        Only one validation runs at a time. If validation is triggered before
+        the previous one finishes, training is blocked until its results are
+        delivered. The ``ValidationIteration`` event is not signaled in this
+        mode.
+
     .. _executor-test-args:
 
     **Arguments for testing:**
@@ -578,6 +687,11 @@ class Executor:
 
         - ``epoch`` (int): The current epoch.
         - ``iteration`` (int): The current iteration.
+        - ``data_wait_time`` (float): Total time in seconds that the training
+          loop has spent waiting for batches from the data iterator.
+        - ``valid_iteration`` (int): The training iteration at which the model
+          was most recently validated. This differs from ``iteration`` when
+          :attr:`async_validation` is `True`.
         - ``progress`` (float): The epoch progress represented in percentage,
           i.e. a floating-point number between 0 and 100. It should be noted
           that progress may not be accurate, and may not be available if the
@@ -592,6 +706,10 @@ class Executor:
           ``2018-07-06 08:26:03``. For more information on time formatting,
           please refer to documentation for Python built-in function
           :meth:`date.strftime`.
+        - ``t_<phase>``, ``t_<phase>_p90``, ``t_<phase>_p99`` (float): Rolling
+          percentiles of the time spent in each phase of training, in
+          milliseconds. Only available when :attr:`profile` is `True`. Please
+          refer to :ref:`profile <executor-profile-args>` for details.
         - ``metric``: An aggregated representation of all metrics, in the
           format of ``<name1>: <value1>, <name2>: <value2>, ...``. The format
           spec for ``metric`` will be applied to all metrics whose value
@@ -694,10 +812,64 @@ class Executor:
             :class:`~texar.torch.run.metric.StreamingMetric`\ s. You can also
             explicitly log only streaming metrics, or disable live progress for
             certain stages.
+
+    .. _executor-profile-args:
+
+    **Arguments for profiling:**
+
+    `profile`: bool
+        If `True`, record the time spent in each phase of training, including
+        fetching data (``data``), forward pass (``fwd``), backward pass
+        (``bwd``), optimizer step (``opt``), metric update (``metric``), the
+        entire iteration excluding actions triggered at the end of the
+        iteration (``iter``), validation (``valid``), testing
+        (``test``), and checkpointing (``save``). The time spent on checking
+        each condition and running each action in events is also recorded
+        under ``cond/<name>`` and ``action/<name>``. Defaults to `False`.
+
+        Rolling percentiles of phase times (in milliseconds) can be referenced
+        in log format strings as ``t_<phase>`` (median), ``t_<phase>_p90``,
+        and ``t_<phase>_p99``, e.g., ``{t_data:.1f}`` or ``{t_fwd_p90:.1f}``.
+        Percentiles of other phases can be queried through
+        :meth:`~texar.torch.run.executor_utils.Profiler.percentile` of
+        :attr:`profiler`.
+
+        Moving batches to the device happens while fetching data, and is thus
+        included in ``data``. On GPUs, devices are synchronized at phase
+        boundaries so that asynchronous kernels are attributed to the correct
+        phase, which may slow down training.
+
+    `profile_window`: int
+        Number of recent occurrences of each phase used to compute
+        percentiles. Defaults to 100.
+
+    `trace_path`: str, optional
+        If specified, a trace of the training iterations in
+        :attr:`trace_iterations` is written to this path in the Chrome trace
+        JSON format, which can be viewed in ``chrome://tracing`` or Perfetto.
+        Requires :attr:`profile` to be `True`. Defaults to `None`.
+
+    `trace_iterations`: tuple of int
+        A tuple ``(start, end)``. Iterations ``start`` (inclusive) to ``end``
+        (exclusive) are traced. Defaults to ``(10, 20)``.
+
+    `trace_backend`: str
+        The profiler used for tracing. Available choices are ``"executor"``,
+        which only traces the phases recorded by the executor, and
+        ``"torch"``, which traces operators and CUDA kernels using
+        :torch_docs:`torch.profiler <profiler.html>`, with phases annotated as
+        user-defined ranges. ``"torch"`` requires PyTorch 1.8.1 or higher.
+        Defaults to ``"executor"``.
     """
     # pylint: enable=line-too-long
 
     _EVENT_TYPES = (Event,)
+    # Maps profiling format variables to (phase, percentile).
+    _PROFILE_FORMAT_VARS: Dict[str, Tuple[str, float]] = {
+        f"t_{phase}{suffix}": (phase, q)
+        for phase in ["data", "fwd", "bwd", "opt", "metric", "iter", "valid",
+                      "test", "save"]
+        for suffix, q in [("", 50), ("_p90", 90), ("_p99", 99)]}
     _CHECKPOINT_METAINFO_FILE = "checkpoint.meta-info"
     _CHECKPOINT_EXTENSION = ".pt"
     _defaults: Dict[str, Any] = {
@@ -726,6 +898,7 @@ class Executor:
                  test_data: OptionalDict[DatasetBase] = None,
                  batching_strategy: Optional[BatchingStrategy] = None,
                  device: Optional[torch.device] = None,
+                 distributed: bool = False,
                  # tbX logging
                  tbx_logging_dir: Optional[str] = None,
                  tbx_log_every: Optional[Condition] = None,
@@ -734,6 +907,7 @@ class Executor:
                  max_to_keep: Optional[int] = None,
                  save_every: OptionalList[Condition] = None,
                  save_training_state: bool = True,
+                 async_save: bool = False,
                  # Training
                  train_metrics: OptionalDict[Metric] = None,
                  optimizer: Optional[Instance[Optimizer]] = None,
@@ -741,11 +915,14 @@ class Executor:
                  stop_training_on: OptionalList[Condition] = None,
                  num_iters_per_update: int = 1,
                  grad_clip: Optional[float] = None,
+                 precision: str = 'fp32',
+                 prefetch_batches: int = 0,
                  # Validation
                  valid_metrics: OptionalDict[Metric] = None,
                  validate_every: OptionalList[Condition] = None,
                  plateau_condition: OptionalList[Condition] = None,
                  action_on_plateau: OptionalList[ActionFn] = None,
+                 async_validation: bool = False,
                  validate_mode: str = 'eval',
                  # Testing
                  test_metrics: OptionalDict[Metric] = None,
@@ -760,7 +937,13 @@ class Executor:
                  test_log_format: Optional[str] = None,
                  valid_progress_log_format: Optional[str] = None,
                  test_progress_log_format: Optional[str] = None,
-                 show_live_progress: Union[bool, MaybeList[str]] = False):
+                 show_live_progress: Union[bool, MaybeList[str]] = False,
+                 # Profiling
+                 profile: bool = False,
+                 profile_window: int = 100,
+                 trace_path: Optional[str] = None,
+                 trace_iterations: Tuple[int, int] = (10, 20),
+                 trace_backend: str = 'executor'):
 
         try:
             from tqdm._utils import _environ_cols_wrapper, _term_move_up
@@ -787,12 +970,68 @@ class Executor:
         # Device placement
         if device is None:
             if torch.cuda.is_available():
-                device = torch.device(torch.cuda.current_device())
+                if distributed:
+                    local_rank = int(os.environ.get("LOCAL_RANK", 0))
+                    device = torch.device(f'cuda:{local_rank}')
+                else:
+                    device = torch.device(torch.cuda.current_device())
             else:
                 device = torch.device('cpu')
         self.device = device
         self.model.to(device)
 
+        # Distributed training
+        self.distributed = distributed
+        self._rank = 0
+        self._world_size = 1
+        self._shard_seed = 0
+        self._train_model: nn.Module = self.model
+        if distributed:
+            if (_torch_version < pkg_resources.parse_version("1.8.0") or
+                    not dist.is_available()):
+                raise ValueError("Distributed training requires PyTorch 1.8 "
+                                 "or higher with distributed support")
+            if device.type == 'cuda':
+                torch.cuda.set_device(device)
+            if not dist.is_initialized():
+                backend = "nccl" if device.type == 'cuda' else "gloo"
+                dist.init_process_group(backend, init_method="env://")
+            self._rank = dist.get_rank()
+            self._world_size = dist.get_world_size()
+            # All processes must shuffle training data with the same seed, so
+            # that their shards do not overlap.
+            seed = torch.randint(
+                2 ** 31 - 1, (1,), device=(
+                    device if dist.get_backend() == "nccl" else 'cpu'))
+            dist.broadcast(seed, src=0)
+            self._shard_seed = int(seed.item())
+            self._train_model = nn.parallel.DistributedDataParallel(
+                self.model,
+                device_ids=[device] if device.type == 'cuda' else None)
+
+        # Profiling
+        self.profiler: Optional[utils.Profiler] = None
+        if profile:
+            self.profiler = utils.Profiler(
+                profile_window, synchronize=(device.type == 'cuda'))
+        elif trace_path is not None:
+            raise ValueError("`profile` must be True when `trace_path` is "
+                             "specified")
+        if trace_backend not in ["executor", "torch"]:
+            raise ValueError(f"Invalid trace backend '{trace_backend}'. "
+                             f"Available choices are 'executor' and 'torch'")
+        if (trace_backend == "torch" and
+                _torch_version < pkg_resources.parse_version("1.8.1")):
+            raise ValueError("Tracing with the PyTorch profiler requires "
+                             "PyTorch 1.8.1 or higher")
+        if trace_iterations[0] >= trace_iterations[1]:
+            raise ValueError("`trace_iterations` must be a tuple (start, end) "
+                             "with start < end")
+        self._trace_path = Path(trace_path) if trace_path is not None else None
+        self._trace_iterations = trace_iterations
+        self._trace_backend = trace_backend
+        self._torch_profiler: Optional[Any] = None
+
         # Logging
         self._log_conditions = utils.to_list(log_every)
         self._print_model_arch = print_model_arch
@@ -813,9 +1052,13 @@ class Executor:
         self.max_to_keep = max_to_keep
         self._save_conditions = utils.to_list(save_every)
         self._save_training_state = save_training_state
+        self._checkpoint_writer: Optional[utils.CheckpointWriter] = (
+            utils.CheckpointWriter() if async_save else None)
+        # Logs from the background thread, written in the main thread.
+        self._async_save_logs: Deque[Tuple[str, str]] = deque()
 
         self._directory_exists = False
-        if self.checkpoint_dir is not None:
+        if self.checkpoint_dir is not None and self._is_main_process:
             if not self.checkpoint_dir.exists():
                 self.checkpoint_dir.mkdir(parents=True)
             else:
@@ -840,6 +1083,35 @@ class Executor:
         self._stop_training_conditions = utils.to_list(stop_training_on)
         self.num_iters_per_update = num_iters_per_update
         self.grad_clip = grad_clip
+        self.prefetch_batches = prefetch_batches
+
+        # Mixed precision
+        if precision not in ["fp32", "bf16", "fp16"]:
+            raise ValueError(f"Invalid precision '{precision}'. Available "
+                             f"choices are 'fp32', 'bf16', and 'fp16'")
+        if (precision != "fp32" and
+                _torch_version < pkg_resources.parse_version("1.10.0")):
+            raise ValueError("Mixed precision training requires PyTorch 1.10 "
+                             "or higher")
+        if precision == "fp16" and self.device.type != "cuda":
+            raise ValueError("'fp16' precision is only supported on CUDA "
+                             "devices. Use 'bf16' instead")
+        self.precision = precision
+        self._autocast_dtype: Optional[torch.dtype] = {
+            "fp32": None,
+            "bf16": torch.bfloat16,  # type: ignore
+            "fp16": torch.float16,
+        }[precision]
+        self._grad_scaler: Optional[Any] = None
+        if precision == "fp16":
+            # `torch.amp.GradScaler` is added in PyTorch 2.3, and
+            # `torch.cuda.amp.GradScaler` is deprecated since.
+            grad_scaler = getattr(getattr(torch, "amp", None),
+                                  "GradScaler", None)
+            if grad_scaler is not None:
+                self._grad_scaler = grad_scaler("cuda")
+            else:
+                self._grad_scaler = torch.cuda.amp.GradScaler()
 
         # Validation
         self.valid_metrics = utils.to_metric_dict(valid_metrics)
@@ -847,6 +1119,19 @@ class Executor:
         self.validate_mode = validate_mode
         self._plateau_conditions = utils.to_list(plateau_condition)
         self._actions_on_plateau = utils.to_list(action_on_plateau)
+        # The model used in `_validate_step`. With asynchronous validation,
+        # this is replaced by a replica when validation is first performed.
+        self._valid_model = self.model
+        self._validation_worker: Optional[ThreadPoolExecutor] = (
+            ThreadPoolExecutor(max_workers=1) if async_validation else None)
+        # The pending validation job, the status when weights were copied,
+        # its metrics, and the size of validation data.
+        self._pending_validation: Optional[Tuple[
+            'Future[Tuple[int, float]]', utils.TrainingStatus,
+            'OrderedDict[str, Metric]', Optional[int]]] = None
+        # Status when the weights being validated were copied, set while
+        # delivering results of asynchronous validation.
+        self._validated_status: Optional[utils.TrainingStatus] = None
 
         # Testing
         if (test_metrics is None and valid_metrics is not None and
@@ -866,6 +1151,8 @@ class Executor:
         self.status = {
             "epoch": 0,
             "iteration": 0,
+            "data_wait_time": 0.0,
+            "valid_iteration": 0,
             "split": "train",
             "metric": self.train_metrics,
             "eval_metric": self.valid_metrics,
@@ -890,7 +1177,7 @@ class Executor:
         self._register_logging_actions(show_live_progress)
 
         # tbx logging
-        if tbx_logging_dir is not None:
+        if tbx_logging_dir is not None and self._is_main_process:
             try:
                 from tensorboardX import SummaryWriter
             except ImportError:
@@ -1097,9 +1384,71 @@ class Executor:
             raise ValueError(
                 "`path` must be specified when `checkpoint_dir` is `None`")
 
+        if not self._is_main_process:
+            return
         if save_training_state is None:
             save_training_state = self._save_training_state
 
+        with self._profile("save"):
+            status = self.status
+            state: Any
+            if self._validated_status is not None:
+                # Checkpoints triggered by results of asynchronous validation
+                # only store the validated weights, since other training
+                # states have advanced since the weights were copied.
+                status = self._validated_status
+                state = self._valid_model.state_dict()
+            elif save_training_state and self.optimizer is not None:
+                state = utils.SavedTrainingState(
+                    model=self.model.state_dict(),
+                    optimizer=self.optimizer.state_dict(),
+                    scheduler=(self.lr_scheduler.state_dict()
+                               if self.lr_scheduler is not None else None),
+                    system_rng=random.getstate(),
+                    numpy_rng=np.random.get_state(),
+                    torch_rng=torch.random.get_rng_state(),
+                    grad_scaler=(self._grad_scaler.state_dict()
+                                 if self._grad_scaler is not None else None),
+                )
+            else:
+                state = self.model.state_dict()
+            timestamp = time.time()
+
+            if self._checkpoint_writer is None:
+                self._write_checkpoint(
+                    ckpt_dir, state, status, timestamp, self.write_log)
+                return
+
+            # Take a snapshot of the current state, and write it in background.
+            self._write_async_save_logs()
+            state = utils.snapshot_state(state)
+            # The status is pickled into the meta-info file anyway.
+            status_bytes = pickle.dumps(status)
+            copy_done: Optional[torch.cuda.Event] = None
+            if torch.cuda.is_available() and torch.cuda.is_initialized():
+                copy_done = torch.cuda.Event()
+                copy_done.record()
+
+            def log_fn(log_str: str, mode: str):
+                self._async_save_logs.append((log_str, mode))
+
+            def job():
+                if copy_done is not None:
+                    copy_done.synchronize()
+                status = pickle.loads(status_bytes)
+                self._write_checkpoint(
+                    ckpt_dir, state, status, timestamp, log_fn)
+
+            self._checkpoint_writer.submit(job)
+
+    def _write_checkpoint(self, ckpt_dir: Path, state: Any,
+                          status: utils.TrainingStatus, timestamp: float,
+                          log_fn: Callable[..., None]) -> None:
+        r"""Write the checkpoint to a file, remove previous checkpoints if
+        needed, and update the checkpoint meta-info file. Files are first
+        written to temporary paths and then renamed, so they're never
+        partially written.
+        """
         # Load the checkpoint meta-info file.
         meta_path = ckpt_dir / self._CHECKPOINT_METAINFO_FILE
         if meta_path.exists():
@@ -1109,7 +1458,6 @@ class Executor:
             except (EOFError, IOError):
                 meta_dict = {}
         else:
-            meta_path.touch()
             meta_dict = {}
 
         # Remove earliest checkpoints if exceeds `max_to_keep`.
@@ -1119,11 +1467,10 @@ class Executor:
                     meta_dict, key=lambda name: meta_dict[name]["timestamp"])
                 (ckpt_dir / checkpoint_name).unlink()
                 del meta_dict[checkpoint_name]
-                self.write_log(f"Previous checkpoint {checkpoint_name} removed "
-                               f"due to `max_to_keep`(={self.max_to_keep}) "
-                               f"limit", mode="info")
+                log_fn(f"Previous checkpoint {checkpoint_name} removed "
+                       f"due to `max_to_keep`(={self.max_to_keep}) limit",
+                       mode="info")
 
-        timestamp = time.time()
         checkpoint_name = str(timestamp) + self._CHECKPOINT_EXTENSION
         ckpt_path = ckpt_dir / checkpoint_name
         if ckpt_path.exists():
@@ -1134,27 +1481,35 @@ class Executor:
                 ckpt_path = ckpt_dir / checkpoint_name
                 if not ckpt_path.exists():
                     break
-        if save_training_state and self.optimizer is not None:
-            train_state = utils.SavedTrainingState(
-                model=self.model.state_dict(),
-                optimizer=self.optimizer.state_dict(),
-                scheduler=(self.lr_scheduler.state_dict()
-                           if self.lr_scheduler is not None else None),
-                system_rng=random.getstate(),
-                numpy_rng=np.random.get_state(),
-                torch_rng=torch.random.get_rng_state(),
-            )
-            torch.save(train_state, str(ckpt_path))
-        else:
-            torch.save(self.model.state_dict(), str(ckpt_path))
+                idx += 1
+        tmp_path = ckpt_dir / (checkpoint_name + ".tmp")
+        torch.save(state, str(tmp_path))
+        os.replace(str(tmp_path), str(ckpt_path))
+
         meta_dict[checkpoint_name] = {
-            "status": self.status,
+            "status": status,
             "timestamp": timestamp,
         }
-        with meta_path.open("wb") as f:
+        tmp_path = ckpt_dir / (self._CHECKPOINT_METAINFO_FILE + ".tmp")
+        with tmp_path.open("wb") as f:
             pickle.dump(meta_dict, f)
+        os.replace(str(tmp_path), str(meta_path))
+
+        log_fn(f"Current checkpoint saved to {ckpt_path}", mode="info")
 
-        self.write_log(f"Current checkpoint saved to {ckpt_path}", mode="info")
+    def _write_async_save_logs(self) -> None:
+        while len(self._async_save_logs) > 0:
+            log_str, mode = self._async_save_logs.popleft()
+            self.write_log(log_str, mode=mode)
+
+    def wait(self) -> None:
+        r"""Block until all checkpoints being saved in background are written
+        to disk. This is only meaningful when :attr:`async_save` is `True` in
+        the constructor arguments.
+        """
+        if self._checkpoint_writer is not None:
+            self._checkpoint_writer.wait()
+            self._write_async_save_logs()
 
     def load(self, path: Optional[str] = None,
              load_training_state: bool = True,
@@ -1185,6 +1540,11 @@ class Executor:
         else:
             raise ValueError(
                 "`path` must be specified when `checkpoint_dir` is `None`")
+        # Make sure checkpoints being saved in background are visible.
+        self.wait()
+        if self.distributed:
+            # Wait until the main process finishes writing checkpoints.
+            dist.barrier()
         if ckpt_path.is_dir():
             try:
                 meta_path = ckpt_path / self._CHECKPOINT_METAINFO_FILE
@@ -1243,6 +1603,9 @@ class Executor:
                 random.setstate(checkpoint.system_rng)
                 np.random.set_state(checkpoint.numpy_rng)
                 torch.random.set_rng_state(checkpoint.torch_rng.cpu())
+                if (self._grad_scaler is not None and
+                        checkpoint.grad_scaler is not None):
+                    self._grad_scaler.load_state_dict(checkpoint.grad_scaler)
         else:
             self.model.load_state_dict(checkpoint)
 
@@ -1266,6 +1629,7 @@ class Executor:
             raise ValueError(f"terminate() should only be called "
                              "within event actions")
         self._should_terminate = True
+        self.wait()
 
     def remove_action(self) -> None:
         r"""Remove the current action being run. This method is intended to be
@@ -1303,7 +1667,11 @@ class Executor:
         if self.train_data is None:
             raise ValueError("No training dataset is specified")
         self.train_data.to(self.device)
-        iterator = DataIterator(self.train_data, self.batching_strategy)
+        iterator = DataIterator(
+            self.train_data, self.batching_strategy,
+            prefetch_batches=self.prefetch_batches,
+            num_shards=self._world_size, shard_index=self._rank,
+            shard_seed=self._shard_seed)
         if len(self._valid_conditions) > 0:
             if self.valid_data is None:
                 raise ValueError("Validation will be performed, but no "
@@ -1330,14 +1698,19 @@ class Executor:
             def _try_get_data_size(executor: 'Executor'):
                 assert executor.train_data is not None
                 try:
-                    size = len(executor.train_data)
-                    executor._train_tracker.set_size(size)  # pylint: disable=protected-access
+                    # pylint: disable=protected-access
+                    size = len(executor.train_data) // executor._world_size
+                    executor._train_tracker.set_size(size)
+                    # pylint: enable=protected-access
                 except TypeError:
                     pass
                 executor.remove_action()
 
             self._register_hook((Event.Epoch, True), _try_get_data_size)
             data_size = None
+        if data_size is not None:
+            # Each process only iterates over a shard of training data.
+            data_size //= self._world_size
         self._train_tracker.set_size(data_size)
 
         # Main training loop.
@@ -1348,8 +1721,16 @@ class Executor:
             self.write_log("Training terminated", mode='info')
         finally:
             self._train_tracker.stop()
+            self._maybe_stop_trace(force=True)
+
+        # Deliver results of the last validation if it's still running.
+        try:
+            self._finish_async_validation(wait=True)
+        except utils.ExecutorTerminateSignal:
+            pass
 
         self._fire_event(Event.Training, True)
+        self.wait()
 
         # close the log files
         self._close_files()
@@ -1393,9 +1774,12 @@ class Executor:
             self._fire_event(Event.Testing, False)
             data.to(self.device)
             if self.test_mode == "eval":
-                iterator = DataIterator(data, self.batching_strategy)
+                iterator = DataIterator(
+                    data, self.batching_strategy,
+                    prefetch_batches=self.prefetch_batches)
             else:
-                iterator = DataIterator(data)
+                iterator = DataIterator(
+                    data, prefetch_batches=self.prefetch_batches)
             try:
                 data_size: Optional[int] = len(data)
             except TypeError:
@@ -1404,7 +1788,7 @@ class Executor:
 
             self._test_tracker.start()
             try:
-                with torch.no_grad():
+                with torch.no_grad(), self._profile("test"):
                     self._test_loop(iterator)
             except utils.ExecutorTerminateSignal:
                 self.write_log(
@@ -1526,7 +1910,8 @@ class Executor:
 
             for key, value in valid_metrics.items():
                 self.summary_writer.add_scalar(
-                    f"valid/{key}", value.value(), executor.status["iteration"])
+                    f"valid/{key}", value.value(),
+                    executor.status["valid_iteration"])
 
         _register(self._tbx_logging_conditions, tbx_train_log_fn)
         _register(self._valid_conditions, tbx_valid_log_fn)
@@ -1649,6 +2034,10 @@ class Executor:
             if name in self.status or name in ["time", "progress", "speed"]:
                 # built-in name
                 pass
+            elif (self.profiler is not None and
+                  name in self._PROFILE_FORMAT_VARS):
+                # profiled phase time
+                pass
             elif name in metrics:
                 metrics_to_print.add(name)
             else:
@@ -1680,6 +2069,10 @@ class Executor:
                 else:
                     cur_format_str = format_str_wo_progress
                     format_args["progress"] = "unknown"
+            for name in format_vars:
+                if name in self._PROFILE_FORMAT_VARS:
+                    phase, q = self._PROFILE_FORMAT_VARS[name]
+                    format_args[name] = executor.profiler.percentile(phase, q)
             format_args.update({
                 name: metrics[name].value() for name in metrics_to_print})
             log_str = cur_format_str.format(**format_args)
@@ -1705,6 +2098,8 @@ class Executor:
         self._opened_files = []
         self._log_destination = []
         self._log_destination_is_tty = []
+        if not self._is_main_process:
+            return
 
         for dest in utils.to_list(self.log_destination):
             if isinstance(dest, (str, Path)):
@@ -1754,13 +2149,15 @@ class Executor:
             # triggers.
             should_trigger = True
             if cond is not None:
-                should_trigger = cond.hooks[(event, end)](self)
+                with self._profile_hook("cond", cond):
+                    should_trigger = cond.hooks[(event, end)](self)
                 if self._should_remove_current_action:
                     self._should_remove_current_action = False
                     _conds_to_remove.append(cond)
             if should_trigger:
                 for idx, action in enumerate(actions):
-                    action(self)
+                    with self._profile_hook("action", action):
+                        action(self)
                     if self._should_remove_current_action:
                         # Rebind `actions` variable and assign to _hooks. This
                         # does not affect the current for-loop over `actions`.
@@ -1780,6 +2177,82 @@ class Executor:
             self._should_terminate = False
             raise utils.ExecutorTerminateSignal
 
+    @property
+    def _is_main_process(self) -> bool:
+        return self._rank == 0
+
+    def _profile(self, name: str):
+        r"""Returns a context manager that records the duration of phase
+        :attr:`name` if profiling is enabled.
+        """
+        if self.profiler is None:
+            return contextlib.ExitStack()
+        return self.profiler.phase(name)
+
+    def _profile_hook(self, kind: str, hook: Any):
+        r"""Returns a context manager that records the duration of a condition
+        check or an action. Hooks are named after their function or class.
+        """
+        if self.profiler is None:
+            return contextlib.ExitStack()
+        name = getattr(hook, "__name__", type(hook).__name__)
+        return self.profiler.phase(f"{kind}/{name}")
+
+    def _maybe_start_trace(self, iteration: int) -> None:
+        r"""Start tracing if :attr:`iteration` is the first iteration in
+        :attr:`trace_iterations`.
+        """
+        if (self._trace_path is None or self.profiler is None or
+                iteration != self._trace_iterations[0]):
+            return
+        if self._trace_backend == "torch":
+            profiler = torch.profiler  # type: ignore
+            activities = [profiler.ProfilerActivity.CPU]
+            if self.device.type == "cuda":
+                activities.append(profiler.ProfilerActivity.CUDA)
+            self._torch_profiler = profiler.profile(activities=activities)
+            self._torch_profiler.start()
+            # Phases are shown as labeled ranges in the PyTorch trace.
+            self.profiler.record_functions = True
+        else:
+            self.profiler.tracing = True
+
+    def _maybe_stop_trace(self, iteration: int = 0,
+                          force: bool = False) -> None:
+        r"""Stop tracing and write the trace file, if tracing is active and
+        :attr:`iteration` is the last iteration in :attr:`trace_iterations`,
+        or if :attr:`force` is `True`.
+        """
+        if self.profiler is None or self._trace_path is None:
+            return
+        if not (self.profiler.tracing or self._torch_profiler is not None):
+            return
+        if not force and iteration < self._trace_iterations[1] - 1:
+            return
+        path = self._trace_path
+        if self.distributed:
+            # Each process writes its own trace.
+            path = path.with_name(f"{path.stem}.rank{self._rank}{path.suffix}")
+        if self._torch_profiler is not None:
+            self._torch_profiler.stop()
+            self._torch_profiler.export_chrome_trace(str(path))
+            self._torch_profiler = None
+            self.profiler.record_functions = False
+        else:
+            self.profiler.tracing = False
+            self.profiler.write_chrome_trace(str(path))
+        self.write_log(f"Chrome trace written to '{path}'", mode='info')
+
+    def _autocast(self) -> ContextManager[Any]:
+        r"""Returns a context manager that runs forward passes in the precision
+        specified by :attr:`precision`.
+        """
+        if self._autocast_dtype is None:
+            # An empty `ExitStack` is a no-op context manager.
+            return contextlib.ExitStack()
+        return torch.autocast(  # type: ignore
+            device_type=self.device.type, dtype=self._autocast_dtype)
+
     def _validate_step(self, batch: Batch):
         r"""Perform one step of validation, i.e., perform a forward pass (or
         decoding, depending on :attr:`validate_mode`) for a single batch.
@@ -1791,10 +2264,12 @@ class Executor:
             The dictionary containing values returned by the model. This is used
             to compute metrics.
         """
-        if self.validate_mode == 'predict':
-            return_dict = self.model.predict(batch)  # type: ignore
-        else:
-            return_dict = self.model(batch)
+        with self._autocast():
+            if self.validate_mode == 'predict':
+                return_dict = self._valid_model.predict(  # type: ignore
+                    batch)
+            else:
+                return_dict = self._valid_model(batch)
         return return_dict
 
     def _test_step(self, batch: Batch):
@@ -1808,10 +2283,11 @@ class Executor:
             The dictionary containing values returned by the model. This is used
             to compute metrics.
         """
-        if self.test_mode == 'predict':
-            return_dict = self.model.predict(batch)  # type: ignore
-        else:
-            return_dict = self.model(batch)
+        with self._autocast():
+            if self.test_mode == 'predict':
+                return_dict = self.model.predict(batch)  # type: ignore
+            else:
+                return_dict = self.model(batch)
         return return_dict
 
     def _train_step(self, batch: Batch):
@@ -1826,26 +2302,55 @@ class Executor:
             The dictionary containing values returned by the model. This is used
             to compute metrics.
         """
-        return_dict = self.model(batch)
-        try:
-            loss = return_dict['loss']
-        except KeyError:
-            raise ValueError("Return dictionary from model does not "
-                             "contain 'loss' entry")
-        loss = loss / self.num_iters_per_update
-        loss.backward()
-        if (self.num_iters_per_update == 1 or
-                self.status["iteration"] % self.num_iters_per_update == 0):
+        should_update = (
+            self.num_iters_per_update == 1 or
+            self.status["iteration"] % self.num_iters_per_update == 0)
+        sync_context: Any = contextlib.ExitStack()
+        if self.distributed and not should_update:
+            # Skip gradient synchronization when accumulating gradients.
+            sync_context = self._train_model.no_sync()  # type: ignore
+        with sync_context:
+            with self._profile("fwd"), self._autocast():
+                return_dict = self._train_model(batch)
+            try:
+                loss = return_dict['loss']
+            except KeyError:
+                raise ValueError("Return dictionary from model does not "
+                                 "contain 'loss' entry")
+            loss = loss / self.num_iters_per_update
+            if self._grad_scaler is not None:
+                loss = self._grad_scaler.scale(loss)
+            with self._profile("bwd"):
+                loss.backward()
+        if should_update:
             self._fire_event(Event.ParameterUpdate, False)
+            with self._profile("opt"):
+                self._update_parameters()
+            self._fire_event(Event.ParameterUpdate, True)
+        return return_dict
+
+    def _update_parameters(self) -> None:
+        r"""Clip gradients, perform an optimizer step, and then clear the
+        gradients.
+        """
+        if self._grad_scaler is not None:
+            if self.grad_clip is not None:
+                # Gradients accumulated over all iterations are unscaled
+                # at once, so that the norm is computed on true values.
+                self._grad_scaler.unscale_(self.optimizer)
+                torch.nn.utils.clip_grad_norm_(
+                    self.model.parameters(), self.grad_clip)
+            # Skips the update if gradients contain infs or NaNs.
+            self._grad_scaler.step(self.optimizer)
+            self._grad_scaler.update()
+        else:
             if self.grad_clip is not None:
                 torch.nn.utils.clip_grad_norm_(
                     self.model.parameters(), self.grad_clip)
             self.optimizer.step()  # type: ignore
-            if self.lr_scheduler is not None:
-                self.lr_scheduler.step()
-            self.optimizer.zero_grad()  # type: ignore
-            self._fire_event(Event.ParameterUpdate, True)
-        return return_dict
+        if self.lr_scheduler is not None:
+            self.lr_scheduler.step()
+        self.optimizer.zero_grad()  # type: ignore
 
     def _train_loop(self, iterator: DataIterator) -> None:
         r"""Run the entire training loop given the data iterator.
@@ -1866,17 +2371,48 @@ class Executor:
 
             self._fire_event(Event.Epoch, False)
 
-            for batch in iterator:
-                self._fire_event(Event.Iteration, False)
-                iteration += 1
-                self.status["iteration"] = iteration
-
-                return_dict = self._train_step(batch)
-
-                self._train_tracker.add(len(batch))
-                utils.update_metrics(return_dict, batch, self.train_metrics)
-
+            data_iter = iter(iterator)
+            while True:
+                self._finish_async_validation(wait=False)
+                self._maybe_start_trace(iteration + 1)
+                # Phases are not recorded if they end with an exception, so the
+                # end of data is not recorded as an iteration.
+                data_exhausted = False
+                try:
+                    with self._profile("iter"):
+                        # Time spent here is not overlapped with computation,
+                        # which indicates whether the model is waiting for data.
+                        wait_start = time.time()
+                        try:
+                            with self._profile("data"):
+                                batch = next(data_iter)
+                        except StopIteration:
+                            data_exhausted = True
+                            raise
+                        finally:
+                            self.status["data_wait_time"] += (
+                                time.time() - wait_start)
+
+                        self._fire_event(Event.Iteration, False)
+                        iteration += 1
+                        self.status["iteration"] = iteration
+
+                        return_dict = self._train_step(batch)
+
+                        self._train_tracker.add(len(batch))
+                        with self._profile("metric"):
+                            utils.update_metrics(
+                                return_dict, batch, self.train_metrics,
+                                distributed=self.distributed)
+                except StopIteration:
+                    if data_exhausted:
+                        break
+                    raise
+
+                # Actions such as validation and checkpointing are triggered
+                # here, and are excluded from `iter`.
                 self._fire_event(Event.Iteration, True)
+                self._maybe_stop_trace(iteration)
             self._fire_event(Event.Epoch, True)
             self._train_tracker.reset()
 
@@ -1914,22 +2450,18 @@ class Executor:
     def _validate(self) -> None:
         if self.valid_data is None:
             raise ValueError("Validation data not specified.")
+        if self._validation_worker is not None:
+            self._validate_async()
+            return
 
+        self.status["valid_iteration"] = self.status["iteration"]
         self._fire_event(Event.Validation, False)
 
         # Initialize metrics.
         for metric in self.valid_metrics.values():
             metric.reset()
 
-        if self.validate_mode == "eval":
-            iterator = DataIterator(self.valid_data, self.batching_strategy)
-        else:
-            iterator = DataIterator(self.valid_data)
-
-        try:
-            data_size: Optional[int] = len(self.valid_data)
-        except TypeError:
-            data_size = None
+        iterator, data_size = self._create_valid_iterator()
         self._valid_tracker.set_size(data_size)
 
         model_mode = self.model.training
@@ -1941,7 +2473,7 @@ class Executor:
         # Main validation loop.
         self._valid_tracker.start()
         try:
-            with torch.no_grad():
+            with torch.no_grad(), self._profile("valid"):
                 self._validate_loop(iterator)
         except utils.ExecutorTerminateSignal:
             self.write_log(
@@ -1955,3 +2487,121 @@ class Executor:
         # Restore status values.
         self.status["split"] = prev_split
         self.model.train(model_mode)
+
+    def _create_valid_iterator(self) -> Tuple[DataIterator, Optional[int]]:
+        r"""Create the iterator over validation data, and return it along with
+        the size of validation data, or `None` if the size is unknown.
+        """
+        assert self.valid_data is not None
+        if self.validate_mode == "eval":
+            iterator = DataIterator(
+                self.valid_data, self.batching_strategy,
+                prefetch_batches=self.prefetch_batches)
+        else:
+            iterator = DataIterator(
+                self.valid_data, prefetch_batches=self.prefetch_batches)
+
+        try:
+            data_size: Optional[int] = len(self.valid_data)
+        except TypeError:
+            data_size = None
+        return iterator, data_size
+
+    def _validate_async(self) -> None:
+        r"""Copy the current weights into the validation replica, and start
+        validation in the background thread. Results are delivered by
+        :meth:`_finish_async_validation`.
+        """
+        assert self._validation_worker is not None
+        # The replica is reused, so the previous validation must finish first.
+        self._finish_async_validation(wait=True)
+
+        with self._profile("valid"):
+            self._fire_event(Event.Validation, False)
+
+            if self._valid_model is self.model:
+                self._valid_model = copy.deepcopy(self.model)
+                for param in self._valid_model.parameters():
+                    param.requires_grad_(False)
+                    param.grad = None
+                self._valid_model.train(self.test_mode == "train")
+            self._valid_model.load_state_dict(self.model.state_dict())
+            copy_done: Optional[torch.cuda.Event] = None
+            if self.device.type == "cuda":
+                copy_done = torch.cuda.Event()
+                copy_done.record()
+
+            # Metrics are computed on copies, so that results of the previous
+            # validation remain accessible until new results are delivered.
+            metrics = copy.deepcopy(self.valid_metrics)
+            for metric in metrics.values():
+                metric.reset()
+            iterator, data_size = self._create_valid_iterator()
+
+            future = self._validation_worker.submit(
+                self._validate_async_job, iterator, metrics, copy_done)
+            # Metrics in the status refer to the dictionaries of the executor,
+            # so that they are up-to-date when the status is saved.
+            self._pending_validation = (
+                future, self.status.copy(), metrics, data_size)
+
+    def _validate_async_job(self, iterator: DataIterator,
+                            metrics: 'OrderedDict[str, Metric]',
+                            copy_done: Optional[torch.cuda.Event]) \
+            -> Tuple[int, float]:
+        r"""Run validation on the replica in the background thread. Returns
+        the number of validated examples and the elapsed time.
+        """
+        start_time = time.time()
+        n_examples = 0
+        stream: Optional[torch.cuda.Stream] = None
+        stream_context: Any = contextlib.ExitStack()
+        if copy_done is not None:
+            # Run on a separate stream to overlap with training kernels.
+            stream = torch.cuda.Stream(self.device)
+            stream.wait_event(copy_done)
+            stream_context = torch.cuda.stream(stream)
+        with stream_context, torch.no_grad():
+            for batch in iterator:
+                return_dict = self._validate_step(batch)
+                utils.update_metrics(return_dict, batch, metrics)
+                n_examples += len(batch)
+        if stream is not None:
+            # The replica must not be overwritten while kernels are running.
+            stream.synchronize()
+        return n_examples, time.time() - start_time
+
+    def _finish_async_validation(self, wait: bool) -> None:
+        r"""Deliver results of the pending asynchronous validation, if any, and
+        signal the end of the |Validation| event.
+
+        Args:
+            wait: If `True`, block until the pending validation finishes.
+                Otherwise, results are delivered only if validation has
+                finished.
+        """
+        if self._pending_validation is None:
+            return
+        future, status, metrics, data_size = self._pending_validation
+        if not wait and not future.done():
+            return
+        self._pending_validation = None
+        n_examples, elapsed_time = future.result()
+
+        # Update metrics in-place, since logging functions hold references to
+        # the dictionary.
+        self.valid_metrics.update(metrics)
+        self._valid_tracker.set_size(data_size)
+        self._valid_tracker.record(n_examples, elapsed_time)
+
+        prev_split = self.status["split"]
+        self.status["split"] = "valid"
+        self.status["valid_iteration"] = status["iteration"]
+        status["split"] = "valid"
+        status["valid_iteration"] = status["iteration"]
+        self._validated_status = status
+        try:
+            self._fire_event(Event.Validation, True)
+        finally:
+            self._validated_status = None
+            self.status["split"] = prev_split
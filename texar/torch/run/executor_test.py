@@ -1,4 +1,7 @@
+import json
+import pickle
 import shutil
+import socket
 import tempfile
 import unittest
 from pathlib import Path
@@ -6,11 +9,14 @@ import os
 from typing import List, Dict, Tuple
 
 import torch
+from torch import distributed as dist
+from torch import multiprocessing as mp
 from torch import nn
 from torch.nn import functional as F
 
 import texar.torch as tx
 from texar.torch.run import *
+from texar.torch.run.executor_utils import SavedTrainingState
 
 
 class DummyClassifier(nn.Module):
@@ -57,6 +63,53 @@ class DummyData(tx.data.DatasetBase[Example, Example]):
         return tx.data.Batch(len(examples), tokens=tokens, label=labels)
 
 
+def _train_distributed(rank: int, world_size: int, port: int,
+                       checkpoint_dir: str):
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(port)
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+
+    # All processes create the same model and data.
+    make_deterministic()
+    model = DummyClassifier(vocab_size=100, n_classes=5)
+    data = torch.randint(100, size=(200, 20))
+    labels = torch.randint(5, size=(200,)).tolist()
+    train_data = DummyData(tx.data.SequenceDataSource(list(zip(data, labels))),
+                           hparams={"batch_size": 10, "shuffle": True})
+    # Make the initial weights differ, to check that they're synchronized.
+    with torch.no_grad():
+        for param in model.parameters():
+            param += rank
+    executor = Executor(
+        model=model,
+        train_data=train_data,
+        device=torch.device("cpu"),
+        distributed=True,
+        checkpoint_dir=checkpoint_dir,
+        save_every=cond.epoch(),
+        train_metrics=[("loss", metric.RunningAverage(20)),
+                       ("accuracy", metric.Accuracy(pred_name="preds"))],
+        optimizer={"type": torch.optim.Adam, "kwargs": {}},
+        num_iters_per_update=2,
+        stop_training_on=cond.epoch(2),
+        print_model_arch=False,
+    )
+    executor.train()
+
+    # Each process iterates over half of the data, and metrics are computed
+    # over the global batches for two epochs.
+    accuracy = executor.train_metrics["accuracy"]
+    assert isinstance(accuracy, metric.Accuracy)
+    assert accuracy.count == 400
+    params = torch.cat([p.detach().flatten() for p in model.parameters()])
+    all_params = [torch.zeros_like(params) for _ in range(world_size)]
+    dist.all_gather(all_params, params)
+    assert all(torch.equal(params, p) for p in all_params)
+
+    executor.load()
+    dist.destroy_process_group()
+
+
 class ExecutorTest(unittest.TestCase):
     def _create_dataset(self, n_examples: int):
         data = torch.randint(self.vocab_size, size=(n_examples, 20))
@@ -113,6 +166,166 @@ class ExecutorTest(unittest.TestCase):
         executor.train()
         executor.test()
 
+    def test_async_save(self):
+        executor = Executor(
+            model=self.model,
+            train_data=self.datasets["train"],
+            valid_data=self.datasets["valid"],
+            checkpoint_dir=self.checkpoint_dir,
+            max_to_keep=2,
+            async_save=True,
+            save_every=cond.epoch(),
+            train_metrics=[("loss", metric.RunningAverage(20))],
+            optimizer={"type": torch.optim.Adam, "kwargs": {}},
+            stop_training_on=cond.epoch(3),
+            valid_metrics=[metric.Accuracy(pred_name="preds")],
+            validate_every=[cond.epoch()],
+            print_model_arch=False,
+        )
+        executor.train()
+
+        checkpoints = [name for name in os.listdir(self.checkpoint_dir)
+                       if name.endswith(".pt")]
+        self.assertEqual(len(checkpoints), 2)
+        self.assertFalse(any(name.endswith(".tmp")
+                             for name in os.listdir(self.checkpoint_dir)))
+
+        # The latest checkpoint should contain the final weights.
+        latest = max(checkpoints, key=lambda name: float(name[:-3]))
+        state = torch.load(os.path.join(self.checkpoint_dir, latest))
+        for name, param in self.model.state_dict().items():
+            self.assertTrue(torch.equal(param, state.model[name]))
+
+    def test_async_validation(self):
+        executor = Executor(
+            model=self.model,
+            train_data=self.datasets["train"],
+            valid_data=self.datasets["valid"],
+            checkpoint_dir=self.checkpoint_dir,
+            save_every=cond.validation(better=True),
+            train_metrics=[("loss", metric.RunningAverage(20))],
+            optimizer={"type": torch.optim.Adam, "kwargs": {}},
+            stop_training_on=cond.epoch(2),
+            valid_metrics=[("accuracy", metric.Accuracy(pred_name="preds"))],
+            validate_every=[cond.epoch()],
+            async_validation=True,
+            print_model_arch=False,
+        )
+        valid_iterations = []
+
+        @executor.on_event(cond.Event.Validation, 'end')
+        def record_iteration(executor):
+            valid_iterations.append(executor.status["valid_iteration"])
+
+        executor.train()
+
+        # Validations are triggered at the end of each epoch (20 iterations),
+        # and the last one is delivered before training ends.
+        self.assertEqual(valid_iterations, [20, 40])
+        self.assertEqual(executor.valid_metrics["accuracy"].count, 50)
+        self.assertIsNot(executor._valid_model, self.model)
+        checkpoints = [name for name in os.listdir(self.checkpoint_dir)
+                       if name.endswith(".pt")]
+        self.assertGreater(len(checkpoints), 0)
+        # Checkpoints saved upon delivery only contain the validated weights,
+        # and the status of the validated iteration.
+        with open(os.path.join(self.checkpoint_dir,
+                               Executor._CHECKPOINT_METAINFO_FILE), "rb") as f:
+            meta_dict = pickle.load(f)
+        for name in checkpoints:
+            state = torch.load(os.path.join(self.checkpoint_dir, name))
+            self.assertNotIsInstance(state, SavedTrainingState)
+            status = meta_dict[name]["status"]
+            self.assertIn(status["iteration"], valid_iterations)
+            self.assertEqual(status["valid_iteration"], status["iteration"])
+
+    def test_mixed_precision(self):
+        precisions = ["bf16"]
+        if torch.cuda.is_available():
+            precisions.append("fp16")
+        for precision in precisions:
+            executor = Executor(
+                model=self.model,
+                train_data=self.datasets["train"],
+                valid_data=self.datasets["valid"],
+                checkpoint_dir=os.path.join(self.checkpoint_dir, precision),
+                save_every=cond.epoch(),
+                train_metrics=[("loss", metric.RunningAverage(20))],
+                optimizer={"type": torch.optim.Adam, "kwargs": {}},
+                num_iters_per_update=2,
+                grad_clip=1.0,
+                precision=precision,
+                stop_training_on=cond.epoch(2),
+                valid_metrics=[metric.Accuracy(pred_name="preds")],
+                validate_every=[cond.epoch()],
+                print_model_arch=False,
+            )
+            executor.train()
+
+            # The scaler state should be restored from the checkpoint.
+            if precision == "fp16":
+                scale = executor._grad_scaler.get_scale()
+                executor._grad_scaler.update(scale * 2)
+            executor.load()
+            if precision == "fp16":
+                self.assertEqual(executor._grad_scaler.get_scale(), scale)
+
+        with self.assertRaises(ValueError):
+            Executor(model=self.model, precision="fp8")
+        if not torch.cuda.is_available():
+            with self.assertRaises(ValueError):
+                Executor(model=self.model, precision="fp16")
+
+    def test_profiler(self):
+        trace_path = os.path.join(self.checkpoint_dir, "trace.json")
+        executor = Executor(
+            model=self.model,
+            train_data=self.datasets["train"],
+            valid_data=self.datasets["valid"],
+            train_metrics=[("loss", metric.RunningAverage(20))],
+            optimizer={"type": torch.optim.Adam, "kwargs": {}},
+            stop_training_on=cond.epoch(2),
+            valid_metrics=[metric.Accuracy(pred_name="preds")],
+            validate_every=[cond.epoch()],
+            log_every=cond.iteration(10),
+            log_format="{iteration:3d}: data={t_data:.1f}ms, "
+                       "fwd={t_fwd:.1f}ms/{t_fwd_p90:.1f}ms",
+            profile=True,
+            trace_path=trace_path,
+            trace_iterations=(2, 5),
+            print_model_arch=False,
+        )
+        executor.train()
+
+        for phase in ["data", "fwd", "bwd", "opt", "iter", "valid"]:
+            self.assertGreater(executor.profiler.percentile(phase, 50), 0.0)
+        # The end of data in each epoch is not recorded as an iteration.
+        for phase in ["data", "iter"]:
+            self.assertEqual(len(executor.profiler._durations[phase]), 40)
+        with open(trace_path) as f:
+            trace = json.load(f)
+        iterations = [event for event in trace["traceEvents"]
+                      if event["name"] == "iter"]
+        self.assertEqual(len(iterations), 3)
+
+        with self.assertRaises(ValueError):
+            Executor(model=self.model, trace_path=trace_path)
+
+    @unittest.skipUnless(dist.is_available(), "Distributed is not available")
+    def test_distributed(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        world_size = 2
+        mp.spawn(_train_distributed,
+                 args=(world_size, port, self.checkpoint_dir),
+                 nprocs=world_size)
+
+        # Only the main process should write checkpoints.
+        checkpoints = [name for name in os.listdir(self.checkpoint_dir)
+                       if name.endswith(".pt")]
+        self.assertEqual(len(checkpoints), 2)
+
     def test_tbx_logging(self):
         executor = Executor(
             model=self.model,
@@ -15,12 +15,17 @@
 Utility functions for the Executor module.
 """
 
+import contextlib
 import functools
+import json
+import os
+import queue
+import threading
 import time
-from collections import Counter, OrderedDict
+from collections import Counter, OrderedDict, defaultdict, deque
 from typing import (
-    Any, Callable, Counter as CounterType, Dict, Iterator, List, NamedTuple,
-    Optional, Tuple, Type, TypeVar, Union, Mapping, Sequence)
+    Any, Callable, Counter as CounterType, Deque, Dict, Iterator, List,
+    NamedTuple, Optional, Tuple, Type, TypeVar, Union, Mapping, Sequence)
 
 from mypy_extensions import TypedDict
 import torch
@@ -40,8 +45,11 @@ __all__ = [
     "to_instance",
     "SavedTrainingState",
     "TrainingStatus",
+    "CheckpointWriter",
+    "snapshot_state",
     "CheckpointMetaInfo",
     "ProgressTracker",
+    "Profiler",
     "ExecutorTerminateSignal",
     "MetricList",
     "update_metrics",
@@ -153,11 +161,16 @@ class SavedTrainingState(NamedTuple):
     system_rng: Any
     numpy_rng: Any
     torch_rng: Any
+    # Defaults to `None` so that checkpoints saved before mixed precision
+    # support can still be loaded.
+    grad_scaler: Optional[Dict[str, Any]] = None
 
 
 class TrainingStatus(TypedDict):
     epoch: int
     iteration: int
+    data_wait_time: float
+    valid_iteration: int
     split: str
     metric: 'OrderedDict[str, Metric]'
     eval_metric: 'OrderedDict[str, Metric]'
@@ -168,6 +181,95 @@ class CheckpointMetaInfo(TypedDict):
     timestamp: float
 
 
+def snapshot_state(state: T) -> T:
+    r"""Copy all tensors in a (nested) state to CPU memory, so that the copy is
+    not affected by later in-place updates, e.g., optimizer steps. Dictionaries,
+    lists, and tuples (including named tuples) are traversed, and other objects
+    are returned as is.
+
+    CUDA tensors are copied asynchronously into pinned memory. The copies are
+    only complete after :meth:`torch.cuda.synchronize` is called, or a CUDA
+    event recorded after this function returns completes.
+
+    Args:
+        state: The state to copy, e.g., the return value of
+            :meth:`torch.nn.Module.state_dict`.
+
+    Returns:
+        The copied state, of the same structure as :attr:`state`.
+    """
+    if isinstance(state, torch.Tensor):
+        tensor = state.detach()
+        if tensor.is_cuda:
+            copy = torch.empty(
+                tensor.size(), dtype=tensor.dtype, pin_memory=True)
+            copy.copy_(tensor, non_blocking=True)
+            return copy
+        return tensor.clone()
+    if isinstance(state, dict):
+        new_dict = type(state)()
+        for key, value in state.items():
+            new_dict[key] = snapshot_state(value)
+        # `state_dict`s store versions of modules in the `_metadata` attribute.
+        if hasattr(state, '_metadata'):
+            new_dict._metadata = state._metadata.copy()  # type: ignore
+        return new_dict
+    if isinstance(state, list):
+        return [snapshot_state(value) for value in state]  # type: ignore
+    if isinstance(state, tuple):
+        values = [snapshot_state(value) for value in state]
+        if hasattr(state, '_fields'):  # named tuple
+            return type(state)(*values)
+        return type(state)(values)
+    return state
+
+
+class CheckpointWriter:
+    r"""Runs checkpoint saving jobs sequentially in a background thread. The
+    thread is started when the first job is submitted.
+
+    Exceptions raised in jobs are re-raised in the calling thread on the next
+    call to :meth:`submit` or :meth:`wait`.
+    """
+
+    def __init__(self):
+        self._queue: 'queue.Queue[Callable[[], None]]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._exception: Optional[BaseException] = None
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                job()
+            except BaseException as e:  # pylint: disable=broad-except
+                if self._exception is None:
+                    self._exception = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_exception(self) -> None:
+        if self._exception is not None:
+            exception, self._exception = self._exception, None
+            raise exception
+
+    def submit(self, job: Callable[[], None]) -> None:
+        r"""Submit a job to run in the background thread, after all previously
+        submitted jobs.
+        """
+        self._raise_exception()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+        self._queue.put(job)
+
+    def wait(self) -> None:
+        r"""Block until all submitted jobs are finished.
+        """
+        self._queue.join()
+        self._raise_exception()
+
+
 class ProgressTracker:
     start_time: float
     size: Optional[int]
@@ -223,6 +325,18 @@ class ProgressTracker:
     def add(self, n_examples: int):
         self.n_examples += n_examples
 
+    def record(self, n_examples: int, time_elapsed: float):
+        r"""Reset the tracker to the progress of work performed elsewhere,
+        e.g., validation in a background thread.
+
+        Args:
+            n_examples: The number of processed examples.
+            time_elapsed: The time spent processing the examples, in seconds.
+        """
+        self.reset()
+        self.n_examples = n_examples
+        self.accumulated_time = time_elapsed
+
     def progress(self) -> Optional[float]:
         if self.size is None:
             return None
@@ -241,6 +355,88 @@ class ProgressTracker:
             return f"0.00ex/s"
 
 
+class Profiler:
+    r"""Records the wall-clock time spent in named phases, e.g., the forward
+    pass of each training iteration. Durations of the most recent
+    :attr:`window_size` occurrences of each phase are kept to compute rolling
+    percentiles.
+
+    While :attr:`tracing` is `True`, each occurrence is also recorded as an
+    event in the Chrome trace event format, which can be viewed in
+    ``chrome://tracing`` or Perfetto.
+
+    Occurrences that end with an exception, e.g., fetching data when the data
+    iterator is exhausted, are not recorded.
+
+    Args:
+        window_size: The number of recent durations kept for each phase.
+        synchronize: If `True`, CUDA devices are synchronized at the start and
+            end of each phase, so that the time of asynchronous CUDA kernels
+            is attributed to the phase that launched them.
+    """
+
+    def __init__(self, window_size: int = 100, synchronize: bool = False):
+        self.window_size = window_size
+        self.synchronize = synchronize
+        self.tracing = False
+        self.record_functions = False
+        self.trace_events: List[Dict[str, Any]] = []
+        self._durations: Dict[str, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=self.window_size))
+        self._start_time = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        r"""Returns a context manager that records the time spent in the
+        context as an occurrence of phase :attr:`name`.
+        """
+        if self.synchronize:
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        if self.record_functions:
+            # Annotate the phase in traces of the PyTorch profiler.
+            with torch.profiler.record_function(name):  # type: ignore
+                yield
+        else:
+            yield
+        if self.synchronize:
+            torch.cuda.synchronize()
+        end = time.perf_counter()
+        self._durations[name].append(end - start)
+        if self.tracing:
+            self.trace_events.append({
+                "name": name, "ph": "X", "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "ts": (start - self._start_time) * 1e6,
+                "dur": (end - start) * 1e6,
+            })
+
+    @property
+    def phases(self) -> List[str]:
+        r"""Names of all recorded phases."""
+        return list(self._durations.keys())
+
+    def percentile(self, name: str, q: float) -> float:
+        r"""Compute the :attr:`q`-th percentile of recent durations of phase
+        :attr:`name`, in milliseconds. Returns `NaN` if the phase has not been
+        recorded.
+        """
+        durations = sorted(self._durations.get(name, ()))
+        if len(durations) == 0:
+            return float("nan")
+        index = min(len(durations) - 1, int(len(durations) * q / 100))
+        return durations[index] * 1000
+
+    def write_chrome_trace(self, path: str) -> None:
+        r"""Write recorded trace events to a JSON file in the Chrome trace
+        format, and clear the recorded events.
+        """
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace_events,
+                       "displayTimeUnit": "ms"}, f)
+        self.trace_events = []
+
+
 class ExecutorTerminateSignal(Exception):
     pass
 
@@ -294,8 +490,58 @@ class MetricList:
         return False
 
 
+def _all_gather_values(values: List[Any]) -> List[Any]:
+    r"""Gather a list of metric inputs (lists or tensors) from all processes,
+    and concatenate them along the batch dimension.
+
+    Tensors are summed with ``all_reduce`` into zero-filled buffers, where
+    each process fills in its own slice. This avoids pickling tensors, which
+    is required by ``all_gather_object``. Lists are still gathered as objects.
+    """
+    world_size = torch.distributed.get_world_size()
+    rank = torch.distributed.get_rank()
+    results = list(values)
+
+    tensor_idx = [idx for idx, val in enumerate(values)
+                  if isinstance(val, torch.Tensor)]
+    if len(tensor_idx) > 0:
+        # NCCL only supports collectives on GPU tensors.
+        if torch.distributed.get_backend() == "nccl":
+            device = torch.device("cuda")
+        else:
+            device = torch.device("cpu")
+        sizes = torch.zeros(
+            world_size, len(tensor_idx), dtype=torch.long, device=device)
+        sizes[rank] = torch.tensor([values[idx].size(0) for idx in tensor_idx])
+        torch.distributed.all_reduce(sizes)
+        for idx, val_sizes in zip(tensor_idx, sizes.t().tolist()):
+            val = values[idx].to(device=device)
+            offset = sum(val_sizes[:rank])
+            buffer = val.new_zeros((sum(val_sizes),) + val.size()[1:])
+            buffer[offset:(offset + val.size(0))] = val
+            torch.distributed.all_reduce(buffer)
+            results[idx] = buffer
+
+    list_idx = [idx for idx, val in enumerate(values) if isinstance(val, list)]
+    if len(list_idx) > 0:
+        gathered: List[Any] = [None] * world_size
+        torch.distributed.all_gather_object(
+            gathered, [values[idx] for idx in list_idx])
+        for pos, idx in enumerate(list_idx):
+            results[idx] = [x for vals in gathered for x in vals[pos]]
+    return results
+
+
 def update_metrics(return_dict: Dict[str, Any], batch: Batch,
-                   metrics: 'OrderedDict[str, Metric]') -> None:
+                   metrics: 'OrderedDict[str, Metric]',
+                   distributed: bool = False) -> None:
+    r"""Add predicted values and labels to each metric.
+
+    If :attr:`distributed` is `True`, the values are gathered from all
+    processes before being added, so that metrics are computed over the global
+    batch. This must be called by all processes.
+    """
+    metric_inputs: List[Any] = []
     for metric_name, metric in metrics.items():
         if metric.pred_name is not None:
             try:
@@ -305,9 +551,6 @@ def update_metrics(return_dict: Dict[str, Any], batch: Batch,
                     f"Return dictionary from model does not contain "
                     f"'{metric.pred_name}' entry, which was required for "
                     f"metric '{metric_name}'")
-            if isinstance(pred_val, torch.Tensor):
-                pred_val = pred_val.tolist()
-            pred_val = to_list(pred_val)
         else:
             pred_val = None
         if metric.label_name is not None:
@@ -317,12 +560,32 @@ def update_metrics(return_dict: Dict[str, Any], batch: Batch,
                 raise ValueError(
                     f"Data batch does not contain '{metric.label_name}' "
                     f"entry, which was required for metric '{metric_name}'")
-            if isinstance(label_val, torch.Tensor):
-                label_val = label_val.tolist()
-            label_val = to_list(label_val)
         else:
             label_val = None
-        metric.add(pred_val, label_val)
+        # Tensors are passed as is only if all required values are tensors.
+        pass_tensors = metric.accepts_tensors and all(
+            isinstance(val, torch.Tensor)
+            for val in [pred_val, label_val] if val is not None)
+        if pass_tensors:
+            # Mirror the behavior of `to_list` for scalars.
+            if pred_val is not None and pred_val.dim() == 0:
+                pred_val = pred_val.unsqueeze(0)
+            if label_val is not None and label_val.dim() == 0:
+                label_val = label_val.unsqueeze(0)
+        else:
+            if isinstance(pred_val, torch.Tensor):
+                pred_val = pred_val.tolist()
+            if isinstance(label_val, torch.Tensor):
+                label_val = label_val.tolist()
+            if metric.pred_name is not None:
+                pred_val = to_list(pred_val)
+            if metric.label_name is not None:
+                label_val = to_list(label_val)
+        metric_inputs.extend([pred_val, label_val])
+    if distributed:
+        metric_inputs = _all_gather_values(metric_inputs)
+    for idx, metric in enumerate(metrics.values()):
+        metric.add(metric_inputs[2 * idx], metric_inputs[2 * idx + 1])
 
 
 CLEAR_LINE = '\033[2K\r'
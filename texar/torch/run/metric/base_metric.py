@@ -42,6 +42,11 @@ class Metric(Generic[Input, Value], ABC):
       the metric value. Defaults to `True`.
     - :attr:`requires_label`: If `True`, labels are required to compute the
       metric value. Defaults to `True`.
+    - :attr:`accepts_tensors`: If `True`, the metric can accumulate PyTorch
+      tensors directly. When the predicted values (and labels, if required)
+      are tensors, they are passed to :meth:`add` as is, instead of being
+      converted to Python lists. This avoids transferring values to the CPU
+      for every batch. Defaults to `False`.
 
     Keyword Args:
         pred_name (str, optional): Name of the predicted value. This will be
@@ -56,6 +61,7 @@ class Metric(Generic[Input, Value], ABC):
     higher_is_better: bool = True
     requires_pred: bool = True
     requires_label: bool = True
+    accepts_tensors: bool = False
 
     def __init__(self, *, pred_name: Optional[str],
                  label_name: Optional[str] = "label",
@@ -194,6 +200,10 @@ class StreamingMetric(Metric[Input, Value], ABC):
 
     The default implementation of :meth:`add` only keeps track of the number of
     data points added. You should override this method.
+
+    Streaming metrics are good candidates for accepting tensors (see
+    :attr:`accepts_tensors`), since their states can be accumulated on the
+    tensor's device, and only converted to Python values in :meth:`value`.
     """
     count: int
 
@@ -16,11 +16,13 @@ Executor metrics for classification tasks.
 """
 
 from abc import ABC
-from typing import Dict, List, Optional, Sequence, Tuple, TypeVar
+from typing import Dict, List, Optional, Sequence, Tuple, TypeVar, Union
 
 import numpy as np
+import torch
 
 from texar.torch.run.metric.base_metric import StreamingMetric
+from texar.torch.utils.dtypes import torch_bool
 
 __all__ = [
     "Accuracy",
@@ -41,7 +43,9 @@ class Accuracy(StreamingMetric[Input, float]):
 
     Accuracy is a :class:`~texar.torch.run.metric.StreamingMetric`, requires
     both predicted values and labels. Accuracy values are :class:`float`
-    numbers between 0 and 1, with higher values being better.
+    numbers between 0 and 1, with higher values being better. Tensors are
+    accepted, in which case the number of correct predictions is accumulated
+    on the tensor's device.
 
     Keyword Args:
         pred_name (str): Name of the predicted value. This will be used as the
@@ -49,7 +53,9 @@ class Accuracy(StreamingMetric[Input, float]):
         label_name (str): Name of the label. This will be used as the key to the
             batch object returned by the dataset. Defaults to ``"label"``.
     """
-    correct: int
+    accepts_tensors = True
+
+    correct: Union[int, torch.Tensor]
 
     def reset(self) -> None:
         super().reset()
@@ -57,20 +63,37 @@ class Accuracy(StreamingMetric[Input, float]):
 
     def add(self, predicted: Sequence[Input], labels: Sequence[Input]) -> None:
         super().add(predicted, labels)
+        if (isinstance(predicted, torch.Tensor) and
+                isinstance(labels, torch.Tensor) and
+                predicted.size() == labels.size()):
+            matches = predicted.detach() == labels.to(device=predicted.device)
+            if matches.dim() > 1:
+                # Each example is correct only if all its values match.
+                matches = matches.flatten(1).all(dim=1)
+            self.correct = self.correct + matches.sum()
+            return
+        if isinstance(predicted, torch.Tensor):
+            predicted = predicted.tolist()
+        if isinstance(labels, torch.Tensor):
+            labels = labels.tolist()
         self.correct += sum(int(a == b) for a, b in zip(predicted, labels))
 
     def value(self) -> float:
         if self.count == 0:
             return 0.0
-        return self.correct / self.count
+        return int(self.correct) / self.count
 
 
 class _ConfusionMatrix(StreamingMetric[Input, Value], ABC):
+    accepts_tensors = True
+
     count: int
     matrix: Optional[np.ndarray]  # matrix[pred][label]
     pred_count: List[int]
     label_count: List[int]
     _class_id: Dict[Input, int]
+    # Tensor inputs not yet added to the matrix, as `(predicted, labels)`.
+    _pending: List[Tuple[torch.Tensor, torch.Tensor]]
 
     def reset(self) -> None:
         super().reset()
@@ -78,6 +101,7 @@ class _ConfusionMatrix(StreamingMetric[Input, Value], ABC):
         self.pred_count = []
         self.label_count = []
         self._class_id = {}
+        self._pending = []
 
     def _convert_ids(self, classes: Sequence[Input]) -> List[int]:
         ids = []
@@ -98,6 +122,22 @@ class _ConfusionMatrix(StreamingMetric[Input, Value], ABC):
 
     def add(self, predicted: Sequence[Input], labels: Sequence[Input]) -> None:
         super().add(predicted, labels)
+        if (isinstance(predicted, torch.Tensor) and
+                isinstance(labels, torch.Tensor) and
+                predicted.dim() == 1 and predicted.size() == labels.size() and
+                not predicted.is_floating_point() and
+                not labels.is_floating_point()):
+            # Counting is deferred until the value is requested, so that no
+            # device synchronization is required here.
+            self._pending.append(
+                (predicted.detach(), labels.to(device=predicted.device)))
+            return
+        if isinstance(predicted, torch.Tensor):
+            predicted = predicted.tolist()
+        if isinstance(labels, torch.Tensor):
+            labels = labels.tolist()
+        # Pending tensors are added first to preserve the order of class IDs.
+        self._add_pending()
         predicted = self._convert_ids(predicted)
         labels = self._convert_ids(labels)
         assert self.matrix is not None
@@ -106,6 +146,59 @@ class _ConfusionMatrix(StreamingMetric[Input, Value], ABC):
             self.pred_count[pred] += 1
             self.label_count[label] += 1
 
+    def _add_pending(self) -> None:
+        r"""Add pending tensor inputs to the confusion matrix. Values are
+        compacted on the tensor's device, so that only distinct classes and
+        distinct `(pred, label)` pairs are transferred. New classes are
+        assigned IDs in order of first appearance, as for list inputs.
+        """
+        if len(self._pending) == 0:
+            return
+        device = self._pending[0][0].device
+        # Classes are seen in the same order as in the list path: predicted
+        # values of each batch, followed by its labels.
+        tensors = [tensor.to(device=device, dtype=torch.long)
+                   for batch in self._pending for tensor in batch]
+        self._pending = []
+        values = torch.cat(tensors)
+        classes, inverse = torch.unique(values, return_inverse=True)
+        num_classes = classes.size(0)
+
+        # Position of the first appearance of each class: sort positions by
+        # class, and take the first position of each class.
+        positions = torch.arange(values.size(0), device=device)
+        order = torch.sort(inverse * values.size(0) + positions)[1]
+        sorted_inverse = inverse[order]
+        is_first = torch.ones_like(sorted_inverse, dtype=torch_bool)
+        is_first[1:] = sorted_inverse[1:] != sorted_inverse[:-1]
+        first_positions = order[is_first]
+
+        # Count each distinct `(pred, label)` pair.
+        chunks = torch.split(inverse, [tensor.size(0) for tensor in tensors])
+        pred_classes = torch.cat(chunks[0::2])
+        label_classes = torch.cat(chunks[1::2])
+        pairs, pair_counts = torch.unique(
+            pred_classes * num_classes + label_classes, return_counts=True)
+
+        class_values = classes.cpu().numpy()
+        first_order = np.argsort(first_positions.cpu().numpy(), kind='stable')
+        class_ids = np.empty(num_classes, dtype=np.int64)
+        class_ids[first_order] = self._convert_ids(
+            class_values[first_order].tolist())
+        pairs = pairs.cpu().numpy()
+        pair_counts = pair_counts.cpu().numpy()
+        pred_ids = class_ids[pairs // num_classes]
+        label_ids = class_ids[pairs % num_classes]
+        assert self.matrix is not None
+        np.add.at(self.matrix, (pred_ids, label_ids), pair_counts)
+        num_ids = len(self.pred_count)
+        self.pred_count = (np.asarray(self.pred_count) + np.bincount(
+            pred_ids, pair_counts, minlength=num_ids).astype(np.int64)
+                           ).tolist()
+        self.label_count = (np.asarray(self.label_count) + np.bincount(
+            label_ids, pair_counts, minlength=num_ids).astype(np.int64)
+                            ).tolist()
+
 
 class ConfusionMatrix(_ConfusionMatrix[Input, Optional[np.ndarray]]):
     r"""The confusion matrix is an evaluation metric for classification tasks.
@@ -117,7 +210,9 @@ class ConfusionMatrix(_ConfusionMatrix[Input, Optional[np.ndarray]]):
 
     The value indexed at ``(i, j)`` of the confusion matrix is the number of
     data points whose predicted label is `i` and whose ground truth label is
-    `j`. Labels are internally mapped to indices.
+    `j`. Labels are internally mapped to indices. When integer tensors are
+    added, they are counted on the tensor's device when the value is
+    requested.
 
     Keyword Args:
         pred_name (str): Name of the predicted value. This will be used as the
@@ -127,12 +222,14 @@ class ConfusionMatrix(_ConfusionMatrix[Input, Optional[np.ndarray]]):
     """
 
     def value(self) -> Optional[np.ndarray]:
+        self._add_pending()
         return self.matrix
 
     @property
     def class_id(self):
         r"""Mapping of predicted values and labels to indices within the matrix.
         """
+        self._add_pending()
         return self._class_id
 
     def better(self, cur: Value, prev: Value) -> Optional[bool]:
@@ -211,6 +308,7 @@ class _MicroMacro(_ConfusionMatrix[Input, float], ABC):
     def value(self) -> float:
         if self.count == 0:
             return 0.0
+        self._add_pending()
         numerator, denominator = self._value()
         value = self._safe_divide(numerator, denominator)
         if self.mode == 'macro':
@@ -2,6 +2,7 @@ import functools
 import unittest
 
 import numpy as np
+import torch
 
 from texar.torch.run.executor import make_deterministic
 from texar.torch.run.metric.classification import *
@@ -58,3 +59,72 @@ class ClassificationMetricTest(unittest.TestCase):
             self._test_metric(
                 metric, functools.partial(f1_score, average=mode),
                 binary=(mode == 'binary'))
+
+
+class TensorClassificationMetricTest(unittest.TestCase):
+    def setUp(self) -> None:
+        make_deterministic(0)
+        self.n_classes = 10
+        self.n_examples = 300
+        self.batch_size = 16
+        self.labels = np.random.randint(self.n_classes, size=self.n_examples)
+        self.guesses = np.random.randint(self.n_classes, size=self.n_examples)
+
+    def _test_tensor_inputs(self, metric_fn, binary=False):
+        labels, guesses = self.labels, self.guesses
+        if binary:
+            labels, guesses = labels % 2, guesses % 2
+        list_metric = metric_fn()
+        tensor_metric = metric_fn()
+        for idx in range(0, self.n_examples, self.batch_size):
+            end_idx = idx + self.batch_size
+            list_metric.add(guesses[idx:end_idx].tolist(),
+                            labels[idx:end_idx].tolist())
+            tensor_metric.add(torch.from_numpy(guesses[idx:end_idx]),
+                              torch.from_numpy(labels[idx:end_idx]))
+            if idx % (self.batch_size * 4) == 0:
+                self.assertAlmostEqual(
+                    tensor_metric.value(), list_metric.value())
+        self.assertAlmostEqual(tensor_metric.value(), list_metric.value())
+
+    def test_accuracy(self):
+        self._test_tensor_inputs(lambda: Accuracy(pred_name=""))
+
+        metric = Accuracy(pred_name="")
+        metric.add(torch.tensor([[1, 2], [3, 4], [5, 6]]),
+                   torch.tensor([[1, 2], [3, 5], [5, 6]]))
+        self.assertAlmostEqual(metric.value(), 2 / 3)
+
+    def test_confusion_matrix(self):
+        list_metric = ConfusionMatrix(pred_name="")
+        tensor_metric = ConfusionMatrix(pred_name="")
+        list_metric.add(self.guesses.tolist(), self.labels.tolist())
+        tensor_metric.add(torch.from_numpy(self.guesses[:100]),
+                          torch.from_numpy(self.labels[:100]))
+        tensor_metric.add(self.guesses[100:200].tolist(),
+                          self.labels[100:200].tolist())
+        tensor_metric.add(torch.from_numpy(self.guesses[200:]),
+                          torch.from_numpy(self.labels[200:]))
+        # Class IDs are assigned in the same order for both kinds of inputs.
+        self.assertEqual(tensor_metric.class_id, list_metric.class_id)
+        np.testing.assert_array_equal(
+            tensor_metric.value(), list_metric.value())
+
+        # Sparse and negative class values.
+        guesses = self.guesses * 10007 - 3
+        labels = self.labels * 10007 - 3
+        list_metric = ConfusionMatrix(pred_name="")
+        tensor_metric = ConfusionMatrix(pred_name="")
+        list_metric.add(guesses.tolist(), labels.tolist())
+        tensor_metric.add(torch.from_numpy(guesses),
+                          torch.from_numpy(labels))
+        self.assertEqual(tensor_metric.class_id, list_metric.class_id)
+        np.testing.assert_array_equal(
+            tensor_metric.value(), list_metric.value())
+
+    def test_micro_macro(self):
+        for metric_class in [Precision, Recall, F1]:
+            for mode in metric_class._valid_modes:
+                self._test_tensor_inputs(
+                    lambda: metric_class(mode=mode, pos_label=1, pred_name=""),
+                    binary=(mode == 'binary'))
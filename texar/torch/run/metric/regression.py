@@ -16,7 +16,9 @@ Executor metrics for regression tasks.
 """
 
 import math
-from typing import Sequence
+from typing import Sequence, Tuple, Union
+
+import torch
 
 from texar.torch.run.metric.base_metric import StreamingMetric
 
@@ -25,6 +27,19 @@ __all__ = [
     "RMSE",
 ]
 
+Float = Union[float, torch.Tensor]
+
+
+def _is_tensor_batch(xs: Sequence[float], ys: Sequence[float]) -> bool:
+    return (isinstance(xs, torch.Tensor) and isinstance(ys, torch.Tensor) and
+            xs.dim() == 1 and xs.size() == ys.size())
+
+
+def _to_double(xs: torch.Tensor, ys: torch.Tensor) \
+        -> Tuple[torch.Tensor, torch.Tensor]:
+    xs = xs.detach().double()
+    return xs, ys.detach().to(device=xs.device, dtype=torch.double)
+
 
 class PearsonR(StreamingMetric[float, float]):
     r"""The Pearson correlation coefficient (Pearson's r) metric for evaluation
@@ -35,7 +50,8 @@ class PearsonR(StreamingMetric[float, float]):
 
     Pearson's r is a :class:`~texar.torch.run.metric.StreamingMetric`, requires
     both predicted values and labels. Pearson's r values are :class:`float`
-    numbers between -1 and 1, with higher values being better.
+    numbers between -1 and 1, with higher values being better. Tensors are
+    accepted, in which case the sums are accumulated on the tensor's device.
 
     Keyword Args:
         pred_name (str): Name of the predicted value. This will be used as the
@@ -43,11 +59,13 @@ class PearsonR(StreamingMetric[float, float]):
         label_name (str): Name of the label. This will be used as the key to the
             batch object returned by the dataset. Defaults to ``"label"``.
     """
-    x_sum: float
-    x2_sum: float
-    y_sum: float
-    y2_sum: float
-    xy_sum: float
+    accepts_tensors = True
+
+    x_sum: Float
+    x2_sum: Float
+    y_sum: Float
+    y2_sum: Float
+    xy_sum: Float
 
     def reset(self) -> None:
         super().reset()
@@ -57,6 +75,18 @@ class PearsonR(StreamingMetric[float, float]):
 
     def add(self, xs: Sequence[float], ys: Sequence[float]):
         super().add(xs, ys)
+        if _is_tensor_batch(xs, ys):
+            xs, ys = _to_double(xs, ys)  # type: ignore
+            self.x_sum = self.x_sum + xs.sum()
+            self.x2_sum = self.x2_sum + (xs * xs).sum()
+            self.y_sum = self.y_sum + ys.sum()
+            self.y2_sum = self.y2_sum + (ys * ys).sum()
+            self.xy_sum = self.xy_sum + (xs * ys).sum()
+            return
+        if isinstance(xs, torch.Tensor):
+            xs = xs.tolist()
+        if isinstance(ys, torch.Tensor):
+            ys = ys.tolist()
         self.x_sum += sum(xs)
         self.x2_sum += sum(x * x for x in xs)
         self.y_sum += sum(ys)
@@ -66,9 +96,12 @@ class PearsonR(StreamingMetric[float, float]):
     def value(self) -> float:
         if self.count == 0:
             return 0.0
-        numerator = self.xy_sum - self.x_sum * self.y_sum / self.count
-        denominator_x = self.x2_sum - self.x_sum ** 2 / self.count
-        denominator_y = self.y2_sum - self.y_sum ** 2 / self.count
+        x_sum, x2_sum = float(self.x_sum), float(self.x2_sum)
+        y_sum, y2_sum = float(self.y_sum), float(self.y2_sum)
+        xy_sum = float(self.xy_sum)
+        numerator = xy_sum - x_sum * y_sum / self.count
+        denominator_x = x2_sum - x_sum ** 2 / self.count
+        denominator_y = y2_sum - y_sum ** 2 / self.count
         if denominator_x == 0.0 or denominator_y == 0.0:
             return math.nan
         return numerator / math.sqrt(denominator_x * denominator_y)
@@ -81,7 +114,8 @@ class RMSE(StreamingMetric[float, float]):
 
     RMSE is a :class:`~texar.torch.run.metric.StreamingMetric`, requires both
     predicted values and labels. RMSE values are :class:`float` numbers with a
-    lower bound of 0. Lower values are better.
+    lower bound of 0. Lower values are better. Tensors are accepted, in which
+    case the sum of squared errors is accumulated on the tensor's device.
 
     Keyword Args:
         pred_name (str): Name of the predicted value. This will be used as the
@@ -90,8 +124,9 @@ class RMSE(StreamingMetric[float, float]):
             batch object returned by the dataset. Defaults to ``"label"``.
     """
     higher_is_better = False
+    accepts_tensors = True
 
-    squared_sum: float
+    squared_sum: Float
 
     def reset(self) -> None:
         super().reset()
@@ -99,9 +134,17 @@ class RMSE(StreamingMetric[float, float]):
 
     def add(self, predicted: Sequence[float], labels: Sequence[float]) -> None:
         super().add(predicted, labels)
+        if _is_tensor_batch(predicted, labels):
+            xs, ys = _to_double(predicted, labels)  # type: ignore
+            self.squared_sum = self.squared_sum + ((xs - ys) ** 2).sum()
+            return
+        if isinstance(predicted, torch.Tensor):
+            predicted = predicted.tolist()
+        if isinstance(labels, torch.Tensor):
+            labels = labels.tolist()
         self.squared_sum += sum((x - y) ** 2 for x, y in zip(predicted, labels))
 
     def value(self) -> float:
         if self.count == 0:
             return 0.0
-        return math.sqrt(self.squared_sum / self.count)
+        return math.sqrt(float(self.squared_sum) / self.count)
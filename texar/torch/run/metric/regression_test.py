@@ -1,6 +1,7 @@
 import unittest
 
 import numpy as np
+import torch
 
 from texar.torch.run.metric.regression import *
 from texar.torch.utils.test import external_library_test
@@ -21,6 +22,21 @@ class RegressionMetricTest(unittest.TestCase):
             answer = reference_fn(self.labels[:end_idx], self.guesses[:end_idx])
             self.assertAlmostEqual(value, answer)
 
+    def _test_tensor_inputs(self, metric_fn):
+        list_metric = metric_fn()
+        tensor_metric = metric_fn()
+        for idx in range(0, self.n_examples, self.batch_size):
+            end_idx = idx + self.batch_size
+            list_metric.add(self.guesses[idx:end_idx].tolist(),
+                            self.labels[idx:end_idx].tolist())
+            tensor_metric.add(torch.from_numpy(self.guesses[idx:end_idx]),
+                              torch.from_numpy(self.labels[idx:end_idx]))
+            self.assertAlmostEqual(tensor_metric.value(), list_metric.value())
+
+    def test_tensor_inputs(self):
+        self._test_tensor_inputs(lambda: PearsonR(pred_name=""))
+        self._test_tensor_inputs(lambda: RMSE(pred_name=""))
+
     @external_library_test("scipy")
     def test_pearsonr(self):
         from scipy.stats import pearsonr
@@ -16,9 +16,10 @@ Executor metrics for summaries.
 """
 
 from collections import deque
-from typing import Any, Deque, Optional, Sequence
+from typing import Any, Deque, Optional, Sequence, Union
 
 import numpy as np
+import torch
 from torch.optim.optimizer import Optimizer
 
 from texar.torch.run.metric.base_metric import StreamingMetric
@@ -37,6 +38,8 @@ class Average(StreamingMetric[float, float]):
     Average is a :class:`~texar.torch.run.metric.StreamingMetric`, requires only
     predicted values. Average values are unbounded :class:`float` numbers. By
     default, lower values are better, but the behavior can be configured.
+    Tensors are accepted, in which case the sum is accumulated on the tensor's
+    device.
 
     Keyword Args:
         pred_name (str): Name of the predicted value. This will be used as the
@@ -47,8 +50,9 @@ class Average(StreamingMetric[float, float]):
     """
     higher_is_better = False
     requires_label = False
+    accepts_tensors = True
 
-    sum: float
+    sum: Union[float, torch.Tensor]
 
     def __init__(self, *, pred_name: str = "loss",
                  higher_is_better: bool = False):
@@ -60,12 +64,15 @@ class Average(StreamingMetric[float, float]):
 
     def add(self, predicted: Sequence[float], _) -> None:
         self.count += len(predicted)
-        self.sum += sum(predicted)
+        if isinstance(predicted, torch.Tensor):
+            self.sum = self.sum + predicted.detach().double().sum()
+        else:
+            self.sum += sum(predicted)
 
     def value(self) -> float:
         if self.count == 0:
             return 0.0
-        return self.sum / self.count
+        return float(self.sum) / self.count
 
 
 class AveragePerplexity(Average):
@@ -74,7 +81,10 @@ class AveragePerplexity(Average):
     higher_is_better = False
 
     def add(self, predicted: Sequence[float], _) -> None:
-        super().add(np.exp(predicted), _)
+        if isinstance(predicted, torch.Tensor):
+            super().add(torch.exp(predicted.detach().double()), _)
+        else:
+            super().add(np.exp(predicted), _)
 
 
 class RunningAverage(StreamingMetric[float, float]):
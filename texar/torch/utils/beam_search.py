@@ -20,14 +20,17 @@ Implementation of beam search with penalties.
 Adapted from:
     `https://github.com/tensorflow/tensor2tensor/blob/eb048f69c7ea860324122b87cb9caf59c52a27f3/tensor2tensor/utils/beam_search.py`
 """
-from typing import Any, Callable, Optional, Tuple, TypeVar, overload
+from typing import Any, Callable, List, Optional, Tuple, TypeVar, overload
 
+import pkg_resources
 import torch
+from torch import __version__ as _torch_version  # type: ignore
 
 from texar.torch.utils import map_structure, torch_bool
 
 __all__ = [
     'beam_search',
+    'batched_beam_search',
 ]
 
 State = TypeVar('State')
@@ -35,6 +38,10 @@ State = TypeVar('State')
 # Default value for INF
 INF = 1.0 * 1e7
 
+ConstraintFn = Callable[[int, torch.LongTensor, torch.Tensor], torch.Tensor]
+
+_torch_version = pkg_resources.parse_version(_torch_version)
+
 
 def gather_nd(params: Any, indices: torch.Tensor) -> Any:
     if not isinstance(params, torch.Tensor):
@@ -42,6 +49,9 @@ def gather_nd(params: Any, indices: torch.Tensor) -> Any:
     assert len(indices.size()) == 3
     orig_size = params.size()
     index = indices[:, :, 1].view(-1) + indices[:, :, 0].view(-1) * orig_size[1]
+    # `index_select` requires integer indices, but beam indices computed with
+    # `/` are floating-point on newer versions of PyTorch.
+    index = index.long()
     ret = torch.index_select(
         params.view(-1, *params.size()[2:]), dim=0, index=index
     )
@@ -701,3 +711,279 @@ def beam_search(
     return ret_seq, ret_scores
 
 # pylint: enable=function-redefined
+
+
+def _floor_divide(tensor: torch.LongTensor, value: int) -> torch.LongTensor:
+    if _torch_version >= pkg_resources.parse_version("1.8.0"):
+        return torch.div(tensor, value, rounding_mode='floor')  # type: ignore
+    return tensor // value  # type: ignore
+
+
+def _reorder_state(state: Any, index: torch.LongTensor) -> Any:
+    r"""Selects entries along the first dimension of a decoding state.
+    Objects providing a ``reorder_`` method (e.g.,
+    :class:`~texar.torch.modules.encoders.multihead_attention.KVCache`) are
+    reordered in place, other non-tensor values are returned unchanged.
+    """
+    if isinstance(state, torch.Tensor):
+        return state.index_select(0, index)
+    if hasattr(state, 'reorder_'):
+        state.reorder_(index)
+    return state
+
+
+def _min_length_constraint(min_length: int, eos_id: int) -> ConstraintFn:
+    def _constraint(step, _ids, log_probs):
+        if step < min_length:
+            log_probs[:, eos_id] = -INF
+        return log_probs
+
+    return _constraint
+
+
+def _no_repeat_ngram_constraint(ngram_size: int) -> ConstraintFn:
+    def _constraint(_step, ids, log_probs):
+        if ids.size(1) < ngram_size:
+            return log_probs
+        # All n-grams in decoded sequences: [batch, num_ngrams, ngram_size].
+        ngrams = ids.unfold(1, ngram_size, 1)
+        prefix = ids[:, (ids.size(1) - ngram_size + 1):]
+        matched = (ngrams[:, :, :-1] == prefix.unsqueeze(1)).all(dim=2)
+        penalty = torch.zeros_like(log_probs).scatter_add_(
+            1, ngrams[:, :, -1], matched.to(log_probs.dtype) * -INF)
+        return log_probs + penalty
+
+    return _constraint
+
+
+def batched_beam_search(
+        symbols_to_logits_fn: Callable[..., Any],
+        initial_ids: torch.LongTensor,
+        beam_size: int,
+        decode_length: int,
+        vocab_size: int,
+        alpha: float,
+        eos_id: int,
+        states: Optional[State] = None,
+        memory: Optional[Any] = None,
+        stop_early: bool = True,
+        min_length: int = 0,
+        no_repeat_ngram_size: int = 0,
+        constraint_fn: Optional[ConstraintFn] = None) \
+        -> Tuple[torch.LongTensor, torch.Tensor]:
+    r"""Beam search with length penalties. This computes the same results as
+    :func:`beam_search`, but is more efficient:
+
+    - Sequences are written into preallocated buffers, instead of being
+      concatenated and gathered along with the decoding states at each step.
+    - Decoding states are reordered with a single :torch:`index_select` per
+      step. Objects with a ``reorder_`` method, such as
+      :class:`~texar.torch.modules.encoders.multihead_attention.KVCache`,
+      are reordered in place.
+    - The termination condition is checked for each example. Examples whose
+      best sequences are determined are removed from the batch, so later
+      steps only compute over the remaining examples.
+    - :attr:`memory` (e.g., encoder outputs) that is identical across beams
+      is not reordered at each step.
+
+    Since finished examples are removed early, beams other than the first
+    may differ from those of :func:`beam_search` when :attr:`stop_early`
+    is `True`.
+
+    Args:
+        symbols_to_logits_fn: Interface to the model, to provide logits.
+            It is called as ``symbols_to_logits_fn(ids)`` if both
+            :attr:`states` and :attr:`memory` are `None`,
+            ``symbols_to_logits_fn(ids, states)`` if only :attr:`memory` is
+            `None`, or ``symbols_to_logits_fn(ids, states, memory)``
+            otherwise. ``ids`` is the decoded IDs of shape
+            `[batch_size * beam_size, decoded_length]`, where `batch_size` is
+            the number of unfinished examples. The function should return
+            logits of shape `[batch_size * beam_size, vocab_size]`, and the
+            new states if :attr:`states` is given.
+        initial_ids: LongTensor of shape `[batch_size]`. IDs to start off the
+            decoding, this will be the first thing handed to
+            :attr:`symbols_to_logits_fn` (after expanding to beam size).
+        beam_size: Size of the beam.
+        decode_length: Number of steps to decode for.
+        vocab_size: Size of the vocab, must equal the size of the logits
+            returned by :attr:`symbols_to_logits_fn`.
+        alpha: alpha for length penalty.
+        eos_id: ID for end of sentence.
+        states: (possibly nested structure of) decoding states. Tensors of
+            shape `[batch_size, ...]` are expanded to beam size; other
+            objects must already hold `batch_size * beam_size` entries.
+        memory: (possibly nested structure of) tensors of shape
+            `[batch_size, ...]` that do not change during decoding. They are
+            expanded to beam size, and only reduced when examples finish.
+        stop_early: a boolean - stop once best sequence is provably
+            determined.
+        min_length: `EOS` is not generated within the first
+            :attr:`min_length` steps.
+        no_repeat_ngram_size: If positive, n-grams of this size are not
+            generated more than once in each sequence.
+        constraint_fn: An optional function called as
+            ``constraint_fn(step, ids, log_probs)`` to modify the
+            log-probabilities of shape `[batch_size * beam_size, vocab_size]`
+            at each step, e.g., to prohibit certain tokens. Prohibited tokens
+            should be set to a large negative value.
+
+    Returns:
+        Tuple of
+
+        - decoded beams (shape: `[batch_size, beam_size, decode_length]`)
+        - decoding probabilities (shape: `[batch_size, beam_size]`)
+    """
+    batch_size = initial_ids.size(0)
+    device = initial_ids.device
+
+    constraints: List[ConstraintFn] = []
+    if min_length > 0:
+        constraints.append(_min_length_constraint(min_length, eos_id))
+    if no_repeat_ngram_size > 0:
+        constraints.append(_no_repeat_ngram_constraint(no_repeat_ngram_size))
+    if constraint_fn is not None:
+        constraints.append(constraint_fn)
+
+    def _expand(tensor):
+        return _merge_beam_dim(_expand_to_beam_size(tensor, beam_size))
+
+    if states is not None:
+        states = map_structure(_expand, states)
+    if memory is not None:
+        memory = map_structure(_expand, memory)
+
+    # Alive sequences of unfinished examples occupy the first rows.
+    alive_seq = initial_ids.new_zeros(batch_size * beam_size,
+                                      decode_length + 1)
+    alive_seq[:, 0] = _merge_beam_dim(
+        _expand_to_beam_size(initial_ids, beam_size))
+    # Assume initial_ids are prob 1.0
+    alive_log_probs = torch.full((batch_size, beam_size), -float("inf"),
+                                 device=device)
+    alive_log_probs[:, 0] = 0.0
+    # Finished sequences are indexed by the original batch index.
+    finished_seq = initial_ids.new_zeros(batch_size, beam_size,
+                                         decode_length + 1)
+    finished_scores = torch.full((batch_size, beam_size), -INF, device=device)
+    finished_flags = torch.zeros((batch_size, beam_size), dtype=torch_bool,
+                                 device=device)
+
+    # Original batch indices of unfinished examples.
+    active = torch.arange(batch_size, device=device)
+    beam_offset = torch.arange(beam_size, device=device)
+    max_length_penalty = ((5.0 + float(decode_length)) / 6.0) ** alpha
+
+    step = 0
+    while step < decode_length:
+        num_active = active.size(0)
+        num_rows = num_active * beam_size
+        row_offset = torch.arange(
+            num_active, device=device).unsqueeze(1) * beam_size
+        ids = alive_seq[:num_rows, :(step + 1)]
+        if states is None and memory is None:
+            logits = symbols_to_logits_fn(ids)
+        elif memory is None:
+            logits, states = symbols_to_logits_fn(ids, states)
+        else:
+            logits, states = symbols_to_logits_fn(ids, states, memory)
+        candidate_log_probs = log_prob_from_logits(logits.view(num_rows, -1))
+        for constraint in constraints:
+            candidate_log_probs = constraint(step, ids, candidate_log_probs)
+
+        # (num_active, beam_size * vocab_size)
+        log_probs = (candidate_log_probs.view(num_active, beam_size, -1) +
+                     alive_log_probs.unsqueeze(dim=2))
+        flat_log_probs = log_probs.view(num_active, -1)
+        topk_log_probs, topk_ids = torch.topk(
+            flat_log_probs, k=beam_size * 2)
+        topk_beam_index = _floor_divide(topk_ids, vocab_size)
+        topk_ids = topk_ids % vocab_size
+        topk_finished = topk_ids == eos_id
+
+        # Grow alive: keep the top `beam_size` candidates without `EOS`.
+        _, alive_index = torch.topk(
+            topk_log_probs + topk_finished.float() * -INF, k=beam_size)
+        alive_log_probs = topk_log_probs.gather(1, alive_index)
+        alive_ids = topk_ids.gather(1, alive_index)
+        # Rows of the alive sequences that the new beams are grown from.
+        source_rows = topk_beam_index.gather(1, alive_index) + row_offset
+
+        # Grow finished: merge candidates ending with `EOS` into finished
+        # sequences. This is skipped if no candidate ends with `EOS`.
+        length_penalty = ((5.0 + float(step + 1)) / 6.0) ** alpha
+        if topk_finished.any().item():
+            topk_scores = (topk_log_probs / length_penalty +
+                           (1.0 - topk_finished.float()) * -INF)
+            topk_rows = topk_beam_index + row_offset
+            topk_seq = alive_seq[:num_rows, :(step + 2)].index_select(
+                0, topk_rows.view(-1)).view(num_active, beam_size * 2, -1)
+            topk_seq[:, :, step + 1] = topk_ids
+            curr_scores = torch.cat(
+                [finished_scores.index_select(0, active), topk_scores], dim=1)
+            curr_flags = torch.cat(
+                [finished_flags.index_select(0, active), topk_finished],
+                dim=1)
+            curr_seq = torch.cat(
+                [finished_seq[:, :, :(step + 2)].index_select(0, active),
+                 topk_seq], dim=1)
+            next_scores, next_index = torch.topk(curr_scores, k=beam_size)
+            finished_scores[active] = next_scores
+            finished_flags[active] = curr_flags.gather(1, next_index)
+            finished_seq[active, :, :(step + 2)] = curr_seq.gather(
+                1, next_index.unsqueeze(2).expand(-1, -1, step + 2))
+
+        step += 1
+        source_rows = source_rows.view(-1)
+        alive_seq[:num_rows, :step] = \
+            alive_seq[:num_rows, :step].index_select(0, source_rows)
+        alive_seq[:num_rows, step] = alive_ids.view(-1)
+
+        # Check termination condition for each example: the best possible
+        # score of the most likely alive sequence cannot beat the finished
+        # ones.
+        if step == decode_length:
+            done = torch.ones(num_active, dtype=torch_bool, device=device)
+        else:
+            lower_bound_alive_scores = \
+                alive_log_probs[:, 0] / max_length_penalty
+            active_scores = finished_scores.index_select(0, active)
+            if stop_early:
+                bound_scores, _ = torch.max(active_scores, dim=1)
+            else:
+                bound_scores, _ = torch.min(active_scores, dim=1)
+            done = bound_scores > lower_bound_alive_scores
+
+        if done.any().item():
+            # Accounting for corner case: It's possible that no sequence in
+            # alive for a particular batch item ever reached EOS. In that
+            # case, we should just copy the contents of alive for that
+            # batch item.
+            no_finished = done & (finished_flags.index_select(
+                0, active).any(dim=1) == 0)
+            if no_finished.any().item():
+                index = no_finished.nonzero().view(-1)
+                rows = (row_offset[index] + beam_offset).view(-1)
+                finished_seq[active[index], :, :(step + 1)] = \
+                    alive_seq[:num_rows, :(step + 1)].index_select(
+                        0, rows).view(-1, beam_size, step + 1)
+                finished_scores[active[index]] = alive_log_probs[index]
+
+            keep = (done == 0).nonzero().view(-1)
+            if keep.size(0) == 0:
+                break
+            keep_rows = (row_offset[keep] + beam_offset).view(-1)
+            alive_seq[:keep_rows.size(0), :(step + 1)] = \
+                alive_seq[:num_rows, :(step + 1)].index_select(0, keep_rows)
+            alive_log_probs = alive_log_probs[keep]
+            active = active[keep]
+            source_rows = source_rows.index_select(0, keep_rows)
+            if memory is not None:
+                memory = map_structure(
+                    lambda tensor: _reorder_state(tensor, keep_rows), memory)
+
+        if states is not None:
+            states = map_structure(
+                lambda state: _reorder_state(state, source_rows), states)
+
+    return finished_seq[:, :, :(step + 1)], finished_scores
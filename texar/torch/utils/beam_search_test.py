@@ -384,6 +384,115 @@ class BeamSearchTest(unittest.TestCase):
             eos_id=1,
             states=states)
 
+    def testBatchedBeamSearch(self):
+        batch_size = 4
+        beam_size = 3
+        vocab_size = 7
+        decode_length = 12
+        eos_id = 1
+
+        torch.manual_seed(0)
+        transition = torch.randn(vocab_size, vocab_size) * 2
+        bias = torch.randn(batch_size, vocab_size)
+        initial_ids = torch.tensor([0, 2, 3, 4], dtype=torch.int64)
+
+        def symbols_to_logits(ids, states):
+            state = states["state"] * 0.5 + transition[ids[:, -1]]
+            return (state + states["bias"],
+                    {"state": state, "bias": states["bias"]})
+
+        def batched_symbols_to_logits(ids, state, memory):
+            state = state * 0.5 + transition[ids[:, -1]]
+            return state + memory, state
+
+        for stop_early in [True, False]:
+            final_ids, final_probs = beam_search.beam_search(
+                symbols_to_logits_fn=symbols_to_logits,
+                initial_ids=initial_ids,
+                beam_size=beam_size,
+                decode_length=decode_length,
+                vocab_size=vocab_size,
+                alpha=0.6,
+                eos_id=eos_id,
+                states={"state": torch.zeros(batch_size, vocab_size),
+                        "bias": bias},
+                stop_early=stop_early)
+            batched_ids, batched_probs = beam_search.batched_beam_search(
+                symbols_to_logits_fn=batched_symbols_to_logits,
+                initial_ids=initial_ids,
+                beam_size=beam_size,
+                decode_length=decode_length,
+                vocab_size=vocab_size,
+                alpha=0.6,
+                eos_id=eos_id,
+                states=torch.zeros(batch_size, vocab_size),
+                memory=bias,
+                stop_early=stop_early)
+
+            if stop_early:
+                # Only the first beam is guaranteed to be the same.
+                final_ids = final_ids[:, :1]
+                final_probs = final_probs[:, :1]
+                batched_ids = batched_ids[:, :1]
+                batched_probs = batched_probs[:, :1]
+            # Examples may finish earlier, which only removes padding.
+            length = batched_ids.size(2)
+            self.assertLessEqual(length, final_ids.size(2))
+            self.assertTrue((final_ids[:, :, length:] == 0).all())
+            final_ids = final_ids[:, :, :length]
+            self.assertEqual(batched_ids.tolist(), final_ids.tolist())
+            np.testing.assert_allclose(
+                batched_probs.numpy(), final_probs.numpy(), rtol=1e-5)
+
+    def testBatchedBeamSearchConstraints(self):
+        batch_size = 2
+        beam_size = 2
+        vocab_size = 5
+        decode_length = 8
+        eos_id = 1
+
+        # Each token is most likely followed by itself, then by `EOS`.
+        transition = torch.full((vocab_size, vocab_size), -5.0)
+        transition[torch.arange(vocab_size), torch.arange(vocab_size)] = 5.0
+        transition[:, eos_id] = 4.0
+        initial_ids = torch.tensor([2, 3], dtype=torch.int64)
+
+        def symbols_to_logits(ids):
+            return transition[ids[:, -1]]
+
+        final_ids, _ = beam_search.batched_beam_search(
+            symbols_to_logits_fn=symbols_to_logits,
+            initial_ids=initial_ids,
+            beam_size=beam_size,
+            decode_length=decode_length,
+            vocab_size=vocab_size,
+            alpha=0.0,
+            eos_id=eos_id,
+            min_length=3)
+        self.assertTrue((final_ids[:, :, 1:4] != eos_id).all())
+
+        final_ids, _ = beam_search.batched_beam_search(
+            symbols_to_logits_fn=symbols_to_logits,
+            initial_ids=initial_ids,
+            beam_size=beam_size,
+            decode_length=decode_length,
+            vocab_size=vocab_size,
+            alpha=0.0,
+            eos_id=eos_id,
+            no_repeat_ngram_size=2)
+        for ids in final_ids.view(-1, final_ids.size(2)).tolist():
+            if eos_id in ids:
+                ids = ids[:(ids.index(eos_id) + 1)]
+            bigrams = list(zip(ids[:-1], ids[1:]))
+            self.assertEqual(len(bigrams), len(set(bigrams)))
+        # Repeating the initial token once is still allowed, but the bigram
+        # cannot be repeated again. Thus with `alpha=0`, ending right away
+        # (log-prob -1.31) beats repeating the token once (-0.31 - 1.31).
+        self.assertEqual(final_ids[:, 0, :2].tolist(),
+                         [[2, eos_id], [3, eos_id]])
+        self.assertEqual(final_ids[:, 1, :3].tolist(),
+                         [[2, 2, eos_id], [3, 3, eos_id]])
+
 
 if __name__ == "__main__":
     unittest.main()
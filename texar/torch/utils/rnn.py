@@ -13,11 +13,15 @@
 # limitations under the License.
 """RNN helpers for PyTorch models."""
 
-from typing import List, Optional, Tuple, TypeVar, Union
+from typing import Any, Callable, List, Optional, Tuple, TypeVar, Union
 
 import torch
+from torch import nn
+from torch.nn.utils.rnn import (
+    PackedSequence, pack_padded_sequence, pad_packed_sequence)
 
-from texar.torch.core.cell_wrappers import RNNCellBase
+from texar.torch.core.cell_wrappers import (
+    GRUCell, LSTMCell, MultiRNNCell, RNNCell, RNNCellBase)
 from texar.torch.utils.shapes import mask_sequences
 from texar.torch.utils.utils import map_structure, map_structure_zip, no_map
 
@@ -67,12 +71,19 @@ def reverse_sequence(inputs: torch.Tensor,
     if time_major:
         inputs = inputs.permute(1, 0, 2)
 
-    batch_size = inputs.shape[0]
-
-    outputs = inputs.clone()
-    for i in range(batch_size):
-        outputs[i][0:seq_lengths[i]] = torch.flip(
-            inputs[i][0:seq_lengths[i]], dims=(0,))
+    batch_size, time_steps = inputs.shape[:2]
+    if not isinstance(seq_lengths, torch.Tensor):
+        seq_lengths = torch.tensor(seq_lengths)
+    seq_lengths = seq_lengths.to(device=inputs.device, dtype=torch.long)
+
+    # Index of the element to take at each position: positions within the
+    # sequence length are reversed, and other positions are kept.
+    times = torch.arange(time_steps, device=inputs.device).unsqueeze(0)
+    lengths = seq_lengths.unsqueeze(1)
+    indices = torch.where(times < lengths, lengths - 1 - times,
+                          times.expand(batch_size, -1))
+    indices = indices.view(*indices.size(), *([1] * (inputs.dim() - 2)))
+    outputs = torch.gather(inputs, 1, indices.expand_as(inputs))
     if time_major:
         outputs = outputs.permute(1, 0, 2)
 
@@ -301,8 +312,15 @@ def dynamic_rnn(
     else:
         state = cell.zero_state(batch_size=batch_size)
 
-    (outputs, final_state) = _dynamic_rnn_loop(
-        cell, inputs, state, sequence_length=sequence_length)
+    final_state: State
+    builtin_cells = _get_fusible_cells(cell)
+    if builtin_cells is not None and isinstance(inputs, torch.Tensor):
+        (outputs, final_state) = _fused_dynamic_rnn(
+            builtin_cells, inputs, state, sequence_length=sequence_length,
+            multi_layer=isinstance(cell, MultiRNNCell))
+    else:
+        (outputs, final_state) = _dynamic_rnn_loop(
+            cell, inputs, state, sequence_length=sequence_length)
 
     # Outputs of _dynamic_rnn_loop are always shaped [time, batch, depth].
     # If we are performing batch-major calculations, transpose output back
@@ -350,33 +368,171 @@ def _dynamic_rnn_loop(cell: RNNCellBase[State],
 
     all_state = map_structure(lambda _: no_map(list), state)
 
-    for i in range(time_steps):
+    # Steps after the longest sequence are not computed, as their outputs are
+    # masked, and they do not affect the final states.
+    max_length = int(sequence_length.max().item())
+    num_steps = max(min(max_length, time_steps), min(time_steps, 1))
+    for i in range(num_steps):
         output, state = cell(inputs[i], state)
         all_outputs.append(output)
         map_structure_zip(lambda xs, x: xs.append(x), (all_state, state))
-    # TODO: Do not compute everything regardless of sequence_length
 
     final_outputs = torch.stack(all_outputs, dim=0)
+    if num_steps < time_steps:
+        final_outputs = torch.cat([final_outputs, final_outputs.new_zeros(
+            time_steps - num_steps, *final_outputs.size()[1:])], dim=0)
     final_outputs = mask_sequences(final_outputs,
                                    sequence_length=sequence_length,
                                    time_major=True)
 
-    final_state = map_structure(lambda _: no_map(list), state)
-    # pylint: disable=cell-var-from-loop
-    # Our use case is fine because the function is called immediately and
-    # exclusively in the current iteration of the loop.
-    for batch_idx, time_idx in enumerate(sequence_length.tolist()):
-        if time_idx > 0:
-            map_structure_zip(
-                lambda xs, x: xs.append(x[time_idx - 1][batch_idx]),
-                (final_state, all_state))
-        else:
-            map_structure_zip(
-                lambda xs, x: xs.append(x[batch_idx]),
-                (final_state, initial_state))
-    # pylint: enable=cell-var-from-loop
-
-    final_state = map_structure(
-            lambda x: torch.stack(x, dim=0), final_state)
+    # Gather the state at the last step of each sequence, or the initial state
+    # for empty sequences.
+    sequence_length = sequence_length.to(dtype=torch.long)
+    batch_indices = torch.arange(
+        sequence_length.size(0), device=sequence_length.device)
+    time_indices = (sequence_length - 1).clamp(min=0)
+    is_empty = sequence_length == 0
+
+    def _gather_final_state(states: List[torch.Tensor],
+                            init_state: torch.Tensor) -> torch.Tensor:
+        state = torch.stack(states, dim=0)[time_indices, batch_indices]
+        mask = is_empty.view(-1, *([1] * (state.dim() - 1)))
+        return torch.where(mask, init_state, state)
+
+    final_state = map_structure_zip(
+        _gather_final_state, (all_state, initial_state))
 
     return final_outputs, final_state
+
+
+def _get_fusible_cells(cell: RNNCellBase) -> Optional[List[nn.RNNCellBase]]:
+    r"""Returns the built-in cells wrapped in :attr:`cell`, if :attr:`cell`
+    can be run with a fused multi-layer RNN kernel (e.g., cuDNN). This is the
+    case when :attr:`cell` is an :class:`~texar.torch.core.RNNCell`,
+    :class:`~texar.torch.core.GRUCell`, or :class:`~texar.torch.core.LSTMCell`,
+    or a :class:`~texar.torch.core.MultiRNNCell` stacking cells of the same
+    type, hidden size and bias setting.
+
+    Returns:
+        A list of built-in cells (one per layer), or `None` if :attr:`cell`
+        cannot be fused.
+    """
+    if type(cell) is MultiRNNCell:  # pylint: disable=unidiomatic-typecheck
+        cells = list(cell._cell)  # pylint: disable=protected-access
+    else:
+        cells = [cell]
+    builtin_cells: List[nn.RNNCellBase] = []
+    for wrapper in cells:
+        # Subclasses of the wrappers might have overridden `forward`.
+        if type(wrapper) not in [RNNCell, GRUCell, LSTMCell]:
+            return None
+        assert isinstance(wrapper, RNNCellBase)
+        builtin_cell = wrapper._cell  # pylint: disable=protected-access
+        assert isinstance(builtin_cell, nn.RNNCellBase)
+        builtin_cells.append(builtin_cell)
+
+    first = builtin_cells[0]
+    for builtin_cell in builtin_cells:
+        if (type(builtin_cell) is not type(first) or
+                builtin_cell.hidden_size != first.hidden_size or
+                builtin_cell.bias != first.bias or
+                getattr(builtin_cell, 'nonlinearity', None) !=
+                getattr(first, 'nonlinearity', None)):
+            return None
+    return builtin_cells
+
+
+def _fused_dynamic_rnn(cells: List[nn.RNNCellBase],
+                       inputs: torch.Tensor,
+                       initial_state,
+                       sequence_length: torch.LongTensor,
+                       multi_layer: bool) -> Tuple[torch.Tensor, Any]:
+    r"""Internal implementation of Dynamic RNN using fused multi-layer RNN
+    kernels over packed sequences. Weights of the built-in cells are used
+    directly, so gradients flow back to the cells. The results are the same
+    as :func:`_dynamic_rnn_loop`.
+
+    Args:
+        cells: A list of built-in cells, one for each layer, as returned by
+            :func:`_get_fusible_cells`.
+        inputs: A ``Tensor`` of shape ``[time, batch_size, input_size]``.
+        initial_state: The initial state. If :attr:`multi_layer` is `True`,
+            this is a list of states for each layer.
+        sequence_length: An ``int32`` ``Tensor`` of shape ``[batch_size]``.
+        multi_layer (bool): Whether the cells come from a
+            :class:`~texar.torch.core.MultiRNNCell`.
+
+    Returns:
+        Tuple ``(final_outputs, final_state)``, with the same format as the
+        return value of :func:`_dynamic_rnn_loop`.
+    """
+    # pylint: disable=protected-access
+    from torch import _VF
+
+    first = cells[0]
+    is_lstm = isinstance(first, nn.LSTMCell)
+    if is_lstm:
+        mode = 'lstm'
+    elif isinstance(first, nn.GRUCell):
+        mode = 'gru'
+    elif isinstance(first, nn.RNNCell) and first.nonlinearity == 'tanh':
+        mode = 'rnn_tanh'
+    else:
+        mode = 'rnn_relu'
+    # The kernels share the same signature except for the type of `hx`.
+    rnn_impl: Callable[..., Tuple[torch.Tensor, ...]] = getattr(_VF, mode)
+
+    weights: List[torch.Tensor] = []
+    for cell in cells:
+        weights.extend([cell.weight_ih, cell.weight_hh])
+        if cell.bias:
+            weights.extend([cell.bias_ih, cell.bias_hh])
+
+    layer_states = initial_state if multi_layer else [initial_state]
+    hx: Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]
+    if is_lstm:
+        hx = (torch.stack([h for h, _ in layer_states], dim=0),
+              torch.stack([c for _, c in layer_states], dim=0))
+    else:
+        hx = torch.stack(layer_states, dim=0)
+
+    # Sort sequences by decreasing length as required for packing. Empty
+    # sequences are packed with length 1, and their results are discarded.
+    time_steps = inputs.size(0)
+    sequence_length = sequence_length.to(dtype=torch.long)
+    sorted_length, sorted_indices = torch.sort(
+        sequence_length, descending=True)
+    _, unsorted_indices = torch.sort(sorted_indices)
+    packed = pack_padded_sequence(
+        inputs.index_select(1, sorted_indices),
+        sorted_length.clamp(min=1).tolist())
+    hx = map_structure(lambda h: h.index_select(1, sorted_indices), hx)
+
+    # The kernel returns `(output, h_n, c_n)` for LSTMs, and `(output, h_n)`
+    # for others.
+    result = rnn_impl(
+        packed.data, packed.batch_sizes, hx, weights, first.bias, len(cells),
+        0.0, torch.is_grad_enabled() and first.training, False)
+    output = result[0]
+    hidden = tuple(result[1:]) if is_lstm else result[1]
+    outputs, _ = pad_packed_sequence(
+        PackedSequence(output, packed.batch_sizes), total_length=time_steps)
+    outputs = outputs.index_select(1, unsorted_indices)
+    outputs = mask_sequences(
+        outputs, sequence_length=sequence_length, time_major=True)
+    hidden = map_structure(
+        lambda h: h.index_select(1, unsorted_indices), hidden)
+
+    is_empty = (sequence_length == 0).unsqueeze(1)
+    if is_lstm:
+        final_state = [
+            (torch.where(is_empty, h0, h), torch.where(is_empty, c0, c))
+            for (h0, c0), h, c in zip(layer_states, hidden[0], hidden[1])]
+    else:
+        final_state = [torch.where(is_empty, h0, h)
+                       for h0, h in zip(layer_states, hidden)]
+    # pylint: enable=protected-access
+
+    if multi_layer:
+        return outputs, final_state
+    return outputs, final_state[0]
@@ -8,9 +8,12 @@ import unittest
 
 import torch
 
-from texar.torch.core.cell_wrappers import RNNCell, GRUCell, LSTMCell
+from texar.torch.core.cell_wrappers import (
+    RNNCell, GRUCell, LSTMCell, MultiRNNCell)
 from texar.torch.utils.rnn import (
-    dynamic_rnn, reverse_sequence, bidirectional_dynamic_rnn)
+    _dynamic_rnn_loop, dynamic_rnn, reverse_sequence,
+    bidirectional_dynamic_rnn)
+from texar.torch.utils.utils import map_structure_zip
 
 
 class ReverseSequenceTest(unittest.TestCase):
@@ -205,6 +208,46 @@ class DynamicRNNTest(unittest.TestCase):
         self.assertEqual(final_state.shape, torch.Size([self._batch_size,
                                                         self._hidden_size]))
 
+    def test_dynamic_rnn_fused(self):
+        r"""Tests that the fused implementation of
+        :meth:`~texar.torch.utils.rnn.dynamic_rnn` gives the same results as
+        the step-by-step loop.
+        """
+        inputs = torch.rand(self._max_time, self._batch_size, self._input_size)
+        sequence_length = torch.tensor([0, 43, 23, 63, 12, 54, 33, 8])
+        cells = [
+            self._rnn, self._lstm, self._gru,
+            RNNCell(self._input_size, self._hidden_size, nonlinearity='relu'),
+            MultiRNNCell([LSTMCell(self._input_size, self._hidden_size),
+                          LSTMCell(self._hidden_size, self._hidden_size)]),
+        ]
+
+        for cell in cells:
+            initial_state = map_structure_zip(
+                lambda x: torch.rand_like(x),
+                [cell.zero_state(self._batch_size)])
+
+            outputs, final_state = dynamic_rnn(
+                cell, inputs, sequence_length=sequence_length,
+                initial_state=initial_state, time_major=True)
+            outputs.sum().backward()
+            grads = [param.grad.clone() for param in cell.parameters()]
+            cell.zero_grad()
+
+            expected_outputs, expected_state = _dynamic_rnn_loop(
+                cell, inputs, initial_state, sequence_length)
+            expected_outputs.sum().backward()
+            expected_grads = [param.grad.clone() for param in cell.parameters()]
+            cell.zero_grad()
+
+            self.assertTrue(torch.allclose(
+                outputs, expected_outputs, atol=1e-5))
+            map_structure_zip(
+                lambda x, y: self.assertTrue(torch.allclose(x, y, atol=1e-5)),
+                [final_state, expected_state])
+            for grad, expected_grad in zip(grads, expected_grads):
+                self.assertTrue(torch.allclose(grad, expected_grad, atol=1e-3))
+
     def test_dynamic_rnn_initial_state(self):
         r"""Tests :meth:`~texar.torch.utils.rnn.dynamic_rnn`.
         """